@@ -0,0 +1,61 @@
+#apps/apply_patch.py
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from nc_baxis_constant_surface_speed.core.patch import PatchError, apply_patch, default_output_path, iter_patched
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="nc-bcss-apply-patch",
+        description="Rebuild a -bcss program from the original EIA and its .bcsspatch.",
+    )
+    p.add_argument("source", type=Path, help="Original (unconverted) EIA file")
+    p.add_argument("patch", type=Path, help="<stem>-bcss<ext>.bcsspatch")
+    p.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=None,
+        help="Output file. Default: patch path without .bcsspatch",
+    )
+    p.add_argument(
+        "--stdout",
+        action="store_true",
+        help="Stream the program to stdout (drip-feed) instead of writing a file.",
+    )
+    p.add_argument(
+        "--no-verify",
+        action="store_true",
+        help="Skip the up-front source hash check (size and output hash are still checked).",
+    )
+    return p
+
+
+def main() -> int:
+    args = build_parser().parse_args()
+    verify = not args.no_verify
+
+    try:
+        if args.stdout:
+            out = sys.stdout.buffer
+            for chunk in iter_patched(args.source, args.patch, verify=verify):
+                out.write(chunk)
+                out.flush()
+            return 0
+
+        out_path = args.output or default_output_path(args.patch)
+        apply_patch(args.source, args.patch, out_path, verify=verify)
+        print(f"Wrote {out_path}", file=sys.stderr)
+        return 0
+    except PatchError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
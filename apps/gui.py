@@ -1,10 +1,16 @@
 from __future__ import annotations
 
 import json
+import multiprocessing
+import os
+import queue
 import threading
+import time
 import traceback
-from dataclasses import asdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 from tkinter import (
     Tk,
     StringVar,
@@ -13,16 +19,32 @@ from tkinter import (
     DoubleVar,
     filedialog,
     messagebox,
+    Canvas,
     Text,
+    Toplevel,
 )
 from tkinter import ttk
 
 from nc_baxis_constant_surface_speed.core.config import BcssConfig
-from nc_baxis_constant_surface_speed.core.processor import process_file
+from nc_baxis_constant_surface_speed.core.downsample import lttb_downsample, minmax_downsample, visible_range
+from nc_baxis_constant_surface_speed.core.processor import analyze_file, process_file
+from nc_baxis_constant_surface_speed.core.profile import EVENT_CLAMP, ProfileRecorder
+from nc_baxis_constant_surface_speed.core.report import Histograms
+from nc_baxis_constant_surface_speed.core.tooltable import ToolTable, load_tool_table
 
 
 APP_TITLE = "NC B-axis Constant Surface Speed (BCSS)"
 
+# Job queue: how often the Tk loop drains worker events, and how many per tick.
+JOB_POLL_MS = 100
+JOB_EVENTS_PER_TICK = 200
+
+# Extensions picked up by "Add folder..."
+JOB_SUFFIXES = (".eia", ".nc")
+
+# Preview: redraw debounce while zooming/panning
+PREVIEW_REDRAW_MS = 30
+
 
 def _load_settings(path: Path) -> dict:
     try:
@@ -35,11 +57,32 @@ def _save_settings(path: Path, data: dict) -> None:
     path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
+def _convert_job(inp: str, out_dir: str, cfg: BcssConfig, tool_table: Optional[ToolTable] = None) -> dict:
+    """
+    Worker entry point for the process pool (must stay top-level to be picklable).
+    Returns the report dict plus elapsed seconds.
+    """
+    t0 = time.perf_counter()
+    report = process_file(Path(inp), Path(out_dir), cfg, tool_table=tool_table)
+    return {"report": report.to_dict(), "elapsed": time.perf_counter() - t0}
+
+
+@dataclass
+class Job:
+    path: Path
+    status: str = "queued"
+    lines: Optional[int] = None
+    inserted: Optional[int] = None
+    elapsed: Optional[float] = None
+    report: Optional[dict] = None
+    error: Optional[str] = None
+
+
 class App:
     def __init__(self, root: Tk) -> None:
         self.root = root
         root.title(APP_TITLE)
-        root.geometry("920x600")
+        root.geometry("980x820")
 
         self.settings_path = Path.cwd() / "bcss_settings.json"
         s = _load_settings(self.settings_path)
@@ -47,6 +90,7 @@ class App:
         # Paths
         self.in_path = StringVar(value=s.get("in_path", ""))
         self.out_dir = StringVar(value=s.get("out_dir", ""))
+        self.tool_table_path = StringVar(value=s.get("tool_table", ""))
 
         # Mode
         # "relative" (Mode A) or "vc_absolute" (Mode B)
@@ -75,8 +119,21 @@ class App:
         # IMPORTANT: default ON
         self.invert_b = BooleanVar(value=bool(s.get("invert_b", True)))
 
+        # Job queue
+        self.workers = IntVar(value=int(s.get("workers", max(1, min(4, os.cpu_count() or 1)))))
+        self.job_status = StringVar(value="No jobs.")
+        self._jobs: Dict[str, Job] = {}  # keyed by Treeview item id
+        self._job_events: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._jobs_t0 = 0.0
+        self._jobs_running = False
+
         self.status = StringVar(value="Ready.")
         self._busy = False
+        # Last single-file run; its S / θ profile is only recorded when the preview is opened
+        self._last_run: Optional[Tuple[Path, BcssConfig, Optional[ToolTable]]] = None
+        self._last_profile: Optional[ProfileRecorder] = None
 
         self._build_ui()
         self._apply_mode_ui()  # enable/disable fields based on mode
@@ -103,6 +160,12 @@ class App:
         ttk.Entry(row2, textvariable=self.out_dir, width=98).pack(side="left", padx=8, fill="x", expand=True)
         ttk.Button(row2, text="Browse...", command=self._browse_outdir).pack(side="left")
 
+        row3 = ttk.Frame(file_box)
+        row3.pack(fill="x", **pad)
+        ttk.Label(row3, text="Tool table (optional)").pack(side="left")
+        ttk.Entry(row3, textvariable=self.tool_table_path, width=98).pack(side="left", padx=8, fill="x", expand=True)
+        ttk.Button(row3, text="Browse...", command=self._browse_tool_table).pack(side="left")
+
         # ---------- Mode selection ----------
         mode_box = ttk.LabelFrame(frm, text="Mode")
         mode_box.pack(fill="x", **pad)
@@ -170,13 +233,53 @@ class App:
 
         ttk.Button(act, text="Save settings", command=self._save_clicked).pack(side="left", padx=8)
 
+        self.btn_preview = ttk.Button(act, text="Preview S / θ", command=self._preview_clicked, state="disabled")
+        self.btn_preview.pack(side="left")
+
         ttk.Label(act, textvariable=self.status).pack(side="left", padx=12)
 
+        # ---------- Job queue ----------
+        job_box = ttk.LabelFrame(frm, text="Jobs (multi-file)")
+        job_box.pack(fill="both", expand=True, **pad)
+
+        jrow = ttk.Frame(job_box)
+        jrow.pack(fill="x", padx=10, pady=4)
+        ttk.Button(jrow, text="Add files...", command=self._add_job_files).pack(side="left")
+        ttk.Button(jrow, text="Add folder...", command=self._add_job_folder).pack(side="left", padx=6)
+        ttk.Button(jrow, text="Remove selected", command=self._remove_selected_jobs).pack(side="left")
+        ttk.Button(jrow, text="Clear", command=self._clear_jobs).pack(side="left", padx=6)
+        ttk.Label(jrow, text="Workers").pack(side="left", padx=(12, 4))
+        ttk.Spinbox(jrow, from_=1, to=max(1, os.cpu_count() or 1), textvariable=self.workers, width=4).pack(
+            side="left"
+        )
+        self.btn_run_jobs = ttk.Button(jrow, text="Run jobs", command=self._run_jobs_clicked)
+        self.btn_run_jobs.pack(side="left", padx=(12, 4))
+        self.btn_cancel_jobs = ttk.Button(
+            jrow, text="Cancel", command=self._cancel_jobs_clicked, state="disabled"
+        )
+        self.btn_cancel_jobs.pack(side="left")
+        ttk.Label(jrow, textvariable=self.job_status).pack(side="left", padx=12)
+
+        cols = ("status", "lines", "inserted", "time", "rate")
+        self.job_tree = ttk.Treeview(job_box, columns=cols, height=7, selectmode="extended")
+        self.job_tree.heading("#0", text="File")
+        self.job_tree.column("#0", width=420, stretch=True)
+        for col, text, width in (
+            ("status", "Status", 90),
+            ("lines", "Lines", 90),
+            ("inserted", "Inserted S", 90),
+            ("time", "Time (s)", 80),
+            ("rate", "Lines/s", 100),
+        ):
+            self.job_tree.heading(col, text=text)
+            self.job_tree.column(col, width=width, anchor="e", stretch=False)
+        self.job_tree.pack(fill="both", expand=True, padx=10, pady=4)
+
         # ---------- Log area ----------
         log_box = ttk.LabelFrame(frm, text="Log")
         log_box.pack(fill="both", expand=True, **pad)
 
-        self.log = Text(log_box, height=14)
+        self.log = Text(log_box, height=10)
         self.log.pack(fill="both", expand=True, padx=10, pady=8)
         self._log("Ready.")
 
@@ -226,10 +329,19 @@ class App:
         if d:
             self.out_dir.set(d)
 
+    def _browse_tool_table(self) -> None:
+        p = filedialog.askopenfilename(
+            title="Select tool table (JSON)",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+        )
+        if p:
+            self.tool_table_path.set(p)
+
     def _save_clicked(self) -> None:
         data = {
             "in_path": self.in_path.get(),
             "out_dir": self.out_dir.get(),
+            "tool_table": self.tool_table_path.get(),
             "mode": self.mode.get(),
             "tool_d": float(self.tool_d.get()),
             "theta_ref": float(self.theta_ref.get()),
@@ -242,6 +354,7 @@ class App:
             "s_round": int(self.s_round.get()),
             "deadband": int(self.deadband.get()),
             "invert_b": bool(self.invert_b.get()),
+            "workers": int(self.workers.get()),
         }
         try:
             _save_settings(self.settings_path, data)
@@ -250,34 +363,19 @@ class App:
         except Exception as e:
             messagebox.showerror("Save error", str(e))
 
-    def _run_clicked(self) -> None:
-        if self._busy:
-            return
-
-        in_path = self.in_path.get().strip()
-        if not in_path:
-            messagebox.showwarning("Missing input", "Please select an input .EIA file.")
-            return
-
-        inp = Path(in_path)
-        if not inp.exists():
-            messagebox.showerror("Input not found", f"File not found:\n{inp}")
-            return
-
-        out_dir_text = self.out_dir.get().strip()
-        out_dir = Path(out_dir_text) if out_dir_text else inp.parent
-
+    def _build_cfg(self) -> Optional[BcssConfig]:
+        """Validate the settings panel and build a config (None if invalid)."""
         mode = self.mode.get().strip()
         if mode not in ("relative", "vc_absolute"):
             messagebox.showerror("Invalid mode", f"Unknown mode: {mode}")
-            return
+            return None
 
         # Mode B requires Vc > 0
         if mode == "vc_absolute" and float(self.vc.get()) <= 0.0:
             messagebox.showwarning("Missing Vc", "Mode B requires Vc (m/min) > 0.")
-            return
+            return None
 
-        cfg = BcssConfig(
+        return BcssConfig(
             tool_d_mm=float(self.tool_d.get()),
             theta_ref_deg=float(self.theta_ref.get()),
             s_ref_rpm=int(self.s_ref.get()),
@@ -292,6 +390,41 @@ class App:
             mode=mode,  # IMPORTANT
         )
 
+    def _build_tool_table(self, cfg: BcssConfig) -> Tuple[bool, Optional[ToolTable]]:
+        """(ok, table): table is None when no tool table is set."""
+        text = self.tool_table_path.get().strip()
+        if not text:
+            return True, None
+        try:
+            return True, load_tool_table(Path(text), cfg)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Tool table error", f"{text}\n{e}")
+            return False, None
+
+    def _run_clicked(self) -> None:
+        if self._busy:
+            return
+
+        in_path = self.in_path.get().strip()
+        if not in_path:
+            messagebox.showwarning("Missing input", "Please select an input .EIA file.")
+            return
+
+        inp = Path(in_path)
+        if not inp.exists():
+            messagebox.showerror("Input not found", f"File not found:\n{inp}")
+            return
+
+        out_dir_text = self.out_dir.get().strip()
+        out_dir = Path(out_dir_text) if out_dir_text else inp.parent
+
+        cfg = self._build_cfg()
+        if cfg is None:
+            return
+        ok, tool_table = self._build_tool_table(cfg)
+        if not ok:
+            return
+
         # Run in background to keep UI responsive
         self._busy = True
         self.btn_run.config(state="disabled")
@@ -300,13 +433,54 @@ class App:
         self._log(f"Input : {inp}")
         self._log(f"OutDir: {out_dir}")
         self._log(f"Config: {asdict(cfg)}")
+        if tool_table is not None:
+            self._log(f"Tool table: T{', T'.join(map(str, sorted(tool_table.tools)))} (unlisted: {tool_table.unlisted})")
 
-        th = threading.Thread(target=self._run_worker, args=(inp, out_dir, cfg), daemon=True)
+        th = threading.Thread(target=self._run_worker, args=(inp, out_dir, cfg, tool_table), daemon=True)
         th.start()
 
-    def _run_worker(self, inp: Path, out_dir: Path, cfg: BcssConfig) -> None:
+    def _preview_clicked(self) -> None:
+        if self._last_run is None or self._busy:
+            return
+        inp = self._last_run[0]
+        if self._last_profile is not None:
+            PreviewWindow(self.root, self._last_profile, inp.name)
+            return
+        # The run itself has no observers, so it keeps the fast-copy / indexed paths.
+        # The profile comes from an analyze pass (no output; uses the sidecar index).
+        self._busy = True
+        self.btn_run.config(state="disabled")
+        self.btn_preview.config(state="disabled")
+        self.status.set("Preparing preview...")
+        threading.Thread(target=self._preview_worker, args=self._last_run, daemon=True).start()
+
+    def _preview_worker(self, inp: Path, cfg: BcssConfig, tool_table: Optional[ToolTable]) -> None:
+        recorder = ProfileRecorder()
+        profile: Optional[ProfileRecorder] = recorder
+        error = ""
+        try:
+            analyze_file(inp, cfg, observers=[recorder], tool_table=tool_table)
+        except Exception as e:
+            profile = None
+            error = str(e)
+
+        def done_ui() -> None:
+            self._busy = False
+            self.btn_run.config(state="normal")
+            self.btn_preview.config(state="normal")
+            if profile is None:
+                self._log(f"[ERROR] Preview failed: {error}")
+                self.status.set("Error.")
+                return
+            self.status.set("Done.")
+            self._last_profile = profile
+            PreviewWindow(self.root, profile, inp.name)
+
+        self.root.after(0, done_ui)
+
+    def _run_worker(self, inp: Path, out_dir: Path, cfg: BcssConfig, tool_table: Optional[ToolTable]) -> None:
         try:
-            process_file(inp, out_dir, cfg)
+            process_file(inp, out_dir, cfg, tool_table=tool_table)
 
             stem = inp.stem
             report_path = out_dir / f"{stem}-bcss.report.json"
@@ -332,9 +506,19 @@ class App:
                         f"deadband_skips={ch.get('skipped_deadband')} "
                         f"S_range=({srg.get('s_min')}, {srg.get('s_max')})"
                     )
+                    for t in rep.get("tools") or []:
+                        self._log(
+                            f"  T{t['tool'] if t['tool'] is not None else '-'} ({t['source']}): "
+                            f"lines={t['detect']['total_lines']} "
+                            f"inserted={t['changes']['inserted_s_lines']} "
+                            f"S_range=({t['s_range']['s_min']}, {t['s_range']['s_max']})"
+                        )
                 self.status.set("Done.")
                 self._busy = False
                 self.btn_run.config(state="normal")
+                self._last_run = (inp, cfg, tool_table)
+                self._last_profile = None
+                self.btn_preview.config(state="normal")
 
             self.root.after(0, done_ui)
 
@@ -352,8 +536,407 @@ class App:
 
             self.root.after(0, err_ui)
 
+    # ---------- Job queue ----------
+    def _add_job(self, path: Path) -> None:
+        path = path.resolve()
+        if any(j.path == path for j in self._jobs.values()):
+            return
+        iid = self.job_tree.insert("", "end", text=str(path), values=("queued", "", "", "", ""))
+        self._jobs[iid] = Job(path=path)
+
+    def _add_job_files(self) -> None:
+        paths = filedialog.askopenfilenames(
+            title="Select input files",
+            filetypes=[("EIA files", "*.EIA"), ("All files", "*.*")],
+        )
+        for p in paths:
+            self._add_job(Path(p))
+        self._update_job_status()
+
+    def _add_job_folder(self) -> None:
+        d = filedialog.askdirectory(title="Select folder with programs")
+        if not d:
+            return
+        added = 0
+        for p in sorted(Path(d).iterdir()):
+            # Skip our own outputs so re-adding a folder does not convert *-bcss files again.
+            if p.is_file() and p.suffix.lower() in JOB_SUFFIXES and not p.stem.endswith("-bcss"):
+                self._add_job(p)
+                added += 1
+        self._log(f"[JOBS] Added {added} file(s) from {d}")
+        self._update_job_status()
+
+    def _remove_selected_jobs(self) -> None:
+        if self._jobs_running:
+            return
+        for iid in self.job_tree.selection():
+            self.job_tree.delete(iid)
+            self._jobs.pop(iid, None)
+        self._update_job_status()
+
+    def _clear_jobs(self) -> None:
+        if self._jobs_running:
+            return
+        self.job_tree.delete(*self.job_tree.get_children())
+        self._jobs.clear()
+        self._update_job_status()
+
+    def _update_job_status(self) -> None:
+        counts: Dict[str, int] = {}
+        for j in self._jobs.values():
+            counts[j.status] = counts.get(j.status, 0) + 1
+        if not counts:
+            self.job_status.set("No jobs.")
+            return
+        text = " ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+        if self._jobs_running:
+            elapsed = time.perf_counter() - self._jobs_t0
+            done_lines = sum(j.lines or 0 for j in self._jobs.values() if j.status == "done")
+            if elapsed > 0:
+                text += f"  |  {done_lines / elapsed:,.0f} lines/s"
+        self.job_status.set(text)
+
+    def _run_jobs_clicked(self) -> None:
+        if self._jobs_running or self._busy:
+            return
+
+        todo = [(iid, j) for iid, j in self._jobs.items() if j.status != "done"]
+        if not todo:
+            messagebox.showinfo("No jobs", "Add files or a folder to the job list first.")
+            return
+
+        cfg = self._build_cfg()
+        if cfg is None:
+            return
+        ok, tool_table = self._build_tool_table(cfg)
+        if not ok:
+            return
+
+        out_dir_text = self.out_dir.get().strip()
+        workers = max(1, int(self.workers.get()))
+
+        self._jobs_running = True
+        self._jobs_t0 = time.perf_counter()
+        self.btn_run_jobs.config(state="disabled")
+        self.btn_run.config(state="disabled")
+        self.btn_cancel_jobs.config(state="normal")
+        self._log(f"[JOBS] Starting {len(todo)} job(s) on {workers} worker(s)...")
+        self._log(f"Config: {asdict(cfg)}")
+
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._futures = {}
+        for iid, job in todo:
+            out_dir = Path(out_dir_text) if out_dir_text else job.path.parent
+            out_dir.mkdir(parents=True, exist_ok=True)
+            job.status, job.report, job.error = "queued", None, None
+            self.job_tree.item(iid, values=("queued", "", "", "", ""))
+
+            fut = self._executor.submit(_convert_job, str(job.path), str(out_dir), cfg, tool_table)
+            # Callbacks run on executor threads: only enqueue, the Tk loop applies them.
+            fut.add_done_callback(lambda f, iid=iid: self._job_events.put((iid, f)))
+            self._futures[iid] = fut
+
+        self.root.after(JOB_POLL_MS, self._drain_job_events)
+
+    def _cancel_jobs_clicked(self) -> None:
+        cancelled = sum(1 for f in self._futures.values() if f.cancel())
+        self._log(f"[JOBS] Cancelled {cancelled} queued job(s); running jobs will finish.")
+
+    def _drain_job_events(self) -> None:
+        """Apply up to JOB_EVENTS_PER_TICK worker events per Tk tick, then reschedule."""
+        for _ in range(JOB_EVENTS_PER_TICK):
+            try:
+                iid, fut = self._job_events.get_nowait()
+            except queue.Empty:
+                break
+            job = self._jobs.get(iid)
+            if job is None:
+                continue
+            self._apply_job_result(job, fut)
+            self.job_tree.item(iid, values=self._job_row(job))
+
+        # Futures have no "started" callback, so promote queued -> running by polling.
+        for iid, fut in self._futures.items():
+            job = self._jobs[iid]
+            if job.status == "queued" and fut.running():
+                job.status = "running"
+                self.job_tree.item(iid, values=self._job_row(job))
+
+        self._update_job_status()
+
+        if all(f.done() for f in self._futures.values()) and self._job_events.empty():
+            self._finish_jobs()
+        else:
+            self.root.after(JOB_POLL_MS, self._drain_job_events)
+
+    def _apply_job_result(self, job: Job, fut: Future) -> None:
+        if fut.cancelled():
+            job.status = "cancelled"
+            return
+        exc = fut.exception()
+        if exc is not None:
+            job.status = "error"
+            job.error = str(exc)
+            self._log(f"[ERROR] {job.path.name}: {exc}")
+            return
+        res = fut.result()
+        rep = res["report"]
+        job.status = "done"
+        job.report = rep
+        job.elapsed = float(res["elapsed"])
+        job.lines = rep.get("detect", {}).get("total_lines")
+        job.inserted = rep.get("changes", {}).get("inserted_s_lines")
+
+    @staticmethod
+    def _job_row(job: Job) -> tuple:
+        rate = ""
+        if job.elapsed and job.lines is not None:
+            rate = f"{job.lines / job.elapsed:,.0f}"
+        return (
+            job.status,
+            "" if job.lines is None else f"{job.lines:,}",
+            "" if job.inserted is None else f"{job.inserted:,}",
+            "" if job.elapsed is None else f"{job.elapsed:.2f}",
+            rate,
+        )
+
+    def _finish_jobs(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._futures = {}
+        self._jobs_running = False
+        self.btn_run_jobs.config(state="normal")
+        self.btn_run.config(state="normal")
+        self.btn_cancel_jobs.config(state="disabled")
+
+        wall = time.perf_counter() - self._jobs_t0
+        done = [j for j in self._jobs.values() if j.status == "done" and j.report]
+        failed = [j for j in self._jobs.values() if j.status == "error"]
+
+        lines = inserted = deadband = clamped = 0
+        s_min: Optional[int] = None
+        s_max: Optional[int] = None
+        hist = Histograms()
+        for j in done:
+            rep = j.report or {}
+            if rep.get("histograms"):
+                hist.merge(Histograms.from_dict(rep["histograms"]))
+            det = rep.get("detect", {})
+            ch = rep.get("changes", {})
+            srg = rep.get("s_range", {})
+            lines += int(det.get("total_lines") or 0)
+            inserted += int(ch.get("inserted_s_lines") or 0)
+            deadband += int(ch.get("skipped_deadband") or 0)
+            clamped += int(ch.get("clamped_count") or 0)
+            if srg.get("s_min") is not None:
+                s_min = srg["s_min"] if s_min is None else min(s_min, srg["s_min"])
+            if srg.get("s_max") is not None:
+                s_max = srg["s_max"] if s_max is None else max(s_max, srg["s_max"])
+
+        rate = lines / wall if wall > 0 else 0.0
+        self._log(
+            "[JOBS] Finished: "
+            f"ok={len(done)} failed={len(failed)} wall={wall:.2f}s "
+            f"lines={lines:,} ({rate:,.0f} lines/s) "
+            f"inserted={inserted:,} deadband_skips={deadband:,} clamped={clamped:,} "
+            f"S_range=({s_min}, {s_max}) "
+            f"S_p50={hist.inserted_s.quantile(0.5)} S_p95={hist.inserted_s.quantile(0.95)} "
+            f"spacing_p50={hist.insert_spacing.quantile(0.5)}"
+        )
+        self._update_job_status()
+        self.status.set(f"Jobs done: {len(done)} ok, {len(failed)} failed.")
+
+
+class PreviewWindow:
+    """
+    S (top) and theta (bottom) against input line number.
+
+    Only the visible line range is sliced (bisect) and reduced to about one
+    bucket per pixel column on every redraw, so the canvas never holds more
+    than a few thousand points regardless of program size or zoom level.
+    """
+
+    MARGIN_L = 70
+    MARGIN_R = 16
+    MARGIN_T = 20
+    MARGIN_B = 28
+
+    def __init__(self, root: Tk, profile: ProfileRecorder, name: str) -> None:
+        self.profile = profile
+        self.x_max = float(max(1, profile.last_line))
+        self.x_lo = 1.0
+        self.x_hi = self.x_max
+        self._redraw_job: Optional[str] = None
+        self._drag_x: Optional[int] = None
+
+        self.win = Toplevel(root)
+        self.win.title(f"Preview: {name}")
+        self.win.geometry("1000x560")
+
+        self.method = StringVar(value="minmax")
+        self.info = StringVar(value="")
+
+        bar = ttk.Frame(self.win)
+        bar.pack(fill="x", padx=8, pady=4)
+        ttk.Radiobutton(bar, text="min/max", variable=self.method, value="minmax", command=self._schedule).pack(
+            side="left"
+        )
+        ttk.Radiobutton(bar, text="LTTB", variable=self.method, value="lttb", command=self._schedule).pack(
+            side="left", padx=6
+        )
+        ttk.Button(bar, text="Reset zoom", command=self._reset).pack(side="left", padx=12)
+        ttk.Label(bar, textvariable=self.info).pack(side="left", padx=12)
+
+        self.canvas = Canvas(self.win, background="white", highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self._schedule())
+        self.canvas.bind("<MouseWheel>", self._on_wheel)  # Windows / macOS
+        self.canvas.bind("<Button-4>", lambda e: self._zoom(e.x, 0.8))  # X11
+        self.canvas.bind("<Button-5>", lambda e: self._zoom(e.x, 1.25))
+        self.canvas.bind("<ButtonPress-1>", self._on_press)
+        self.canvas.bind("<B1-Motion>", self._on_drag)
+
+    # ---------- view control ----------
+    def _plot_width(self) -> int:
+        return max(10, self.canvas.winfo_width() - self.MARGIN_L - self.MARGIN_R)
+
+    def _x_at(self, px: float) -> float:
+        frac = (px - self.MARGIN_L) / self._plot_width()
+        return self.x_lo + min(max(frac, 0.0), 1.0) * (self.x_hi - self.x_lo)
+
+    def _set_view(self, lo: float, hi: float) -> None:
+        span = min(max(hi - lo, 20.0), self.x_max)
+        lo = min(max(lo, 1.0), self.x_max - span + 1.0)
+        self.x_lo, self.x_hi = lo, lo + span
+        self._schedule()
+
+    def _reset(self) -> None:
+        self._set_view(1.0, self.x_max)
+
+    def _zoom(self, px: int, factor: float) -> None:
+        x = self._x_at(px)
+        self._set_view(x - (x - self.x_lo) * factor, x + (self.x_hi - x) * factor)
+
+    def _on_wheel(self, event) -> None:
+        self._zoom(event.x, 0.8 if event.delta > 0 else 1.25)
+
+    def _on_press(self, event) -> None:
+        self._drag_x = event.x
+
+    def _on_drag(self, event) -> None:
+        if self._drag_x is None:
+            return
+        dx = (event.x - self._drag_x) / self._plot_width() * (self.x_hi - self.x_lo)
+        self._drag_x = event.x
+        self._set_view(self.x_lo - dx, self.x_hi - dx)
+
+    def _schedule(self) -> None:
+        if self._redraw_job is not None:
+            self.win.after_cancel(self._redraw_job)
+        self._redraw_job = self.win.after(PREVIEW_REDRAW_MS, self._redraw)
+
+    # ---------- drawing ----------
+    def _reduce(self, xs, ys) -> list:
+        i0, i1 = visible_range(xs, self.x_lo, self.x_hi)
+        width = self._plot_width()
+        if self.method.get() == "lttb":
+            return lttb_downsample(xs, ys, i0, i1, 2 * width)
+        return minmax_downsample(xs, ys, i0, i1, width)
+
+    def _draw_panel(self, top: int, bottom: int, xs, ys, idx: list, label: str, color: str, step: bool) -> int:
+        c = self.canvas
+        left = self.MARGIN_L
+        right = left + self._plot_width()
+        c.create_rectangle(left, top, right, bottom, outline="#999999")
+        c.create_text(left - 6, top + 8, text=label, anchor="e", fill=color)
+        if not idx:
+            return 0
+
+        y_lo = min(ys[i] for i in idx)
+        y_hi = max(ys[i] for i in idx)
+        if y_hi - y_lo < 1e-9:
+            y_lo, y_hi = y_lo - 1.0, y_hi + 1.0
+        c.create_text(left - 6, top + 24, text=f"{y_hi:g}", anchor="e")
+        c.create_text(left - 6, bottom - 4, text=f"{y_lo:g}", anchor="e")
+
+        span = self.x_hi - self.x_lo
+
+        def px(x: float) -> float:
+            return left + (x - self.x_lo) / span * (right - left)
+
+        def py(y: float) -> float:
+            return bottom - (y - y_lo) / (y_hi - y_lo) * (bottom - top - 10) - 5
+
+        pts: list = []
+        for i in idx:
+            x = px(max(float(xs[i]), self.x_lo))
+            y = py(float(ys[i]))
+            if step and pts:
+                pts.extend((x, pts[-1]))
+            pts.extend((x, y))
+        if step:
+            # S stays in effect until the next change (or the end of the view)
+            pts.extend((float(right), pts[-1]))
+        if len(pts) >= 4:
+            c.create_line(*pts, fill=color)
+        return len(idx)
+
+    def _draw_events(self, top: int) -> int:
+        p = self.profile
+        if not p.event_line:
+            return 0
+        left = self.MARGIN_L
+        width = self._plot_width()
+        span = self.x_hi - self.x_lo
+        i0, i1 = visible_range(p.event_line, self.x_lo, self.x_hi)
+        last_px = {}
+        drawn = 0
+        for i in range(i0, i1):
+            kind = p.event_kind[i]
+            x = int(left + (p.event_line[i] - self.x_lo) / span * width)
+            # at most one marker per kind and pixel column
+            if last_px.get(kind) == x or x < left or x > left + width:
+                continue
+            last_px[kind] = x
+            color = "#d62728" if kind == EVENT_CLAMP else "#999999"
+            y = top + 4 if kind == EVENT_CLAMP else top + 12
+            self.canvas.create_line(x, y, x, y + 6, fill=color)
+            drawn += 1
+        return drawn
+
+    def _redraw(self) -> None:
+        self._redraw_job = None
+        c = self.canvas
+        c.delete("all")
+        h = max(100, c.winfo_height())
+        mid = self.MARGIN_T + int((h - self.MARGIN_T - self.MARGIN_B) * 0.55)
+        p = self.profile
+
+        n_s = self._draw_panel(
+            self.MARGIN_T, mid - 6, p.s_line, p.s_rpm, self._reduce(p.s_line, p.s_rpm), "S", "#1f77b4", True
+        )
+        n_ev = self._draw_events(self.MARGIN_T)
+        n_t = self._draw_panel(
+            mid + 6,
+            h - self.MARGIN_B,
+            p.theta_line,
+            p.theta_deg,
+            self._reduce(p.theta_line, p.theta_deg),
+            "θ",
+            "#2ca02c",
+            False,
+        )
+        c.create_text(self.MARGIN_L, h - 8, text=f"line {self.x_lo:,.0f}", anchor="w")
+        c.create_text(self.MARGIN_L + self._plot_width(), h - 8, text=f"line {self.x_hi:,.0f}", anchor="e")
+        self.info.set(
+            f"drawn: S={n_s:,}/{len(p.s_line):,}  θ={n_t:,}/{len(p.theta_line):,}  events={n_ev:,}/{len(p.event_line):,}"
+        )
+
 
 def main() -> int:
+    multiprocessing.freeze_support()  # required for the process pool in the frozen (PyInstaller) GUI
     root = Tk()
     try:
         style = ttk.Style()
@@ -0,0 +1,101 @@
+#apps/history.py
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from nc_baxis_constant_surface_speed.core.history import DEFAULT_DB_NAME, HistoryStore, iter_report_files, parse_date
+
+# Columns shown by "query" in table form
+QUERY_COLUMNS = (
+    "processed_at",
+    "input_file",
+    "cfg_mode",
+    "total_lines",
+    "inserted_s_lines",
+    "clamped_count",
+    "s_min",
+    "s_max",
+    "cfg_s_max_rpm",
+    "elapsed_s",
+)
+
+
+def _iso_date(text: str) -> str:
+    # Validated here so a typo is an argparse error, not a traceback from the query
+    try:
+        parse_date(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+    return text
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="nc-bcss-history",
+        description="Query / import the local BCSS run history (SQLite).",
+    )
+    p.add_argument(
+        "--db",
+        type=Path,
+        default=Path.cwd() / DEFAULT_DB_NAME,
+        help=f"History database. Default: ./{DEFAULT_DB_NAME}",
+    )
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    imp = sub.add_parser("import", help="Import existing *-bcss.report.json files (folders are searched recursively).")
+    imp.add_argument("paths", type=Path, nargs="+", help="Report files or folders")
+    imp.add_argument("--batch-size", type=int, default=500, help="Reports per transaction. Default 500")
+
+    q = sub.add_parser("query", help="List runs, newest first.")
+    q.add_argument("--since", type=_iso_date, help="processed_at >= this ISO date/datetime (e.g. 2026-09-01)")
+    q.add_argument("--until", type=_iso_date, help="processed_at < this ISO date/datetime")
+    q.add_argument("--input", dest="input_like", help="SQL LIKE pattern on the input path (e.g. %%RE-0005%%)")
+    q.add_argument("--sha256", dest="input_sha256", help="Exact input file sha256")
+    q.add_argument("--mode", choices=["relative", "vc_absolute"], help="Config mode")
+    q.add_argument("--clamped", action="store_true", help="Only runs with clamped_count > 0")
+    q.add_argument("--at-s-max", action="store_true", help="Only runs whose S range reached the configured s_max")
+    q.add_argument("--limit", type=int, default=None, help="Maximum rows")
+    q.add_argument("--json", action="store_true", help="Print full reports as JSON lines")
+    return p
+
+
+def main() -> int:
+    args = build_parser().parse_args()
+
+    with HistoryStore(args.db) as store:
+        if args.cmd == "import":
+            inserted, dup, errors = store.import_report_files(
+                iter_report_files(args.paths), batch_size=max(1, args.batch_size)
+            )
+            for e in errors:
+                print(f"[WARN] {e}", file=sys.stderr)
+            print(f"Imported {inserted} report(s), {dup} already present, {len(errors)} error(s) -> {args.db}")
+            return 1 if errors and not inserted else 0
+
+        rows = store.query(
+            since=args.since,
+            until=args.until,
+            input_like=args.input_like,
+            input_sha256=args.input_sha256,
+            mode=args.mode,
+            clamped=args.clamped,
+            at_s_max=args.at_s_max,
+            limit=args.limit,
+        )
+        if args.json:
+            for row in rows:
+                print(row["report_json"])
+            return 0
+
+        print("\t".join(QUERY_COLUMNS))
+        for row in rows:
+            print("\t".join("" if row[c] is None else str(row[c]) for c in QUERY_COLUMNS))
+        print(f"({len(rows)} row(s))", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,7 +6,10 @@ import argparse
 from pathlib import Path
 
 from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.cycletime import CycleTimeModel
 from nc_baxis_constant_surface_speed.core.processor import process_file
+from nc_baxis_constant_surface_speed.core.tooltable import load_tool_table
+from nc_baxis_constant_surface_speed.core.trace import TRACE_DECISIONS, TRACE_LEVELS, TraceWriter
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -45,6 +48,81 @@ def build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Output directory. Default: same directory as input.",
     )
+    p.add_argument(
+        "--index",
+        action="store_true",
+        help="Use/write a <name>.bcssidx sidecar next to the input so re-runs skip text parsing.",
+    )
+    p.add_argument(
+        "--history-db",
+        type=Path,
+        default=None,
+        help="Also record the report in this SQLite run history (query with apps/history.py).",
+    )
+    p.add_argument(
+        "--output-format",
+        choices=["full", "patch"],
+        default="full",
+        help="full: write <stem>-bcss copy. patch: write only the insertions (<stem>-bcss<ext>.bcsspatch, "
+        "rebuild with apps/apply_patch.py). Default full",
+    )
+    p.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Read and write on background threads (helps on slow network shares).",
+    )
+    p.add_argument(
+        "--trace",
+        type=Path,
+        default=None,
+        help="Write one NDJSON record per insert/skip decision to this file.",
+    )
+    p.add_argument(
+        "--trace-level",
+        choices=list(TRACE_LEVELS),
+        default=TRACE_DECISIONS,
+        help="inserted: inserts only. decisions: + skips. all: + B words while spindle / tool off. Default decisions",
+    )
+    p.add_argument(
+        "--trace-sample",
+        type=int,
+        default=1,
+        help="Keep every N-th skip record per reason (inserts are always kept). Default 1",
+    )
+    p.add_argument(
+        "--cycle-time",
+        action="store_true",
+        help="Estimate machine time and the time added by inserted S changes (report cycle_time).",
+    )
+    p.add_argument(
+        "--spindle-accel",
+        type=float,
+        default=CycleTimeModel.spindle_accel_rpm_per_s,
+        help="Spindle acceleration for --cycle-time (rpm/s). Default %(default)s",
+    )
+    p.add_argument(
+        "--rapid",
+        type=float,
+        default=CycleTimeModel.rapid_mm_per_min,
+        help="Rapid traverse rate for --cycle-time (mm/min). Default %(default)s",
+    )
+    p.add_argument(
+        "--tool-table",
+        type=Path,
+        default=None,
+        help="JSON tool table: per-tool overrides of these settings, switched at each T.. M06.",
+    )
+    p.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep a block manifest next to the output and only reconvert the blocks that changed since the last run.",
+    )
+    p.add_argument(
+        "--subprograms",
+        action="store_true",
+        help="Run M98 calls into the file's O.. M99 subprograms with the caller's state "
+        "(extra O numbers where entry states need different S lines).",
+    )
     return p
 
 
@@ -65,10 +143,37 @@ def main() -> int:
         invert_b_to_theta=bool(args.invert_b),
     )
 
+    tool_table = load_tool_table(args.tool_table, cfg) if args.tool_table is not None else None
+
     out_dir = args.out_dir or args.input.parent
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    process_file(args.input, out_dir, cfg)
+    observers = []
+    if args.trace is not None:
+        observers.append(TraceWriter(args.trace, level=args.trace_level, sample_every=int(args.trace_sample)))
+
+    cycle_time = None
+    if args.cycle_time:
+        cycle_time = CycleTimeModel(rapid_mm_per_min=float(args.rapid), spindle_accel_rpm_per_s=float(args.spindle_accel))
+
+    try:
+        process_file(
+            args.input,
+            out_dir,
+            cfg,
+            observers=observers,
+            index=bool(args.index),
+            history_db=args.history_db,
+            output_format=args.output_format,
+            pipelined=bool(args.pipelined),
+            cycle_time=cycle_time,
+            tool_table=tool_table,
+            incremental=bool(args.incremental),
+            subprograms=bool(args.subprograms),
+        )
+    finally:
+        for obs in observers:
+            obs.close()
     return 0
 
 
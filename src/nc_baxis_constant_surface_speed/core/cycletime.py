@@ -0,0 +1,151 @@
+"""
+Cycle-time estimate, and how much of it the inserted S changes cost.
+
+Motion: modal G0 / G1 / G2 / G3, G90 / G91, F (mm/min, G94 assumed).
+    G0     each axis at its rapid rate, time of the slowest axis
+    G1-G3  XYZ path length / F; pure B/C moves: angle / F (deg/min)
+           arcs are counted by their chord (slight underestimate)
+Spindle: every speed change while ON (M03 spin-up, S words, inserted S)
+costs |ΔS| / spindle_accel_rpm_per_s, added serially (the control waits for
+speed arrival). M05 spin-down is not counted.
+
+Two spindle tracks run side by side: the program as written and the program
+with the inserted S lines. added_s is the ramp time difference; motion is
+identical in both.
+
+CycleTimeEstimator is an InjectorObserver: it keeps running totals while the
+conversion streams the lines (spindle words as parsed by core.parser), so the
+program is read once and nothing is stored per line or per insert.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+
+from .injector import InjectorObserver
+from .parser import ParsedLine, strip_paren_comments
+from .report import CycleTime
+
+RE_WORD = re.compile(r"([GFXYZBC])\s*([+\-]?(?:\d+(?:\.\d*)?|\.\d+))")
+
+_LINEAR = "XYZ"
+_ROTARY = "BC"
+
+
+@dataclass(frozen=True)
+class CycleTimeModel:
+    rapid_mm_per_min: float = 20000.0
+    rapid_deg_per_min: float = 7200.0  # B / C
+    default_feed_mm_per_min: float = 1000.0  # until the first F word
+    spindle_accel_rpm_per_s: float = 3000.0
+
+
+class _Spindle:
+    __slots__ = ("on", "cmd", "speed", "ramp_s")
+
+    def __init__(self) -> None:
+        self.on = False
+        self.cmd = 0  # modal S
+        self.speed = 0
+        self.ramp_s = 0.0
+
+    def update(self, accel: float) -> None:
+        speed = self.cmd if self.on else 0
+        if speed and speed != self.speed:
+            self.ramp_s += abs(speed - self.speed) / accel
+        self.speed = speed
+
+
+class CycleTimeEstimator(InjectorObserver):
+    """Pass as an observer (needs the line text, see InjectorObserver.on_line); result() after the run."""
+
+    def __init__(self, model: CycleTimeModel = CycleTimeModel()) -> None:
+        self.accel = max(float(model.spindle_accel_rpm_per_s), 1e-9)
+        self.base = _Spindle()  # program as written
+        self.act = _Spindle()  # with inserted S lines
+
+        self.pos = {a: 0.0 for a in _LINEAR + _ROTARY}
+        self.motion_code = 0
+        self.absolute = True
+        self.feed = float(model.default_feed_mm_per_min)
+        self.rapid_lin = float(model.rapid_mm_per_min)
+        self.rapid_rot = float(model.rapid_deg_per_min)
+        self.motion_s = 0.0
+
+    def on_s(self, line_no: int, s_rpm: int, inserted: bool) -> None:
+        if inserted:
+            self.act.cmd = s_rpm
+            self.act.update(self.accel)
+
+    def on_line(self, line_no: int, text: str, parsed: ParsedLine) -> None:
+        base, act = self.base, self.act
+        spindle_changed = False
+        if parsed.s_rpm is not None:
+            base.cmd = act.cmd = parsed.s_rpm
+            spindle_changed = True
+        if parsed.has_m03:
+            base.on = act.on = True
+            spindle_changed = True
+        if parsed.has_m05:
+            base.on = act.on = False
+            spindle_changed = True
+        if spindle_changed:
+            base.update(self.accel)
+            act.update(self.accel)
+
+        if "(" in text or ")" in text:
+            text = strip_paren_comments(text)
+        words = RE_WORD.findall(text)
+        if not words:
+            return
+
+        pos = self.pos
+        axes = []
+        for word in words:
+            letter = word[0]
+            if letter == "G":
+                g = float(word[1])
+                if g in (0.0, 1.0, 2.0, 3.0):
+                    self.motion_code = int(g)
+                elif g == 90.0:
+                    self.absolute = True
+                elif g == 91.0:
+                    self.absolute = False
+            elif letter == "F":
+                f = float(word[1])
+                if f > 0.0:
+                    self.feed = f
+            else:
+                axes.append(word)
+
+        if not axes:
+            return
+        lin2 = 0.0  # squared XYZ distance
+        lin_max = rot_max = 0.0  # largest single-axis move
+        for letter, value in axes:
+            v = float(value)
+            d = v - pos[letter] if self.absolute else v
+            pos[letter] += d
+            d = abs(d)
+            if letter in _ROTARY:
+                rot_max = max(rot_max, d)
+            else:
+                lin2 += d * d
+                lin_max = max(lin_max, d)
+
+        if self.motion_code == 0:
+            t_min = max(lin_max / self.rapid_lin, rot_max / self.rapid_rot)
+        else:
+            t_min = (math.sqrt(lin2) if lin2 else rot_max) / self.feed
+        self.motion_s += t_min * 60.0
+
+    def result(self) -> CycleTime:
+        ramp_s = self.act.ramp_s
+        return CycleTime(
+            total_s=round(self.motion_s + ramp_s, 3),
+            motion_s=round(self.motion_s, 3),
+            spindle_ramp_s=round(ramp_s, 3),
+            added_s=round(ramp_s - self.base.ramp_s, 3),
+        )
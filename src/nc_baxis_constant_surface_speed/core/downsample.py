@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from typing import List, Sequence, Tuple
+
+
+def visible_range(xs: Sequence[float], x_lo: float, x_hi: float) -> Tuple[int, int]:
+    """
+    Index range [i0, i1) of the samples inside [x_lo, x_hi], widened by one sample
+    on each side so lines still run to the edges of the view. xs must be sorted.
+    """
+    i0 = max(0, bisect_left(xs, x_lo) - 1)
+    i1 = min(len(xs), bisect_right(xs, x_hi) + 1)
+    return i0, i1
+
+
+def minmax_downsample(xs: Sequence[float], ys: Sequence[float], i0: int, i1: int, n_buckets: int) -> List[int]:
+    """
+    Keep the first, last, min and max sample of each x bucket.
+    Returns sorted indices into xs/ys; at most 4 * n_buckets of them.
+    Preserves every spike, which is what matters for clamp checks.
+    """
+    n = i1 - i0
+    if n <= 0:
+        return []
+    if n_buckets <= 0 or n <= 4 * n_buckets:
+        return list(range(i0, i1))
+
+    x_first = float(xs[i0])
+    span = float(xs[i1 - 1]) - x_first
+    if span <= 0.0:
+        return [i0, i1 - 1]
+
+    out: List[int] = []
+    bucket = -1
+    first = lo = hi = last = i0
+    for i in range(i0, i1):
+        b = int((float(xs[i]) - x_first) / span * n_buckets)
+        if b >= n_buckets:
+            b = n_buckets - 1
+        if b != bucket:
+            if bucket >= 0:
+                out.extend(sorted({first, lo, hi, last}))
+            bucket = b
+            first = lo = hi = last = i
+            continue
+        y = ys[i]
+        if y < ys[lo]:
+            lo = i
+        if y > ys[hi]:
+            hi = i
+        last = i
+    out.extend(sorted({first, lo, hi, last}))
+    return out
+
+
+def lttb_downsample(xs: Sequence[float], ys: Sequence[float], i0: int, i1: int, n_out: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets: pick n_out indices that keep the visual shape.
+    Smoother than min/max but may drop single-sample spikes.
+    """
+    n = i1 - i0
+    if n <= 0:
+        return []
+    if n_out >= n or n_out < 3:
+        return list(range(i0, i1))
+
+    out = [i0]
+    every = (n - 2) / (n_out - 2)
+    a = i0
+    for k in range(n_out - 2):
+        # Average point of the next bucket
+        nb0 = i0 + 1 + int((k + 1) * every)
+        nb1 = min(i0 + 1 + int((k + 2) * every), i1)
+        if nb0 >= nb1:
+            nb0, nb1 = i1 - 1, i1
+        avg_x = sum(float(xs[j]) for j in range(nb0, nb1)) / (nb1 - nb0)
+        avg_y = sum(float(ys[j]) for j in range(nb0, nb1)) / (nb1 - nb0)
+
+        # Current bucket: keep the point forming the largest triangle with a and the average
+        b0 = i0 + 1 + int(k * every)
+        b1 = i0 + 1 + int((k + 1) * every)
+        ax = float(xs[a])
+        ay = float(ys[a])
+        best = b0
+        best_area = -1.0
+        for j in range(b0, b1):
+            area = abs((ax - avg_x) * (float(ys[j]) - ay) - (ax - float(xs[j])) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        out.append(best)
+        a = best
+    out.append(i1 - 1)
+    return out
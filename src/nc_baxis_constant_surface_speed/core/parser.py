@@ -9,6 +9,8 @@ RE_B = re.compile(r"B([+\-]?(?:\d+(?:\.\d*)?|\.\d+))")
 RE_S = re.compile(r"S(\d+)")
 RE_M03 = re.compile(r"M0?3(?!\d)")
 RE_M05 = re.compile(r"M0?5(?!\d)")
+RE_M06 = re.compile(r"M0?6(?!\d)")
+RE_T = re.compile(r"T(\d+)")
 
 
 def strip_paren_comments(s: str) -> str:
@@ -37,6 +39,8 @@ class ParsedLine:
     has_m05: bool
     b_deg: Optional[float]
     s_rpm: Optional[int]
+    tool: Optional[int] = None  # T word (tool select)
+    has_m06: bool = False  # tool change
 
 
 def parse_line(line: str) -> ParsedLine:
@@ -61,4 +65,13 @@ def parse_line(line: str) -> ParsedLine:
         except ValueError:
             s_rpm = None
 
-    return ParsedLine(has_m03=has_m03, has_m05=has_m05, b_deg=b_deg, s_rpm=s_rpm)
+    tool: Optional[int] = None
+    has_m06 = False
+    if "T" in core:
+        mt = RE_T.search(core)
+        if mt:
+            tool = int(mt.group(1))
+    if "M" in core:
+        has_m06 = bool(RE_M06.search(core))
+
+    return ParsedLine(has_m03=has_m03, has_m05=has_m05, b_deg=b_deg, s_rpm=s_rpm, tool=tool, has_m06=has_m06)
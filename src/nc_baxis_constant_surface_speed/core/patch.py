@@ -0,0 +1,224 @@
+"""
+Compact insertion-patch output (<stem>-bcss<suffix>.bcsspatch).
+
+Instead of a full -bcss copy (which differs from the source in ~2% of lines),
+only the inserted lines are stored. Text format:
+
+    BCSSPATCH 1 {"source_size": ..., "source_sha256": ..., "encoding": ...,
+                 "eof_newline": ..., "insertions": N, "output_size": ...,
+                 "output_sha256": ...}
+    <byte offset>\t<line no>\t<inserted text>\t<CRLF|LF>
+    ...
+
+An insertion goes before the source line starting at <byte offset>.
+eof_newline ("CRLF"/"LF"/null) is appended if the source's last line is
+unterminated, exactly like the full output does.
+
+apply_patch() / iter_patched() stream the source through the patch, so
+drip-feeding to a machine never needs the full copy on disk.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from .sink import OutputSink
+
+PATCH_SUFFIX = ".bcsspatch"
+PATCH_MAGIC = "BCSSPATCH"
+PATCH_VERSION = 1
+
+_NL_NAMES = {b"\r\n": "CRLF", b"\n": "LF"}
+_NL_BYTES = {v: k for k, v in _NL_NAMES.items()}
+
+
+class PatchError(ValueError):
+    pass
+
+
+class PatchSink(OutputSink):
+    """
+    Records insertions instead of writing the program.
+    Records are spooled (to disk past chunk_size) and the header is written in finish(),
+    once the source hash and output hash are known.
+    """
+
+    def __init__(self, path: Path, chunk_size: int = 1 << 20) -> None:
+        self.path = path
+        self._records = tempfile.SpooledTemporaryFile(max_size=chunk_size, mode="w+b")
+        self._hash = hashlib.sha256()  # of the output the patch produces
+        self._out_size = 0
+        self._count = 0
+        self._eof_newline: Optional[bytes] = None
+        self._chunk_size = chunk_size
+
+    def _out(self, data: bytes) -> None:
+        self._hash.update(data)
+        self._out_size += len(data)
+
+    def insert(self, offset: int, line_no: int, data: bytes) -> None:
+        text = data.rstrip(b"\r\n")
+        nl = data[len(text) :]
+        if nl not in _NL_NAMES or b"\t" in text or b"\n" in text:
+            raise PatchError(f"cannot encode inserted line {data!r}")
+        self._records.write(b"%d\t%d\t%s\t%s\n" % (offset, line_no, text, _NL_NAMES[nl].encode("ascii")))
+        self._count += 1
+        self._out(data)
+
+    def line(self, line_bytes: bytes, out_line: bytes) -> None:
+        if out_line != line_bytes:
+            # Only legal difference: newline added to an unterminated last line.
+            if line_bytes.endswith(b"\n") or not out_line.startswith(line_bytes):
+                raise PatchError("patch output needs a byte-exact round-trip of the source; use full output")
+            self._out(line_bytes)
+            self.eof_newline(out_line[len(line_bytes) :])
+            return
+        self._out(out_line)
+
+    def copy(self, fin: BinaryIO, n: int) -> None:
+        while n > 0:
+            chunk = fin.read(min(n, self._chunk_size))
+            if not chunk:
+                raise IOError("input ended early (changed while processing?)")
+            self._out(chunk)
+            n -= len(chunk)
+
+    def eof_newline(self, nl: bytes) -> None:
+        self._eof_newline = nl
+        self._out(nl)
+
+    @property
+    def output_sha256(self) -> Optional[str]:
+        return self._hash.hexdigest()
+
+    def discard(self) -> None:
+        self._records.close()
+
+    def finish(self, source_size: int, source_sha256: str, encoding: str) -> None:
+        header = {
+            "source_size": source_size,
+            "source_sha256": source_sha256,
+            "encoding": encoding,
+            "eof_newline": None if self._eof_newline is None else _NL_NAMES[self._eof_newline],
+            "insertions": self._count,
+            "output_size": self._out_size,
+            "output_sha256": self._hash.hexdigest(),
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("wb") as f:
+            f.write(f"{PATCH_MAGIC} {PATCH_VERSION} {json.dumps(header)}\n".encode("ascii"))
+            self._records.seek(0)
+            while True:
+                chunk = self._records.read(self._chunk_size)
+                if not chunk:
+                    break
+                f.write(chunk)
+        self._records.close()
+        os.replace(tmp, self.path)
+
+
+def read_patch_header(f: BinaryIO) -> dict:
+    line = f.readline().decode("ascii", errors="replace")
+    parts = line.split(" ", 2)
+    if len(parts) != 3 or parts[0] != PATCH_MAGIC:
+        raise PatchError("not a BCSS patch file")
+    if parts[1] != str(PATCH_VERSION):
+        raise PatchError(f"unsupported patch version {parts[1]}")
+    return json.loads(parts[2])
+
+
+def _iter_records(f: BinaryIO, encoding: str) -> Iterator[Tuple[int, bytes]]:
+    for raw in f:
+        off, _, text, nl = raw.rstrip(b"\n").split(b"\t")
+        yield int(off), text.decode("ascii").encode(encoding) + _NL_BYTES[nl.decode("ascii")]
+
+
+def _sha256_of(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def iter_patched(
+    source_path: Path,
+    patch_path: Path,
+    *,
+    verify: bool = True,
+    chunk_size: int = 1 << 16,
+) -> Iterator[bytes]:
+    """
+    Yield the patched program in chunks (for stdout / drip-feed).
+
+    verify=True hashes the source before anything is yielded, so a wrong
+    source is rejected up front. The output hash is checked at the end
+    (PatchError after the last chunk if it does not match).
+    """
+    with patch_path.open("rb") as pf:
+        header = read_patch_header(pf)
+        if source_path.stat().st_size != header["source_size"]:
+            raise PatchError(f"source size mismatch: {source_path}")
+        if verify and _sha256_of(source_path) != header["source_sha256"]:
+            raise PatchError(f"source hash mismatch: {source_path}")
+
+        out_hash = hashlib.sha256()
+        pos = 0
+        with source_path.open("rb") as src:
+
+            def copy_to(end: int) -> Iterator[bytes]:
+                nonlocal pos
+                while pos < end:
+                    chunk = src.read(min(chunk_size, end - pos))
+                    if not chunk:
+                        raise PatchError("source ended early")
+                    pos += len(chunk)
+                    out_hash.update(chunk)
+                    yield chunk
+
+            for offset, data in _iter_records(pf, header["encoding"]):
+                if offset < pos:
+                    raise PatchError("patch records out of order")
+                yield from copy_to(offset)
+                out_hash.update(data)
+                yield data
+
+            yield from copy_to(header["source_size"])
+
+        if header.get("eof_newline"):
+            data = _NL_BYTES[header["eof_newline"]]
+            out_hash.update(data)
+            yield data
+
+    if out_hash.hexdigest() != header["output_sha256"]:
+        raise PatchError("patched output hash mismatch")
+
+
+def apply_patch(source_path: Path, patch_path: Path, out_path: Path, *, verify: bool = True) -> None:
+    """Write the patched program to out_path (atomically: only replaced if fully verified)."""
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    try:
+        with tmp.open("wb") as f:
+            for chunk in iter_patched(source_path, patch_path, verify=verify):
+                f.write(chunk)
+        os.replace(tmp, out_path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def default_output_path(patch_path: Path) -> Path:
+    """a-bcss.EIA.bcsspatch -> a-bcss.EIA"""
+    name = patch_path.name
+    if name.endswith(PATCH_SUFFIX):
+        name = name[: -len(PATCH_SUFFIX)]
+    else:
+        name += ".out"
+    return patch_path.with_name(name)
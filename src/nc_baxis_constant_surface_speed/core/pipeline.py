@@ -0,0 +1,187 @@
+"""
+Pipelined I/O for process_file(pipelined=True).
+
+    reader thread --(bounded queue of line batches)--> transform loop (caller)
+    transform loop --(bounded queue of output chunks)--> writer thread
+
+Blocking reads and writes (slow on SMB/NFS mounts) overlap with the
+CPU-bound parsing in the caller. Queue depth x block size caps the memory
+in flight. Errors from either thread are re-raised in the caller; a set
+cancel event stops all three stages with PipelineCancelled.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+DEFAULT_DEPTH = 4
+
+# Poll interval for blocking queue ops, so cancellation / peer errors are noticed.
+_POLL_S = 0.1
+
+_EOF = object()
+
+
+class PipelineCancelled(Exception):
+    pass
+
+
+def _put(q: "queue.Queue", item, stop: threading.Event) -> bool:
+    """Blocking put that gives up (False) once stop is set."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_S)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class PrefetchReader:
+    """
+    Iterates the lines of a file (split like readline(): on b"\\n", keepends)
+    while a background thread reads the next blocks.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        depth: int = DEFAULT_DEPTH,
+        cancel: Optional[threading.Event] = None,
+    ) -> None:
+        self.path = path
+        self.block_size = max(1, block_size)
+        self.cancel = cancel or threading.Event()
+        self._q: "queue.Queue" = queue.Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._read_loop, name="bcss-reader", daemon=True)
+
+    def _read_loop(self) -> None:
+        carry = b""
+        try:
+            with self.path.open("rb") as f:
+                while not self._stop.is_set():
+                    if self.cancel.is_set():
+                        _put(self._q, PipelineCancelled("cancelled"), self._stop)
+                        return
+                    block = f.read(self.block_size)
+                    if not block:
+                        break
+                    parts = (carry + block).split(b"\n")
+                    carry = parts.pop()
+                    if parts:
+                        lines: List[bytes] = [p + b"\n" for p in parts]
+                        if not _put(self._q, lines, self._stop):
+                            return
+            if carry:
+                _put(self._q, [carry], self._stop)
+            _put(self._q, _EOF, self._stop)
+        except BaseException as e:  # delivered to the consumer
+            _put(self._q, e, self._stop)
+
+    def __iter__(self) -> Iterator[bytes]:
+        self._thread.start()
+        try:
+            while True:
+                try:
+                    item = self._q.get(timeout=_POLL_S)
+                except queue.Empty:
+                    if self.cancel.is_set():
+                        raise PipelineCancelled("cancelled")
+                    continue
+                if item is _EOF:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                if self.cancel.is_set():
+                    raise PipelineCancelled("cancelled")
+                yield from item
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+class BackgroundWriter:
+    """
+    File-like write() that hands chunks of ~chunk_size bytes to a writer thread.
+    close() flushes and joins; abort() drops pending data. A failed write is
+    re-raised from the next write() / close() in the caller.
+    """
+
+    def __init__(
+        self,
+        f: BinaryIO,
+        chunk_size: int = DEFAULT_BLOCK_SIZE,
+        depth: int = DEFAULT_DEPTH,
+        cancel: Optional[threading.Event] = None,
+    ) -> None:
+        self._f = f
+        self._chunk_size = chunk_size
+        self.cancel = cancel or threading.Event()
+        self._buf: List[bytes] = []
+        self._buf_len = 0
+        self._q: "queue.Queue" = queue.Queue(maxsize=max(1, depth))
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._write_loop, name="bcss-writer", daemon=True)
+        self._thread.start()
+
+    def _write_loop(self) -> None:
+        try:
+            while True:
+                try:
+                    item = self._q.get(timeout=_POLL_S)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        return
+                    continue
+                if item is _EOF or self._stop.is_set():
+                    return
+                self._f.write(item)
+        except BaseException as e:
+            self._error = e
+            self._stop.set()
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise self._error
+        if self.cancel.is_set():
+            raise PipelineCancelled("cancelled")
+
+    def _hand_off(self) -> None:
+        if not self._buf:
+            return
+        chunk = b"".join(self._buf)
+        self._buf.clear()
+        self._buf_len = 0
+        if not _put(self._q, chunk, self._stop):
+            self._check()
+            raise RuntimeError("writer stopped")
+        self._check()
+
+    def write(self, data: bytes) -> int:
+        self._buf.append(bytes(data))
+        self._buf_len += len(data)
+        if self._buf_len >= self._chunk_size:
+            self._hand_off()
+        return len(data)
+
+    def close(self) -> None:
+        self._hand_off()
+        _put(self._q, _EOF, self._stop)
+        self._thread.join()
+        self._check()
+
+    def abort(self) -> None:
+        self._stop.set()
+        self._buf.clear()
+        self._thread.join()
@@ -1,13 +1,52 @@
 from __future__ import annotations
 
+import codecs
+import hashlib
 import json
+import os
+import threading
+import time
+from dataclasses import asdict
 from pathlib import Path
-from typing import Tuple
+from typing import BinaryIO, Generator, Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple, Union
 
 from .config import BcssConfig
-from .injector import Injector
-from .report import Report
+from .cycletime import CycleTimeEstimator, CycleTimeModel
+from .fastcopy import copy_file
+from .history import HistoryStore
+from .incremental import (
+    MANIFEST_SUFFIX,
+    BlockScanner,
+    BlockStatsCapture,
+    ManifestReader,
+    ManifestWriter,
+    apply_block_stats,
+    load_manifest,
+)
+from .index import NEWLINE_BYTES, NL_CRLF, NL_LF, NL_NONE, IndexWriter, ProgramIndex
+from .injector import Injector, InjectorObserver
+from .parser import ParsedLine, parse_line
+from .patch import PATCH_SUFFIX, PatchSink
+from .pipeline import BackgroundWriter, PipelineCancelled, PrefetchReader
+from .report import IncrementalStats, Report, SubprogramStats
 from .rpm_model import RpmModel
+from .sink import FileSink, OutputSink
+from .subprogram import SubprogramRunner, scan_structure
+from .tooltable import ToolTable
+
+OUTPUT_FORMATS = ("full", "patch")
+
+# Encoding / newline sniffing looks at this much of the file head.
+SNIFF_BYTES = 65536
+
+# Block size of every read / write / copy buffer in the processing paths.
+# Together with the line length this bounds their memory, whatever the file size.
+IO_CHUNK_BYTES = 1 << 20
+
+
+def _decode_sample(sample: bytes, encoding: str, truncated: bool) -> None:
+    """Strict decode; a cut-off character at the end of a truncated sample is not an error."""
+    codecs.getincrementaldecoder(encoding)(errors="strict").decode(sample, final=not truncated)
 
 
 def _detect_encoding_and_newline(path: Path) -> Tuple[str, bytes]:
@@ -15,7 +54,10 @@ def _detect_encoding_and_newline(path: Path) -> Tuple[str, bytes]:
     Decide encoding (utf-8 or cp932) and newline bytes (\r\n or \n).
     Output must follow input.
     """
-    sample = path.read_bytes()[:65536]
+    with path.open("rb") as f:
+        sample = f.read(SNIFF_BYTES)
+        # A full-size sample may end inside a multi-byte character.
+        truncated = len(sample) == SNIFF_BYTES and bool(f.read(1))
 
     # newline detection
     if b"\r\n" in sample:
@@ -27,11 +69,11 @@ def _detect_encoding_and_newline(path: Path) -> Tuple[str, bytes]:
 
     # encoding detection (strict)
     try:
-        sample.decode("utf-8", errors="strict")
+        _decode_sample(sample, "utf-8", truncated)
         enc = "utf-8"
     except UnicodeDecodeError:
         try:
-            sample.decode("cp932", errors="strict")
+            _decode_sample(sample, "cp932", truncated)
             enc = "cp932"
         except UnicodeDecodeError:
             # Fallback: keep utf-8 but replace errors to avoid crash
@@ -41,58 +83,500 @@ def _detect_encoding_and_newline(path: Path) -> Tuple[str, bytes]:
     return enc, newline_bytes
 
 
-def _make_output_paths(input_path: Path, out_dir: Path) -> Tuple[Path, Path]:
+def _make_output_paths(input_path: Path, out_dir: Path, output_format: str = "full") -> Tuple[Path, Path]:
     stem = input_path.stem  # "xxx" from "xxx.EIA"
     out_path = out_dir / f"{stem}-bcss{input_path.suffix}"
+    if output_format == "patch":
+        out_path = out_path.with_name(out_path.name + PATCH_SUFFIX)
     report_path = out_dir / f"{stem}-bcss.report.json"
     return out_path, report_path
 
 
-def process_file(input_path: Path, out_dir: Path, cfg: BcssConfig) -> None:
-    input_path = input_path.resolve()
-    out_dir = out_dir.resolve()
+class _RunInfo(NamedTuple):
+    input_sha256: bytes
+    input_size: int
+    encoding: str
 
-    encoding, newline_bytes = _detect_encoding_and_newline(input_path)
-    out_path, report_path = _make_output_paths(input_path, out_dir)
 
-    report = Report.create(input_path, out_path, report_path, cfg)
-    rpm_model = RpmModel(cfg)
-    injector = Injector(rpm_model, report)
-
-    # Binary line-by-line to preserve original line endings precisely.
-    with input_path.open("rb") as fin, out_path.open("wb") as fout:
+def _iter_lines(input_path: Path) -> Generator[bytes, None, None]:
+    with input_path.open("rb") as fin:
         while True:
             line_bytes = fin.readline()
             if not line_bytes:
                 break
+            yield line_bytes
+
+
+def _process_text(
+    lines: Iterable[bytes],
+    sink: OutputSink,
+    injector: Injector,
+    encoding: str,
+    newline_bytes: bytes,
+    index_writer: Optional[IndexWriter] = None,
+) -> _RunInfo:
+    # Binary line-by-line to preserve original line endings precisely.
+    offset = 0
+    in_hash = hashlib.sha256()
+    for line_bytes in lines:
+        in_hash.update(line_bytes)
+
+        # Keep original line ending for this line if present; otherwise use detected newline.
+        if line_bytes.endswith(b"\r\n"):
+            nl = b"\r\n"
+            body = line_bytes[:-2]
+            nl_kind = NL_CRLF
+        elif line_bytes.endswith(b"\n"):
+            nl = b"\n"
+            body = line_bytes[:-1]
+            nl_kind = NL_LF
+        else:
+            nl = newline_bytes
+            body = line_bytes
+            nl_kind = NL_NONE
+
+        # Decode body
+        try:
+            text = body.decode(encoding, errors="strict")
+        except UnicodeDecodeError:
+            # If we picked utf-8 but actual was cp932 (or vice versa), try the other
+            alt = "cp932" if encoding == "utf-8" else "utf-8"
+            text = body.decode(alt, errors="replace")
+            encoding = alt  # switch for output consistency with what we can decode
+
+        parsed = parse_line(text)
+        s_insert = injector.process_parsed(parsed, text)
+        out_line = text.encode(encoding, errors="strict") + nl
+
+        if index_writer is not None:
+            # Index is only usable if copying input bytes reproduces this output.
+            if out_line != (line_bytes if nl_kind != NL_NONE else line_bytes + nl):
+                index_writer.lossless = False
+            index_writer.add(offset, parsed, nl_kind)
+
+        if s_insert is not None:
+            inserted = f"S{s_insert}".encode(encoding, errors="strict") + nl
+            sink.insert(offset, injector.report.detect.total_lines, inserted)
+        sink.line(line_bytes, out_line)
+        offset += len(line_bytes)
 
-            # Keep original line ending for this line if present; otherwise use detected newline.
-            if line_bytes.endswith(b"\r\n"):
-                nl = b"\r\n"
-                body = line_bytes[:-2]
-            elif line_bytes.endswith(b"\n"):
-                nl = b"\n"
-                body = line_bytes[:-1]
-            else:
-                nl = newline_bytes
-                body = line_bytes
-
-            # Decode body
+    digest = in_hash.digest()
+    if index_writer is not None:
+        index_writer.close(encoding, newline_bytes, digest)
+    return _RunInfo(digest, offset, encoding)
+
+
+_PLAIN_LINE = ParsedLine(has_m03=False, has_m05=False, b_deg=None, s_rpm=None)
+
+
+def _scan_unchanged(
+    input_path: Path, injector: Injector, encoding: str, chunk_size: int
+) -> Optional[_RunInfo]:
+    """
+    Cheap pre-scan for the zero-change fast path: runs the injector over the
+    program and gives up (None) at the first S it would insert, or at any line
+    whose output bytes would differ from the input (re-encoding, unterminated
+    last line). ASCII lines without B / S / M / T are neither decoded nor parsed.
+    """
+    in_hash = hashlib.sha256()
+    size = 0
+    carry = b""
+    process = injector.process_parsed
+    with input_path.open("rb") as fin:
+        while True:
+            block = fin.read(chunk_size)
+            if not block:
+                break
+            in_hash.update(block)
+            size += len(block)
+            lines = (carry + block).split(b"\n")
+            carry = lines.pop()
+            for body in lines:
+                if b"B" not in body and b"S" not in body and b"M" not in body and b"T" not in body and body.isascii():
+                    parsed = _PLAIN_LINE
+                else:
+                    if body.endswith(b"\r"):
+                        body = body[:-1]
+                    try:
+                        text = body.decode(encoding, errors="strict")
+                    except UnicodeDecodeError:
+                        alt = "cp932" if encoding == "utf-8" else "utf-8"
+                        text = body.decode(alt, errors="replace")
+                        encoding = alt
+                    try:
+                        if text.encode(encoding, errors="strict") != body:
+                            return None
+                    except UnicodeEncodeError:
+                        return None  # the text path raises this; let it
+                    parsed = parse_line(text)
+                if process(parsed) is not None:
+                    return None
+    if carry:
+        return None  # the text path appends a newline to it
+    return _RunInfo(in_hash.digest(), size, encoding)
+
+
+def _fast_copy(input_path: Path, out_path: Path, injector: Injector) -> Optional[_RunInfo]:
+    """Copy input to output if the conversion would not change a byte (None otherwise)."""
+    st = input_path.stat()
+    encoding, _ = _detect_encoding_and_newline(input_path)
+    info = _scan_unchanged(input_path, injector, encoding, IO_CHUNK_BYTES)
+    if info is None:
+        return None
+    copy_file(input_path, out_path, IO_CHUNK_BYTES)
+    st2 = input_path.stat()
+    if (st.st_size, st.st_mtime_ns) != (st2.st_size, st2.st_mtime_ns) or st2.st_size != info.input_size:
+        return None  # changed while scanning; the normal path overwrites out_path
+    return info
+
+
+def _process_indexed(index: ProgramIndex, input_path: Path, sink: OutputSink, injector: Injector) -> _RunInfo:
+    """
+    Same result as _process_text, driven by the sidecar index: no decoding or parsing.
+    Output is the input bytes with S lines spliced in at the recorded line offsets.
+    """
+    default_nl = index.default_newline
+    last_nl = NL_NONE
+    pos = 0
+    with input_path.open("rb") as fin:
+        for offset, parsed, nl in index.records():
+            s_insert = injector.process_parsed(parsed)
+            if s_insert is not None:
+                sink.copy(fin, offset - pos)
+                pos = offset
+                inserted = b"S%d" % s_insert + NEWLINE_BYTES.get(nl, default_nl)
+                sink.insert(offset, injector.report.detect.total_lines, inserted)
+            last_nl = nl
+
+        sink.copy(fin, index.input_size - pos)
+        if index.line_count and last_nl == NL_NONE:
+            sink.eof_newline(default_nl)  # text path terminates the last line too
+    return _RunInfo(index.sha256, index.input_size, index.encoding)
+
+
+def _run(
+    input_path: Path,
+    sink: OutputSink,
+    injector: Injector,
+    use_index: bool,
+    pipelined: bool = False,
+    cancel: Optional[threading.Event] = None,
+) -> _RunInfo:
+    if use_index:
+        index = ProgramIndex.open(input_path, chunk_size=IO_CHUNK_BYTES)
+        if index is not None:
+            with index:
+                return _process_indexed(index, input_path, sink, injector)
+
+    encoding, newline_bytes = _detect_encoding_and_newline(input_path)
+    index_writer: Optional[IndexWriter] = None
+    if use_index:
+        try:
+            index_writer = IndexWriter(input_path)
+        except OSError:
+            index_writer = None  # read-only input folder: just run without a sidecar
+
+    lines: Union[PrefetchReader, Generator[bytes, None, None]] = (
+        PrefetchReader(input_path, block_size=IO_CHUNK_BYTES, cancel=cancel) if pipelined else _iter_lines(input_path)
+    )
+    try:
+        return _process_text(lines, sink, injector, encoding, newline_bytes, index_writer)
+    except BaseException:
+        if index_writer is not None:
+            index_writer.discard()
+        raise
+    finally:
+        # Stops / joins the reader thread (or closes the generator) and with it the
+        # input handle now, also when the loop above stopped part-way.
+        lines.close()
+
+
+def _read_lines(fin: BinaryIO, n: int) -> Iterator[bytes]:
+    for _ in range(n):
+        yield fin.readline()
+
+
+def _run_incremental(
+    input_path: Path, out_path: Path, manifest_path: Path, injector: Injector
+) -> Tuple[_RunInfo, str, IncrementalStats]:
+    """
+    Full-format conversion that reuses the previous output for the unchanged
+    prefix / suffix blocks (see core.incremental). Returns the run info, the
+    output sha256 and the reuse stats; writes the new manifest.
+    """
+    report = injector.report
+    config = asdict(injector.rpm_model.cfg)
+    detected, newline_bytes = _detect_encoding_and_newline(input_path)
+    encoding = detected  # text path may switch it part-way (kept per boundary)
+
+    old = load_manifest(manifest_path)
+    if old is not None and not old.usable_for(config, detected, newline_bytes, out_path):
+        old = None
+    stats = IncrementalStats(manifest_used=old is not None)
+    # Input offset in the new file minus that in the old one, for blocks at the same distance from the end.
+    shift = input_path.stat().st_size - old.input_size if old is not None else 0
+
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    scanner = BlockScanner(input_path, IO_CHUNK_BYTES)
+    writer = ManifestWriter(manifest_path, IO_CHUNK_BYTES)
+    reader = ManifestReader(old) if old is not None else None
+    try:
+        with scanner, input_path.open("rb") as fin, tmp_path.open("wb") as f:
+            sink = FileSink(f, IO_CHUNK_BYTES)
+            fold = out_path.open("rb") if old is not None else None
             try:
-                text = body.decode(encoding, errors="strict")
-            except UnicodeDecodeError:
-                # If we picked utf-8 but actual was cp932 (or vice versa), try the other
-                alt = "cp932" if encoding == "utf-8" else "utf-8"
-                text = body.decode(alt, errors="replace")
-                encoding = alt  # switch for output consistency with what we can decode
+                pos = 0  # input offset of the block
+                in_prefix = True
+                for block in scanner:
+                    boundary = (injector.snapshot(), encoding)
+                    rec = reader.find(pos if in_prefix else pos - shift) if reader is not None else None
+                    old_block = rec.block if rec is not None else None
+                    if old_block is not None and old_block.same_input(block) and rec.boundary == boundary:
+                        # Same input from the same state: the previous output, stats and end state.
+                        fold.seek(rec.out_offset)  # type: ignore[union-attr]
+                        sink.copy(fold, old_block.out_bytes)  # type: ignore[arg-type]
+                        apply_block_stats(report, rec.stats)  # type: ignore[arg-type]
+                        writer.add_record(rec)
+                        state, encoding = reader.advance().boundary  # type: ignore[union-attr]
+                        injector.restore(state)
+                        fin.seek(pos + block.in_bytes)
+                        stats.reused_blocks += 1
+                        stats.reused_lines += block.lines
+                    else:
+                        in_prefix = False
+                        capture = BlockStatsCapture(report)
+                        out0 = f.tell()
+                        encoding = _process_text(
+                            _read_lines(fin, block.lines), sink, injector, encoding, newline_bytes
+                        ).encoding
+                        block.out_bytes = f.tell() - out0
+                        writer.add(block, capture.finish(), boundary)
+                        stats.processed_blocks += 1
+                        stats.processed_lines += block.lines
+                    pos += block.in_bytes
+                end = (injector.snapshot(), encoding)
+            finally:
+                if fold is not None:
+                    fold.close()
+                if reader is not None:
+                    reader.close()
+        os.replace(tmp_path, out_path)
+        st = out_path.stat()
+        writer.finish(
+            dict(
+                config=config,
+                encoding=detected,
+                newline=newline_bytes.decode("ascii"),
+                output_size=st.st_size,
+                output_mtime_ns=st.st_mtime_ns,
+            ),
+            end,
+        )
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        writer.close()
+
+    info = _RunInfo(scanner.sha256.digest(), scanner.size, encoding)
+    return info, sink.output_sha256, stats  # type: ignore[return-value]
+
+
+def _run_subprograms(input_path: Path, sink: OutputSink, injector: Injector) -> _RunInfo:
+    """Conversion with M98 calls run into their subprograms (see core.subprogram)."""
+    encoding, newline_bytes = _detect_encoding_and_newline(input_path)
+    structure = scan_structure(input_path, encoding)
+    if not structure.call_lines:
+        injector.report.subprograms = SubprogramStats()
+        return _process_text(_iter_lines(input_path), sink, injector, encoding, newline_bytes)
+    runner = SubprogramRunner(input_path, structure, injector, encoding, newline_bytes, IO_CHUNK_BYTES)
+    try:
+        runner.run()
+        runner.write(sink)
+    finally:
+        runner.close()
+    return _RunInfo(structure.sha256, structure.size, runner.encoding)
+
+
+def process_file(
+    input_path: Path,
+    out_dir: Path,
+    cfg: BcssConfig,
+    *,
+    observers: Sequence[InjectorObserver] = (),
+    index: bool = False,
+    history_db: Optional[Path] = None,
+    output_format: str = "full",
+    pipelined: bool = False,
+    cancel: Optional[threading.Event] = None,
+    fast_copy: bool = True,
+    cycle_time: Optional[CycleTimeModel] = None,
+    tool_table: Optional[ToolTable] = None,
+    incremental: bool = False,
+    subprograms: bool = False,
+) -> Report:
+    """
+    Convert input_path into <stem>-bcss<suffix> (+ report JSON) in out_dir.
+
+    index=True reuses a valid <name>.bcssidx sidecar next to the input (skipping
+    text parsing), or writes one during this run for the next.
+    history_db: also record the report in this SQLite run history (see core.history).
+    output_format="patch" writes <stem>-bcss<suffix>.bcsspatch (insertions only,
+    see core.patch) instead of the full copy.
+    pipelined=True reads and writes on background threads (core.pipeline) so I/O
+    latency on network shares overlaps with parsing. Setting cancel aborts the
+    run with PipelineCancelled and removes the partial output (pipelined only).
+    fast_copy: when nothing would be inserted (and the bytes round-trip), the
+    output is a plain file copy and the report comes from a cheap pre-scan.
+    Not used with observers, cycle_time, index, pipelined or patch output.
+    cycle_time: also estimate machine time and the share added by the inserted
+    S lines (report.cycle_time, see core.cycletime), in the same pass. Needs
+    the line text, so the sidecar index is neither read nor written.
+    tool_table: switch config at each tool change (T.. M06), with per-tool
+    sections in report.tools (see core.tooltable). cfg applies before the first M06.
+    incremental: keep a block manifest <stem>-bcss.bcssinc in out_dir and, on
+    re-runs, reuse the previous output for unchanged blocks (see
+    core.incremental; report.incremental). Full output only, not with
+    observers, cycle_time, tool_table, index or pipelined; fast_copy is not used.
+    subprograms: run M98 P.. calls into the O.. M99 subprograms of the file
+    with the caller's state, memoized per entry state; subprograms entered
+    with states that need different S lines get extra copies under new O
+    numbers (see core.subprogram; report.subprograms). Full output only, not
+    with observers, cycle_time, tool_table, incremental, index or pipelined.
+    Subprogram bodies are held in memory (limited, see core.subprogram).
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output_format: {output_format}")
+    if cancel is not None and not pipelined:
+        raise ValueError("cancel: only supported with pipelined=True")
+    if incremental and (observers or cycle_time or tool_table or index or pipelined or output_format != "full"):
+        raise ValueError(
+            "incremental: not supported with observers, cycle_time, tool_table, index, pipelined or patch output"
+        )
+    if subprograms and (
+        observers or cycle_time or tool_table or incremental or index or pipelined or output_format != "full"
+    ):
+        raise ValueError(
+            "subprograms: not supported with observers, cycle_time, tool_table, incremental, index, "
+            "pipelined or patch output"
+        )
+
+    t0 = time.perf_counter()
+    input_path = input_path.resolve()
+    out_dir = out_dir.resolve()
+
+    out_path, report_path = _make_output_paths(input_path, out_dir, output_format)
 
-            out_line, inserted = injector.process_line(text, nl, encoding)
+    estimator = CycleTimeEstimator(cycle_time) if cycle_time is not None else None
+    run_observers = tuple(observers) + ((estimator,) if estimator is not None else ())
+    if estimator is not None:
+        index = False
 
-            if inserted is not None:
-                fout.write(inserted)
-            fout.write(out_line)
+    report = Report.create(input_path, out_path, report_path, cfg)
+    injector = Injector(RpmModel(cfg), report, run_observers, tool_table)
+
+    info: Optional[_RunInfo] = None
+    if (
+        fast_copy
+        and not (incremental or subprograms or observers or cycle_time or index or pipelined)
+        and output_format == "full"
+    ):
+        info = _fast_copy(input_path, out_path, injector)
+        if info is None:
+            # Scan stopped part-way: start over with fresh state.
+            report = Report.create(input_path, out_path, report_path, cfg)
+            injector = Injector(RpmModel(cfg), report, run_observers, tool_table)
+
+    sink: OutputSink
+    if info is not None:
+        output_sha256 = info.input_sha256.hex()
+    elif incremental:
+        manifest_path = out_dir / f"{input_path.stem}-bcss{MANIFEST_SUFFIX}"
+        info, output_sha256, report.incremental = _run_incremental(input_path, out_path, manifest_path, injector)
+    elif subprograms:
+        try:
+            with out_path.open("wb") as f:
+                sink = FileSink(f, IO_CHUNK_BYTES)
+                info = _run_subprograms(input_path, sink, injector)
+        except BaseException:
+            out_path.unlink(missing_ok=True)  # rejected program (see core.subprogram): no partial output
+            raise
+        output_sha256 = sink.output_sha256
+    elif output_format == "patch":
+        sink = PatchSink(out_path, IO_CHUNK_BYTES)
+        try:
+            info = _run(input_path, sink, injector, index, pipelined, cancel)
+        except BaseException:
+            sink.discard()
+            raise
+        sink.finish(info.input_size, info.input_sha256.hex(), info.encoding)
+        output_sha256 = sink.output_sha256
+    elif pipelined:
+        try:
+            with out_path.open("wb") as f:
+                writer = BackgroundWriter(f, IO_CHUNK_BYTES, cancel=cancel)
+                sink = FileSink(writer, IO_CHUNK_BYTES)
+                try:
+                    info = _run(input_path, sink, injector, index, pipelined, cancel)
+                    writer.close()
+                except BaseException:
+                    writer.abort()
+                    raise
+        except PipelineCancelled:
+            out_path.unlink(missing_ok=True)
+            raise
+        output_sha256 = sink.output_sha256
+    else:
+        with out_path.open("wb") as f:
+            sink = FileSink(f, IO_CHUNK_BYTES)
+            info = _run(input_path, sink, injector, index)
+        output_sha256 = sink.output_sha256
 
     injector.finalize()
+    if estimator is not None:
+        report.cycle_time = estimator.result()
+    report.hashes.input_sha256 = info.input_sha256.hex()
+    report.hashes.output_sha256 = output_sha256
+    report.timings.elapsed_s = round(time.perf_counter() - t0, 6)
 
     # Report JSON
     report_path.write_text(json.dumps(report.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if history_db is not None:
+        with HistoryStore(history_db) as store:
+            store.add_report(report.to_dict())
+    return report
+
+
+def analyze_file(
+    input_path: Path,
+    cfg: BcssConfig,
+    *,
+    observers: Sequence[InjectorObserver] = (),
+    index: bool = True,
+    cycle_time: Optional[CycleTimeModel] = None,
+    tool_table: Optional[ToolTable] = None,
+) -> Report:
+    """
+    Run the conversion without writing any output (report / observers only),
+    e.g. to try settings or feed the preview. Uses the sidecar index by default
+    (not with cycle_time, see process_file).
+    """
+    t0 = time.perf_counter()
+    input_path = input_path.resolve()
+
+    report = Report.create(input_path, Path(), Path(), cfg)
+    report.output_file = ""
+    report.report_file = ""
+    estimator = CycleTimeEstimator(cycle_time) if cycle_time is not None else None
+    injector = Injector(
+        RpmModel(cfg), report, tuple(observers) + ((estimator,) if estimator is not None else ()), tool_table
+    )
+    if estimator is not None:
+        index = False
+    report.hashes.input_sha256 = _run(input_path, OutputSink(), injector, index).input_sha256.hex()
+    injector.finalize()
+    if estimator is not None:
+        report.cycle_time = estimator.result()
+    report.timings.elapsed_s = round(time.perf_counter() - t0, 6)
+    return report
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from array import array
+
+from .injector import REASON_DEADBAND, REASON_INSERTED, S_STORE_MAX, Decision, InjectorObserver
+
+# Event kinds stored in ProfileRecorder.event_kind
+EVENT_CLAMP = 1
+EVENT_DEADBAND = 2
+
+
+class ProfileRecorder(InjectorObserver):
+    """
+    Collects the S / theta profile while the conversion runs, for plotting.
+
+    Data is kept in compact typed arrays (a few bytes per B line) so a 170k
+    B-line program stays in the low MB range and nothing has to be re-parsed.
+    All x arrays are input line numbers, ascending.
+    """
+
+    def __init__(self) -> None:
+        # theta_quant at every B line while spindle ON
+        self.theta_line = array("l")
+        self.theta_deg = array("d")
+
+        # S in effect from line N on (inserted or existing S)
+        self.s_line = array("l")
+        self.s_rpm = array("q")
+        self.s_inserted = array("b")
+
+        # clamp / deadband events
+        self.event_line = array("l")
+        self.event_kind = array("b")
+
+    def on_b_line(self, line_no: int, b_deg: float, theta_quant_deg: float) -> None:
+        self.theta_line.append(line_no)
+        self.theta_deg.append(theta_quant_deg)
+
+    def on_s(self, line_no: int, s_rpm: int, inserted: bool) -> None:
+        self.s_line.append(line_no)
+        self.s_rpm.append(min(s_rpm, S_STORE_MAX))
+        self.s_inserted.append(1 if inserted else 0)
+
+    def on_decision(self, decision: Decision) -> None:
+        if decision.reason == REASON_DEADBAND:
+            self.event_line.append(decision.line_no)
+            self.event_kind.append(EVENT_DEADBAND)
+        if decision.reason in (REASON_INSERTED, REASON_DEADBAND) and decision.rpm is not None and decision.rpm.clamped:
+            self.event_line.append(decision.line_no)
+            self.event_kind.append(EVENT_CLAMP)
+
+    @property
+    def last_line(self) -> int:
+        return max(
+            self.theta_line[-1] if self.theta_line else 0,
+            self.s_line[-1] if self.s_line else 0,
+            self.event_line[-1] if self.event_line else 0,
+        )
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass, field
+import math
+from dataclasses import asdict, dataclass, field, fields
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from .config import BcssConfig
 
@@ -37,6 +38,222 @@ class SRange:
             self.s_max = s
 
 
+SUM_SCALE = 1_000_000  # Histogram.sum_fixed units per 1.0
+
+
+@dataclass
+class Histogram:
+    """
+    Fixed-bucket streaming histogram: O(1) per value, no samples kept.
+
+    linear: bucket i counts [lo + i*width, lo + (i+1)*width)
+    log2:   bucket 0 counts 0, bucket i counts [2**(i-1), 2**i) (lo / width unused)
+    Values outside the buckets (and NaN) go to under / over. Histograms with
+    the same layout can be merged (batch totals).
+
+    The sum of the (finite) values is kept in fixed point (1 / SUM_SCALE
+    units) so it does not depend on the order values and merges come in.
+    """
+
+    lo: float
+    width: float
+    n_buckets: int
+    scale: str = "linear"  # or "log2"
+    counts: List[int] = field(default_factory=list, repr=False)
+    under: int = 0
+    over: int = 0
+    count: int = 0
+    sum_fixed: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * self.n_buckets
+        self._hi = self.lo + self.n_buckets * self.width
+
+    def add(self, v: float) -> None:
+        self.count += 1
+        if math.isfinite(v):
+            self.sum_fixed += round(v * SUM_SCALE)
+        if self.scale == "log2":
+            i = int(v).bit_length() if v >= 0 else -1
+            if i < 0:
+                self.under += 1
+            elif i >= self.n_buckets:
+                self.over += 1
+            else:
+                self.counts[i] += 1
+        elif not v >= self.lo:
+            self.under += 1
+        elif v >= self._hi:
+            self.over += 1
+        else:
+            self.counts[int((v - self.lo) // self.width)] += 1
+
+    @property
+    def sum(self) -> float:
+        return self.sum_fixed / SUM_SCALE
+
+    def bucket_lo(self, i: int) -> float:
+        if self.scale == "log2":
+            return 0 if i == 0 else 2 ** (i - 1)
+        return self.lo + i * self.width
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Lower edge of the bucket holding the q-quantile (None if empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = self.under
+        if seen > rank:
+            return self.bucket_lo(0)
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen > rank:
+                return self.bucket_lo(i)
+        return self.bucket_lo(self.n_buckets)
+
+    def same_layout(self, other: "Histogram") -> bool:
+        return (self.lo, self.width, self.n_buckets, self.scale) == (other.lo, other.width, other.n_buckets, other.scale)
+
+    def merge(self, other: "Histogram") -> None:
+        if not self.same_layout(other):
+            raise ValueError("cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.under += other.under
+        self.over += other.over
+        self.count += other.count
+        self.sum_fixed += other.sum_fixed
+
+    def to_dict(self) -> dict:
+        # Only the non-empty span of buckets: {"offset": i, "counts": [...]}
+        nz = [i for i, c in enumerate(self.counts) if c]
+        first = nz[0] if nz else 0
+        last = nz[-1] + 1 if nz else 0
+        return {
+            "lo": self.lo,
+            "width": self.width,
+            "n_buckets": self.n_buckets,
+            "scale": self.scale,
+            "offset": first,
+            "counts": self.counts[first:last],
+            "under": self.under,
+            "over": self.over,
+            "count": self.count,
+            "sum": self.sum,
+            "sum_fixed": self.sum_fixed,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Histogram":
+        n = int(d["n_buckets"])
+        counts = [0] * n
+        offset = int(d.get("offset", 0))
+        for i, c in enumerate(d.get("counts", ())):
+            counts[offset + i] = int(c)
+        return cls(
+            lo=d["lo"],
+            width=d["width"],
+            n_buckets=n,
+            scale=d.get("scale", "linear"),
+            counts=counts,
+            under=int(d.get("under", 0)),
+            over=int(d.get("over", 0)),
+            count=int(d.get("count", 0)),
+            sum_fixed=int(d["sum_fixed"]) if "sum_fixed" in d else round(float(d.get("sum", 0.0)) * SUM_SCALE),
+        )
+
+
+@dataclass
+class Histograms:
+    """
+    Distributions behind the counters. Fixed layouts (independent of the
+    config) so reports of different files / settings can always be merged.
+    """
+
+    inserted_s: Histogram = field(default_factory=lambda: Histogram(0, 100, 300))  # rpm, 0..30000
+    theta_quant: Histogram = field(default_factory=lambda: Histogram(-180, 1, 361))  # deg, every B word used
+    delta_s: Histogram = field(default_factory=lambda: Histogram(-20000, 50, 800))  # rpm, insert - previous insert
+    insert_spacing: Histogram = field(default_factory=lambda: Histogram(0, 1, 32, "log2"))  # lines between inserts
+
+    def merge(self, other: "Histograms") -> None:
+        for f in fields(self):
+            getattr(self, f.name).merge(getattr(other, f.name))
+
+    def to_dict(self) -> dict:
+        return {f.name: getattr(self, f.name).to_dict() for f in fields(self)}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Histograms":
+        h = cls()
+        for f in fields(h):
+            if d.get(f.name) is not None:
+                setattr(h, f.name, Histogram.from_dict(d[f.name]))
+        return h
+
+
+@dataclass
+class Timings:
+    elapsed_s: float = 0.0
+
+
+@dataclass
+class FileHashes:
+    input_sha256: Optional[str] = None
+    output_sha256: Optional[str] = None
+
+
+@dataclass
+class CycleTime:
+    total_s: float = 0.0  # motion + spindle ramps, with the inserted S lines
+    motion_s: float = 0.0
+    spindle_ramp_s: float = 0.0
+    added_s: float = 0.0  # ramp time caused by the inserted S lines
+
+
+@dataclass
+class IncrementalStats:
+    """Block reuse of an incremental run (see core.incremental)."""
+
+    manifest_used: bool = False  # False: no (valid) previous manifest, everything processed
+    reused_blocks: int = 0
+    processed_blocks: int = 0
+    reused_lines: int = 0
+    processed_lines: int = 0
+
+
+@dataclass
+class ToolSection:
+    """Stats of the lines run with one tool (multi-tool runs with a tool table)."""
+
+    tool: Optional[int]  # None: lines before the first tool change
+    source: str  # "base" / "table" / "off" (see core.tooltable)
+    config: Optional[dict] = None  # config used, None if "off"
+    detect: DetectStats = field(default_factory=DetectStats)
+    changes: ChangeStats = field(default_factory=ChangeStats)
+    s_range: SRange = field(default_factory=SRange)
+
+
+@dataclass
+class SubprogramVariant:
+    """One emitted body of a subprogram (see core.subprogram). Stats exclude the subprograms it calls."""
+
+    number: int  # O number in the input
+    o_number: int  # O number in the output (the first body keeps the input number)
+    entry_states: int = 0  # distinct entry states converted to this body
+    calls: int = 0  # passes (M98 repeats count one each)
+    detect: DetectStats = field(default_factory=DetectStats)
+    changes: ChangeStats = field(default_factory=ChangeStats)
+    s_range: SRange = field(default_factory=SRange)
+
+
+@dataclass
+class SubprogramStats:
+    calls: int = 0
+    memo_hits: int = 0  # passes that reused an earlier conversion
+    unresolved_calls: int = 0  # M98 to a number not defined in the file (left as is)
+    variants: List[SubprogramVariant] = field(default_factory=list)
+
+
 @dataclass
 class Report:
     input_file: str
@@ -48,6 +265,13 @@ class Report:
     detect: DetectStats = field(default_factory=DetectStats)
     changes: ChangeStats = field(default_factory=ChangeStats)
     s_range: SRange = field(default_factory=SRange)
+    timings: Timings = field(default_factory=Timings)
+    hashes: FileHashes = field(default_factory=FileHashes)
+    cycle_time: Optional[CycleTime] = None  # only when requested (core.cycletime)
+    tools: Optional[List[ToolSection]] = None  # only with a tool table, in order of first use
+    histograms: Histograms = field(default_factory=Histograms)
+    incremental: Optional[IncrementalStats] = None  # only for incremental runs
+    subprograms: Optional[SubprogramStats] = None  # only for subprogram-aware runs
 
     @staticmethod
     def now_iso() -> str:
@@ -73,4 +297,11 @@ class Report:
             "detect": asdict(self.detect),
             "changes": asdict(self.changes),
             "s_range": asdict(self.s_range),
+            "timings": asdict(self.timings),
+            "hashes": asdict(self.hashes),
+            "cycle_time": None if self.cycle_time is None else asdict(self.cycle_time),
+            "tools": None if self.tools is None else [asdict(t) for t in self.tools],
+            "histograms": self.histograms.to_dict(),
+            "incremental": None if self.incremental is None else asdict(self.incremental),
+            "subprograms": None if self.subprograms is None else asdict(self.subprograms),
         }
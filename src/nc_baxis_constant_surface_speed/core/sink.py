@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import hashlib
+from typing import BinaryIO, Optional
+
+
+class OutputSink:
+    """
+    Receives the converted program from the processing paths.
+
+    The text path calls insert() / line(); the index path calls insert() /
+    copy() / eof_newline() since it never decodes lines. This base class
+    discards everything (analyze-only runs).
+    """
+
+    def insert(self, offset: int, line_no: int, data: bytes) -> None:
+        """An inserted line (incl. newline), placed before the input line starting at offset."""
+
+    def line(self, line_bytes: bytes, out_line: bytes) -> None:
+        """Text path: converted bytes for one input line (line_bytes as read)."""
+
+    def copy(self, fin: BinaryIO, n: int) -> None:
+        """Index path: the next n input bytes pass through unchanged."""
+
+    def eof_newline(self, nl: bytes) -> None:
+        """Index path: newline appended to an unterminated last line (the text path does this too)."""
+
+    @property
+    def output_sha256(self) -> Optional[str]:
+        return None
+
+
+class FileSink(OutputSink):
+    """Writes the full converted program, keeping a sha256 of it."""
+
+    def __init__(self, f: BinaryIO, chunk_size: int = 1 << 20) -> None:
+        self._f = f
+        self._hash = hashlib.sha256()
+        self._chunk_size = chunk_size
+
+    def _write(self, data: bytes) -> None:
+        self._hash.update(data)
+        self._f.write(data)
+
+    def insert(self, offset: int, line_no: int, data: bytes) -> None:
+        self._write(data)
+
+    def line(self, line_bytes: bytes, out_line: bytes) -> None:
+        self._write(out_line)
+
+    def copy(self, fin: BinaryIO, n: int) -> None:
+        while n > 0:
+            chunk = fin.read(min(n, self._chunk_size))
+            if not chunk:
+                raise IOError("input ended early (changed while processing?)")
+            self._write(chunk)
+            n -= len(chunk)
+
+    def eof_newline(self, nl: bytes) -> None:
+        self._write(nl)
+
+    @property
+    def output_sha256(self) -> Optional[str]:
+        return self._hash.hexdigest()
@@ -0,0 +1,502 @@
+"""
+Subprogram-aware processing: M98 P.. calls into O.... M99 blocks of the same file.
+
+The flat line stream converts a subprogram once, with whatever state the
+lines before its text leave behind; on the machine it runs with the state of
+each call site. In this mode:
+
+  - O blocks ending in M99 that an M98 in the file calls are subprograms;
+    all other lines (uncalled O blocks too) run in file order as before
+  - M98 P.. (L.. repeats, or 8-digit P = repeats + number) runs the
+    subprogram from the caller's state. Its conversion is memoized per
+    (number, entry state: spindle on, last theta_quant, last S, pending
+    theta); a pass with a known entry state reuses output, exit state and
+    stats without touching the lines. Body lines are parsed once.
+  - each distinct converted body is written once, at the subprogram's place
+    in the file: the first keeps its O number, others get free numbers above
+    the largest in the file and the calls are rewritten to them. A repeat
+    whose passes need different bodies becomes several M98 lines.
+  - the O line of a subprogram is a header, not a block: it is not run
+    through the injector (an S due when the call is made goes after it)
+
+Report totals count the output text (each body once); report.subprograms
+attributes them per body. Main program lines go through a spool file so the
+subprogram bodies can be placed wherever they are in the file.
+
+Memory: the main program streams as in the flat path, but subprogram bodies
+and their converted variants are kept in memory. Their text is limited to
+MAX_HELD_BYTES, and M98 repeat counts to MAX_REPEATS (the controller limit);
+programs beyond either are rejected with ValueError.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import tempfile
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .injector import Injector, InjectorState
+from .parser import ParsedLine, parse_line, strip_paren_comments
+from .report import ChangeStats, DetectStats, Histograms, SRange, SubprogramStats, SubprogramVariant
+from .sink import OutputSink
+
+RE_O = re.compile(r"^\s*[O:](\d+)")
+RE_M98 = re.compile(r"M98(?!\d)")
+RE_M99 = re.compile(r"M99(?!\d)")
+RE_END = re.compile(r"M(?:30|0?2)(?!\d)")
+RE_P = re.compile(r"P(\d+)")
+RE_L = re.compile(r"L(\d+)")
+
+# Fanuc allows 4 levels (10 with options); deeper means a recursive call.
+MAX_NESTING = 16
+# L / embedded repeat count: at most 4 digits on the controller
+MAX_REPEATS = 9999
+# Subprogram text (bodies as read + converted variants) kept in memory
+MAX_HELD_BYTES = 16 << 20
+
+
+class Call(NamedTuple):
+    number: int
+    repeats: int
+    embedded: bool  # repeats in the P word (P51002 = 5 x O1002)
+    p_width: int  # digits of the P word (number part)
+    has_l: bool
+
+
+def parse_call(core: str) -> Optional[Call]:
+    """M98 call of a comment-free line, None if there is none."""
+    if "M98" not in core or not RE_M98.search(core):
+        return None
+    mp = RE_P.search(core)
+    if mp is None:
+        return None
+    digits = mp.group(1)
+    embedded = len(digits) > 4
+    number = int(digits[-4:]) if embedded else int(digits)
+    repeats = int(digits[:-4]) if embedded else 1
+    ml = RE_L.search(core)
+    if ml is not None:
+        repeats = int(ml.group(1))
+    return Call(number, repeats, embedded, 4 if embedded else len(digits), ml is not None)
+
+
+@dataclass
+class SubBlock:
+    number: int
+    start: int  # byte offset of the O line
+    end: int  # byte offset after the M99 line
+
+
+@dataclass
+class ProgramStructure:
+    blocks: Dict[int, SubBlock]  # subprograms that are called (first definition of a number)
+    numbers: Set[int]  # every O number defined or called
+    sha256: bytes
+    size: int
+    call_lines: int = 0  # M98 lines, whether the number is defined or not
+
+
+def scan_structure(path: Path, encoding: str) -> ProgramStructure:
+    defined: Dict[int, SubBlock] = {}
+    called: Set[int] = set()
+    numbers: Set[int] = set()
+    call_lines = 0
+    in_hash = hashlib.sha256()
+    offset = 0
+    open_block: Optional[Tuple[int, int]] = None  # (number, start) of an O line not closed yet
+    line_no = 0
+    with path.open("rb") as fin:
+        while True:
+            line_bytes = fin.readline()
+            if not line_bytes:
+                break
+            line_no += 1
+            in_hash.update(line_bytes)
+            start = offset
+            offset += len(line_bytes)
+            if b"M" not in line_bytes and b"O" not in line_bytes and b":" not in line_bytes:
+                continue
+            core = strip_paren_comments(line_bytes.decode(encoding, errors="replace"))
+            mo = RE_O.match(core)
+            if mo is not None:
+                open_block = (int(mo.group(1)), start)
+                numbers.add(open_block[0])
+            call = parse_call(core)
+            if call is not None:
+                if call.repeats > MAX_REPEATS:
+                    raise ValueError(f"line {line_no}: M98 repeats {call.repeats} times (at most {MAX_REPEATS})")
+                called.add(call.number)
+                numbers.add(call.number)
+                call_lines += 1
+            if open_block is not None and RE_M99.search(core):
+                defined.setdefault(open_block[0], SubBlock(open_block[0], open_block[1], offset))
+                open_block = None
+            elif RE_END.search(core):
+                open_block = None
+    return ProgramStructure(
+        blocks={n: b for n, b in defined.items() if n in called},
+        numbers=numbers,
+        sha256=in_hash.digest(),
+        size=offset,
+        call_lines=call_lines,
+    )
+
+
+def _word_span(text: str, letter: str) -> Optional[Tuple[int, int]]:
+    """Span of the digits of the first <letter><digits> word outside (...) comments."""
+    depth = 0
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(0, depth - 1)
+        elif depth == 0 and ch == letter and i + 1 < n and text[i + 1].isdigit():
+            j = i + 1
+            while j < n and text[j].isdigit():
+                j += 1
+            return i + 1, j
+        i += 1
+    return None
+
+
+def _replace_span(text: str, span: Tuple[int, int], value: str) -> str:
+    return text[: span[0]] + value + text[span[1] :]
+
+
+def _p_value(call: Call, number: int, count: int) -> str:
+    if call.embedded and not call.has_l:
+        return (str(count) if count > 1 else "") + f"{number:04d}"
+    return str(number).zfill(call.p_width)
+
+
+def rewrite_call(text: str, call: Call, number: int, count: int) -> str:
+    """The call line with P (and L) set to run O<number> count times."""
+    if call.has_l:
+        span = _word_span(text, "L")
+        if span is not None:
+            text = _replace_span(text, span, str(count))
+    span = _word_span(text, "P")
+    if span is None:
+        return text
+    text = _replace_span(text, span, _p_value(call, number, count))
+    if count > 1 and not call.has_l and not call.embedded:
+        end = span[0] + len(_p_value(call, number, count))
+        text = text[:end] + f"L{count}" + text[end:]
+    return text
+
+
+class _BodyLine(NamedTuple):
+    text: str
+    nl: bytes
+    parsed: ParsedLine
+    call: Optional[Call]
+
+
+@dataclass
+class _Section:
+    """Stats of the lines run in one context (main program, or one subprogram pass)."""
+
+    detect: DetectStats = field(default_factory=DetectStats)
+    changes: ChangeStats = field(default_factory=ChangeStats)
+    s_range: SRange = field(default_factory=SRange)
+    histograms: Histograms = field(default_factory=Histograms)
+
+
+def _merge_range(dst: SRange, src: SRange) -> None:
+    if src.s_min is not None:
+        dst.update(src.s_min)
+        dst.update(src.s_max)  # type: ignore[arg-type]
+
+
+class SubprogramRunner:
+    """Runs the main program lines with call expansion; write() then assembles the output."""
+
+    def __init__(
+        self,
+        input_path: Path,
+        structure: ProgramStructure,
+        injector: Injector,
+        encoding: str,
+        newline_bytes: bytes,
+        chunk_size: int = 1 << 20,
+    ) -> None:
+        self.input_path = input_path
+        self.structure = structure
+        self.injector = injector
+        self.report = injector.report
+        self.encoding = encoding
+        self.newline_bytes = newline_bytes
+        self.stats = SubprogramStats()
+
+        self._bodies: Dict[int, List[_BodyLine]] = {}
+        self._memo: Dict[tuple, Tuple[SubprogramVariant, InjectorState, bool]] = {}  # -> exit state, inserted
+        self._by_output: Dict[Tuple[int, bytes], SubprogramVariant] = {}
+        self._emitted: Dict[int, List[Tuple[SubprogramVariant, _BodyLine, bytes]]] = {}
+        self._next_number = max(structure.numbers, default=0) + 1
+        self._held = 0  # bytes of subprogram text in memory
+
+        # Exclusive stats: counters since the last switch go to the top of the stack.
+        self._main = _Section()
+        self._stack: List[_Section] = []
+        self._snap = (replace(self.report.detect), replace(self.report.changes))
+        self._total_range = self.report.s_range
+        self._total_hist = self.report.histograms
+        self.report.s_range = SRange()
+        self.report.histograms = Histograms()
+
+        self._spool = tempfile.SpooledTemporaryFile(max_size=chunk_size, mode="w+b")
+        self._segments: List[int] = []  # spool offset at each subprogram block
+        self._fsub: Optional[BinaryIO] = None
+
+    # ---------- stats ----------
+    def _switch(self) -> None:
+        section = self._stack[-1] if self._stack else self._main
+        rep = self.report
+        detect0, changes0 = self._snap
+        for dst, cur, snap in ((section.detect, rep.detect, detect0), (section.changes, rep.changes, changes0)):
+            for f in fields(dst):
+                setattr(dst, f.name, getattr(dst, f.name) + getattr(cur, f.name) - getattr(snap, f.name))
+        _merge_range(section.s_range, rep.s_range)
+        section.histograms.merge(rep.histograms)
+        rep.s_range = SRange()
+        rep.histograms = Histograms()
+        self._snap = (replace(rep.detect), replace(rep.changes))
+
+    def _drop(self, section: _Section) -> None:
+        """Take a pass whose body is not written out of the totals again."""
+        rep = self.report
+        for dst, src in ((rep.detect, section.detect), (rep.changes, section.changes)):
+            for f in fields(dst):
+                setattr(dst, f.name, getattr(dst, f.name) - getattr(src, f.name))
+        self._snap = (replace(rep.detect), replace(rep.changes))
+
+    def _keep(self, section: _Section) -> None:
+        _merge_range(self._total_range, section.s_range)
+        self._total_hist.merge(section.histograms)
+
+    # ---------- lines ----------
+    def _decode(self, body: bytes) -> str:
+        try:
+            return body.decode(self.encoding, errors="strict")
+        except UnicodeDecodeError:
+            # Same fallback as the flat text path
+            alt = "cp932" if self.encoding == "utf-8" else "utf-8"
+            self.encoding = alt
+            return body.decode(alt, errors="replace")
+
+    def _split(self, line_bytes: bytes) -> Tuple[bytes, bytes]:
+        if line_bytes.endswith(b"\r\n"):
+            return line_bytes[:-2], b"\r\n"
+        if line_bytes.endswith(b"\n"):
+            return line_bytes[:-1], b"\n"
+        return line_bytes, self.newline_bytes
+
+    def _call_of(self, text: str) -> Optional[Call]:
+        return parse_call(strip_paren_comments(text)) if "M98" in text else None
+
+    def _run_line(self, line: _BodyLine, write: Callable[[bytes], None]) -> None:
+        enc = self.encoding
+        s_insert = self.injector.process_parsed(line.parsed)
+        if s_insert is not None:
+            write(f"S{s_insert}".encode(enc, errors="strict") + line.nl)
+        call = line.call
+        if call is not None and call.number not in self.structure.blocks:
+            self.stats.unresolved_calls += 1
+            call = None
+        if call is None:
+            write(line.text.encode(enc, errors="strict") + line.nl)
+        else:
+            groups = self._call(call)
+            if not groups:
+                write(line.text.encode(enc, errors="strict") + line.nl)  # L0
+            for i, (variant, count) in enumerate(groups):
+                if i == 0:
+                    text = rewrite_call(line.text, call, variant.o_number, count)
+                else:
+                    text = f"M98P{variant.o_number}" + (f"L{count}" if count > 1 else "")
+                write(text.encode(enc, errors="strict") + line.nl)
+
+    # ---------- calls ----------
+    def _body(self, number: int) -> List[_BodyLine]:
+        lines = self._bodies.get(number)
+        if lines is None:
+            block = self.structure.blocks[number]
+            if self._fsub is None:
+                self._fsub = self.input_path.open("rb")
+            self._fsub.seek(block.start)
+            data = self._fsub.read(block.end - block.start)
+            self._hold(len(data))
+            lines = []
+            for line_bytes in _split_lf(data):
+                body, nl = self._split(line_bytes)
+                text = self._decode(body)
+                lines.append(_BodyLine(text, nl, parse_line(text), self._call_of(text)))
+            self._bodies[number] = lines
+        return lines
+
+    def _hold(self, n: int) -> None:
+        self._held += n
+        if self._held > MAX_HELD_BYTES:
+            raise ValueError(
+                f"subprograms: more than {MAX_HELD_BYTES >> 20} MiB of subprogram text to keep in memory; "
+                "convert without subprograms"
+            )
+
+    def _call(self, call: Call) -> List[List]:
+        groups: List[List] = []
+        for _ in range(call.repeats):
+            variant = self._enter(call.number)
+            if groups and groups[-1][0] is variant:
+                groups[-1][1] += 1
+            else:
+                groups.append([variant, 1])
+        return groups
+
+    def _enter(self, number: int) -> SubprogramVariant:
+        injector = self.injector
+        entry = injector.snapshot()
+        key = (
+            number,
+            self.encoding,
+            entry.spindle_on,
+            entry.last_theta_quant,
+            entry.last_s_rpm,
+            None if entry.pending is None else entry.pending[0],
+        )
+        self.stats.calls += 1
+        hit = self._memo.get(key)
+        if hit is not None:
+            variant, exit_state, inserted = hit
+            self.stats.memo_hits += 1
+            variant.calls += 1
+            if not inserted:
+                exit_state = replace(exit_state, last_insert=entry.last_insert)
+            injector.restore(exit_state)
+            return variant
+
+        if len(self._stack) >= MAX_NESTING:
+            raise ValueError(f"subprogram nesting deeper than {MAX_NESTING} (recursive M98 P{number}?)")
+        lines = self._body(number)
+        inserted0 = self.report.changes.inserted_s_lines
+        self._switch()
+        section = _Section()
+        self._stack.append(section)
+        out: List[bytes] = []
+        for line in lines[1:]:  # lines[0] is the O line
+            self._run_line(line, out.append)
+        inserted = self.report.changes.inserted_s_lines != inserted0
+        self._switch()
+        self._stack.pop()
+        exit_state = injector.snapshot()
+
+        # The O line (with its number) is added when writing.
+        text = b"".join(out)
+        variant = self._by_output.get((number, text))
+        if variant is None:
+            self._hold(len(text))
+            variants = self._emitted.setdefault(number, [])
+            o_number = number if not variants else self._free_number()
+            variant = SubprogramVariant(
+                number=number,
+                o_number=o_number,
+                detect=section.detect,
+                changes=section.changes,
+                s_range=section.s_range,
+            )
+            variants.append((variant, lines[0], text))
+            self._by_output[(number, text)] = variant
+            self.stats.variants.append(variant)
+            self._keep(section)
+        else:
+            # Same output as an earlier entry state: written once, counted once.
+            self._drop(section)
+            injector.restore(exit_state)
+        variant.entry_states += 1
+        variant.calls += 1
+        self._memo[key] = (variant, exit_state, inserted)
+        return variant
+
+    def _free_number(self) -> int:
+        n = self._next_number
+        while n in self.structure.numbers:
+            n += 1
+        self._next_number = n + 1
+        return n
+
+    # ---------- main program ----------
+    def run(self) -> None:
+        blocks = sorted(self.structure.blocks.values(), key=lambda b: b.start)
+        write = self._spool.write
+        k = 0
+        offset = 0
+        with self.input_path.open("rb") as fin:
+            while True:
+                if k < len(blocks) and offset == blocks[k].start:
+                    self._segments.append(self._spool.tell())
+                    offset = blocks[k].end
+                    fin.seek(offset)
+                    k += 1
+                    continue
+                line_bytes = fin.readline()
+                if not line_bytes:
+                    break
+                offset += len(line_bytes)
+                body, nl = self._split(line_bytes)
+                text = self._decode(body)
+                self._run_line(_BodyLine(text, nl, parse_line(text), self._call_of(text)), write)
+        self._switch()
+        self._keep(self._main)
+        self.report.s_range = self._total_range
+        self.report.histograms = self._total_hist
+        self.report.subprograms = self.stats
+
+    def write(self, sink: OutputSink) -> None:
+        """Main program output with each subprogram's bodies at its place in the file."""
+        blocks = sorted(self.structure.blocks.values(), key=lambda b: b.start)
+        spool = self._spool
+        spool.seek(0)
+        pos = 0
+        for block, seg_end in zip(blocks, self._segments):
+            sink.copy(spool, seg_end - pos)  # type: ignore[arg-type]
+            pos = seg_end
+            variants = self._emitted.get(block.number)
+            if not variants:
+                # Never entered (only called from subprograms that never run): as in the input.
+                with self.input_path.open("rb") as fin:
+                    fin.seek(block.start)
+                    raw = fin.read(block.end - block.start)
+                for line_bytes in _split_lf(raw):
+                    body, nl = self._split(line_bytes)
+                    sink.line(line_bytes, self._decode(body).encode(self.encoding, errors="strict") + nl)
+                continue
+            for variant, header, text in variants:
+                o_text = header.text
+                if variant.o_number != block.number:
+                    span = _word_span(o_text, "O") or _word_span(o_text, ":")
+                    if span is not None:
+                        o_text = _replace_span(o_text, span, str(variant.o_number).zfill(span[1] - span[0]))
+                sink.line(b"", o_text.encode(self.encoding, errors="strict") + header.nl)
+                sink.line(b"", text)
+        end = spool.seek(0, 2)
+        spool.seek(pos)
+        sink.copy(spool, end - pos)  # type: ignore[arg-type]
+
+    def close(self) -> None:
+        self._spool.close()
+        if self._fsub is not None:
+            self._fsub.close()
+
+
+def _split_lf(data: bytes) -> List[bytes]:
+    """Lines like readline(): split on \\n only, keeping it."""
+    lines = data.split(b"\n")
+    last = lines.pop()
+    out = [line + b"\n" for line in lines]
+    if last:
+        out.append(last)
+    return out
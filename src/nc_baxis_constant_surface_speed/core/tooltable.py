@@ -0,0 +1,88 @@
+"""
+Tool table: per-tool BcssConfig for programs with several tools (T.. M06).
+
+JSON file, each tool entry overrides fields of the base config
+(the one given on the command line / in the GUI):
+
+    {
+      "unlisted": "off",
+      "tools": {
+        "3":  {"tool_d_mm": 6.0, "s_ref_rpm": 12000, "s_max_rpm": 20000},
+        "12": {"mode": "vc_absolute", "tool_d_mm": 10.0, "vc_m_per_min": 180.0}
+      }
+    }
+
+unlisted: what to do after M06 to a tool that is not in the table.
+    "off"  (default) no S is inserted until the next tool change
+           (drills, flat end mills ... keep the programmed S)
+    "base" use the base config
+Lines before the first M06 always use the base config.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+from typing import Dict, Optional, get_args
+
+from .config import BcssConfig, Mode
+
+UNLISTED_OFF = "off"
+UNLISTED_BASE = "base"
+
+# Section sources in Report.tools
+SOURCE_BASE = "base"
+SOURCE_TABLE = "table"
+SOURCE_OFF = "off"
+
+# JSON types accepted per BcssConfig field type (bool is not a number here)
+_JSON_TYPES = {"float": (int, float), "int": (int,), "bool": (bool,), "Mode": (str,)}
+_TYPE_NAMES = {"float": "a number", "int": "an integer", "bool": "true or false", "Mode": "a string"}
+
+
+@dataclass(frozen=True)
+class ToolTable:
+    tools: Dict[int, BcssConfig] = field(default_factory=dict)
+    unlisted: str = UNLISTED_OFF
+
+    def config_for(self, tool: Optional[int], base: BcssConfig) -> Optional[BcssConfig]:
+        """Config after a change to this tool, None if no S should be inserted."""
+        if tool is not None and tool in self.tools:
+            return self.tools[tool]
+        return base if self.unlisted == UNLISTED_BASE else None
+
+
+def tool_table_from_dict(data: dict, base: BcssConfig) -> ToolTable:
+    if not isinstance(data, dict):
+        raise ValueError("tool table must be a JSON object")
+    unlisted = data.get("unlisted", UNLISTED_OFF)
+    if unlisted not in (UNLISTED_OFF, UNLISTED_BASE):
+        raise ValueError(f"tool table: unlisted must be '{UNLISTED_OFF}' or '{UNLISTED_BASE}'")
+
+    cfg_fields = {f.name: f for f in fields(BcssConfig)}
+    tools: Dict[int, BcssConfig] = {}
+    for key, overrides in (data.get("tools") or {}).items():
+        try:
+            tool = int(key)
+        except ValueError:
+            raise ValueError(f"tool table: tool number must be an integer: {key!r}") from None
+        if not isinstance(overrides, dict):
+            raise ValueError(f"tool table: T{tool} must map to an object")
+        values = {}
+        for name, value in overrides.items():
+            f = cfg_fields.get(name)
+            if f is None:
+                raise ValueError(f"tool table: T{tool}: unknown setting {name!r}")
+            kind = str(f.type)
+            if (isinstance(value, bool) and kind != "bool") or not isinstance(value, _JSON_TYPES[kind]):
+                raise ValueError(f"tool table: T{tool}: {name} must be {_TYPE_NAMES[kind]}, got {value!r}")
+            if name == "mode" and value not in get_args(Mode):
+                raise ValueError(f"tool table: T{tool}: unknown mode {value!r}")
+            values[name] = float(value) if kind == "float" else value
+        tools[tool] = replace(base, **values)
+    return ToolTable(tools=tools, unlisted=unlisted)
+
+
+def load_tool_table(path: Path, base: BcssConfig) -> ToolTable:
+    return tool_table_from_dict(json.loads(path.read_text(encoding="utf-8")), base)
@@ -0,0 +1,121 @@
+"""
+Opt-in decision trace: one NDJSON record per injector decision, to answer
+"why is there (no) S here?" for a given line.
+
+    {"line": 1234, "reason": "deadband", "b": 13.1, "theta_quant": 13.0,
+     "theta_used": 13.0, "rpm_raw": 7402.13, "rpm_rounded": 7400,
+     "rpm_clamped": 7400, "clamped": false}
+
+line is the input line the decision was taken on (an insert goes before it).
+The last record is {"summary": {"seen": {...}, "written": {...}}} so sampled
+traces still show the full counts.
+
+Records go straight to a buffered file; nothing is kept in memory.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict
+
+from .injector import (
+    REASON_DEADBAND,
+    REASON_INSERTED,
+    REASON_NEXTLINE_HAS_S,
+    REASON_PENDING_AT_EOF,
+    REASON_SPINDLE_OFF,
+    REASON_TOOL_OFF,
+    Decision,
+    InjectorObserver,
+)
+
+# Trace levels: which reasons are written
+TRACE_INSERTED = "inserted"
+TRACE_DECISIONS = "decisions"
+TRACE_ALL = "all"
+
+TRACE_LEVELS: Dict[str, frozenset] = {
+    TRACE_INSERTED: frozenset({REASON_INSERTED}),
+    TRACE_DECISIONS: frozenset({REASON_INSERTED, REASON_DEADBAND, REASON_NEXTLINE_HAS_S, REASON_PENDING_AT_EOF}),
+    # spindle-off / tool-off fire for every B word while stopped or while a tool
+    # without table entry is in (can be most of the file)
+    TRACE_ALL: frozenset(
+        {
+            REASON_INSERTED,
+            REASON_DEADBAND,
+            REASON_NEXTLINE_HAS_S,
+            REASON_PENDING_AT_EOF,
+            REASON_SPINDLE_OFF,
+            REASON_TOOL_OFF,
+        }
+    ),
+}
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+class TraceWriter(InjectorObserver):
+    """
+    Writes decisions to an NDJSON file.
+
+    level: TRACE_INSERTED / TRACE_DECISIONS / TRACE_ALL.
+    sample_every: keep every N-th record of each skip reason (inserted records
+    are always written; they match the S lines in the output).
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        level: str = TRACE_DECISIONS,
+        sample_every: int = 1,
+        buffer_size: int = 1 << 20,
+    ) -> None:
+        if level not in TRACE_LEVELS:
+            raise ValueError(f"Unknown trace level: {level}")
+        if sample_every < 1:
+            raise ValueError("sample_every must be >= 1")
+        self.path = path
+        self.reasons = TRACE_LEVELS[level]
+        self.sample_every = sample_every
+        self.seen: Dict[str, int] = {}
+        self.written: Dict[str, int] = {}
+        self._f = path.open("w", encoding="utf-8", newline="\n", buffering=buffer_size)
+
+    def on_decision(self, decision: Decision) -> None:
+        reason = decision.reason
+        n = self.seen.get(reason, 0)
+        self.seen[reason] = n + 1
+        if reason not in self.reasons:
+            return
+        if reason != REASON_INSERTED and n % self.sample_every:
+            return
+        self.written[reason] = self.written.get(reason, 0) + 1
+
+        rpm = decision.rpm
+        rec = {
+            "line": decision.line_no,
+            "reason": reason,
+            "b": decision.b_deg,
+            "theta_quant": decision.theta_quant_deg,
+            "theta_used": None if rpm is None else rpm.theta_used_deg,
+            "rpm_raw": None if rpm is None else round(rpm.rpm_raw, 3),
+            "rpm_rounded": None if rpm is None else rpm.rpm_rounded,
+            "rpm_clamped": None if rpm is None else rpm.rpm_clamped,
+            "clamped": None if rpm is None else rpm.clamped,
+        }
+        self._f.write(_ENCODER.encode(rec))
+        self._f.write("\n")
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        self._f.write(_ENCODER.encode({"summary": {"seen": self.seen, "written": self.written}}))
+        self._f.write("\n")
+        self._f.close()
+
+    def __enter__(self) -> "TraceWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,421 @@
+"""
+Differential fuzz harness: every registered engine (core.engines.ENGINES)
+must produce byte-identical output and identical report counters to the
+reference path.
+
+The reference is the original line loop and Injector of the first release,
+pinned verbatim below (_BaselineInjector) so that changes to core.injector
+cannot move the oracle along with the engines. It shares parse_line and
+RpmModel with the package. Limitations: programs with a tool table, and the
+histograms / per-tool sections (features the pinned loop does not have), are
+taken from the current Injector; for those the harness only checks that the
+engines agree with it.
+
+Programs are generated from a seed, failures are shrunk to a minimal
+program (line-level then character-level ddmin).
+
+    python -m tests.differential --seeds 5000        # longer local run
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.engines import ENGINES, Engine
+from nc_baxis_constant_surface_speed.core.injector import Injector
+from nc_baxis_constant_surface_speed.core.parser import parse_line
+from nc_baxis_constant_surface_speed.core.processor import _detect_encoding_and_newline
+from nc_baxis_constant_surface_speed.core.report import Report
+from nc_baxis_constant_surface_speed.core.rpm_model import RpmModel
+from nc_baxis_constant_surface_speed.core.tooltable import UNLISTED_BASE, UNLISTED_OFF, ToolTable
+
+
+@dataclass(frozen=True)
+class Program:
+    lines: Tuple[str, ...]
+    newlines: Tuple[str, ...]  # per line: "\r\n" or "\n"
+    encoding: str
+    final_newline: bool
+
+    def to_bytes(self) -> bytes:
+        out = []
+        for i, (text, nl) in enumerate(zip(self.lines, self.newlines)):
+            last = i == len(self.lines) - 1
+            out.append(text + ("" if last and not self.final_newline else nl))
+        return "".join(out).encode(self.encoding)
+
+
+# ---------- reference ----------
+@dataclass
+class _BaselinePendingInsert:
+    theta_quant_deg: float  # quantized theta for insertion
+
+
+class _BaselineInjector:
+    """core.injector.Injector as first released (no observers, tools, histograms). Do not edit."""
+
+    def __init__(self, rpm_model: RpmModel, report: Report) -> None:
+        self.rpm_model = rpm_model
+        self.report = report
+
+        self.spindle_on = False
+        self.last_theta_quant: Optional[float] = None
+        self.pending: Optional[_BaselinePendingInsert] = None
+
+    def _set_spindle_state(self, has_m03: bool, has_m05: bool) -> None:
+        # If both appear, treat M05 after M03? Usually won't happen.
+        if has_m03:
+            self.spindle_on = True
+        if has_m05:
+            self.spindle_on = False
+            # Reset last S tracking on spindle stop for safety
+            self.rpm_model.reset_last_s()
+
+    def process_line(
+        self,
+        raw_text: str,
+        newline_bytes: bytes,
+        encoding: str,
+    ) -> Tuple[bytes, Optional[bytes]]:
+        parsed = parse_line(raw_text)
+
+        # Detect stats
+        self.report.detect.total_lines += 1
+
+        # If pending insertion from previous B-line, handle it NOW (before writing current line)
+        inserted_bytes: Optional[bytes] = None
+        if self.pending is not None and self.spindle_on:
+            # Rule: if current (next) line already has S, do not insert
+            if parsed.s_rpm is not None:
+                self.report.changes.skipped_nextline_has_s += 1
+            else:
+                # Compute rpm
+                dec = self.rpm_model.compute_s_for_theta(self.pending.theta_quant_deg)
+
+                if dec.theta_used_deg > self.pending.theta_quant_deg:
+                    self.report.changes.theta_min_applied_count += 1
+                if dec.clamped:
+                    self.report.changes.clamped_count += 1
+
+                # Deadband check (skip if |ΔS| < deadband)
+                if self.rpm_model.should_insert(dec.rpm_clamped):
+                    inserted_text = f"S{dec.rpm_clamped}"
+                    inserted_bytes = inserted_text.encode(encoding, errors="strict") + newline_bytes
+                    self.report.changes.inserted_s_lines += 1
+                    self.report.s_range.update(dec.rpm_clamped)
+                    self.rpm_model.update_last_s(dec.rpm_clamped)
+                else:
+                    self.report.changes.skipped_deadband += 1
+
+            # pending consumed regardless
+            self.pending = None
+
+        # Update spindle state BEFORE scheduling next insertion (so B on same line with M03 works)
+        self._set_spindle_state(parsed.has_m03, parsed.has_m05)
+
+        if self.spindle_on:
+            self.report.detect.spindle_on_lines += 1
+
+        # If the current line contains an explicit S while spindle ON, treat it as the current S
+        if self.spindle_on and parsed.s_rpm is not None:
+            self.rpm_model.update_last_s(parsed.s_rpm)
+            self.report.s_range.update(parsed.s_rpm)
+
+        # Schedule insertion if B changes (only while spindle ON)
+        if self.spindle_on and parsed.b_deg is not None:
+            self.report.detect.b_lines += 1
+
+            theta = parsed.b_deg
+            if self.rpm_model.cfg.invert_b_to_theta:
+                theta = 90.0 - theta
+                if theta < 0.0:
+                    theta = 0.0  # 安全側（最終的にtheta_minが効く）
+
+            theta_q = self.rpm_model.quantize_theta(theta)
+
+            if self.last_theta_quant is None or theta_q != self.last_theta_quant:
+                self.pending = _BaselinePendingInsert(theta_quant_deg=theta_q)
+
+            self.last_theta_quant = theta_q
+
+        out_line_bytes = raw_text.encode(encoding, errors="strict") + newline_bytes
+        return out_line_bytes, inserted_bytes
+
+    def finalize(self) -> None:
+        if self.pending is not None:
+            # No next line to insert into
+            self.report.changes.pending_at_eof += 1
+            self.pending = None
+
+
+def reference_convert(
+    data: bytes, cfg: BcssConfig, path: Path, tool_table: Optional[ToolTable] = None
+) -> Tuple[bytes, dict]:
+    """
+    The original line loop as the oracle: output and counters from
+    _BaselineInjector; histograms / tools (and everything with a tool table)
+    from the current Injector.
+    """
+    def current() -> Tuple[bytes, dict]:
+        injector = Injector(RpmModel(cfg), Report.create(path, path, path, cfg), tool_table=tool_table)
+        return _convert_lines(data, path, injector)
+
+    if tool_table is not None:
+        return current()
+    out, stats = _convert_lines(data, path, _BaselineInjector(RpmModel(cfg), Report.create(path, path, path, cfg)))
+    try:
+        stats["histograms"] = current()[1]["histograms"]
+    except Exception:
+        stats["histograms"] = None  # the current Injector fails where the original did not
+    return out, stats
+
+
+def _convert_lines(data: bytes, path: Path, injector) -> Tuple[bytes, dict]:
+    encoding, newline_bytes = _detect_encoding_and_newline(path)
+    report = injector.report
+    out = []
+    pos = 0
+    # Split like readline(): only on \n (bytes.splitlines would also split on lone \r)
+    while pos < len(data):
+        end = data.find(b"\n", pos)
+        end = len(data) if end < 0 else end + 1
+        line_bytes = data[pos:end]
+        pos = end
+        if line_bytes.endswith(b"\r\n"):
+            nl, body = b"\r\n", line_bytes[:-2]
+        elif line_bytes.endswith(b"\n"):
+            nl, body = b"\n", line_bytes[:-1]
+        else:
+            nl, body = newline_bytes, line_bytes
+        try:
+            text = body.decode(encoding, errors="strict")
+        except UnicodeDecodeError:
+            alt = "cp932" if encoding == "utf-8" else "utf-8"
+            text = body.decode(alt, errors="replace")
+            encoding = alt
+        out_line, inserted = injector.process_line(text, nl, encoding)
+        if inserted is not None:
+            out.append(inserted)
+        out.append(out_line)
+    injector.finalize()
+    return b"".join(out), _stats(report)
+
+
+def _stats(report: Report) -> dict:
+    d = report.to_dict()
+    return {k: d[k] for k in ("detect", "changes", "s_range", "tools", "histograms")}
+
+
+# ---------- generator ----------
+_COMMENTS = ["(TOOL B-AXIS)", "(工具 ＲＥ 荒取り)", "(A(NESTED B10.)C)", "(UNCLOSED B45.", ")B30.", "(M05)", "(S9999)"]
+_M_WORDS = ["M3", "M03", "M5", "M05", "M030", "M35", "M003", "M50", "M0"]
+_TOOL_WORDS = ["T1", "T2", "T12", "T1M06", "T2M6", "M06", "M6", "M060", "T03M06"]
+_B_VALUES = ["0", "90", "-90", "45.", ".5", "-.", "12.3456", "89.9999", "-999.999", "999999999", "1.", "", "+12.5"]
+
+
+def _num(rng: random.Random) -> str:
+    return f"{rng.uniform(-500, 500):.{rng.randint(0, 4)}f}"
+
+
+def _b(rng: random.Random) -> str:
+    if rng.random() < 0.3:
+        return rng.choice(_B_VALUES)
+    return f"{rng.uniform(-10, 100):.{rng.randint(0, 4)}f}"
+
+
+def _line(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.05:
+        return rng.choice(["", "%", "O1234", "G90G54", "M30"])
+    parts: List[str] = []
+    if rng.random() < 0.3:
+        parts.append(rng.choice(["G0", "G1", "G01", "G2"]))
+    for axis in "XYZ":
+        if rng.random() < 0.5:
+            parts.append(axis + _num(rng))
+    if rng.random() < 0.45:
+        parts.append("B" + _b(rng))
+    if rng.random() < 0.2:
+        parts.append("C" + _num(rng))
+    if rng.random() < 0.08:
+        parts.append("S" + rng.choice(["0", "8000", "12000", "99999", "", str(rng.randint(1, 30000))]))
+    if rng.random() < 0.08:
+        parts.append(rng.choice(_M_WORDS))
+    if rng.random() < 0.04:
+        parts.append(rng.choice(_TOOL_WORDS))
+    if rng.random() < 0.1:
+        parts.append("F" + str(rng.randint(1, 5000)))
+    if rng.random() < 0.1:
+        parts.insert(rng.randint(0, len(parts)), rng.choice(_COMMENTS))
+    glue = "" if rng.random() < 0.7 else " "  # glued tokens are the common post output
+    return glue.join(parts)
+
+
+def random_program(rng: random.Random, max_lines: int = 40) -> Program:
+    n = rng.randint(0, max_lines)
+    lines = [_line(rng) for _ in range(n)]
+    if lines and rng.random() < 0.7:
+        lines.insert(rng.randint(0, min(3, len(lines))), rng.choice(["G97S8000M03", "S6000M3", "M03"]))
+    crlf = rng.random() < 0.6
+    mixed = rng.random() < 0.2
+    newlines = tuple(
+        ("\r\n" if crlf else "\n") if not mixed or rng.random() < 0.7 else ("\n" if crlf else "\r\n") for _ in lines
+    )
+    encoding = "cp932" if rng.random() < 0.3 else "utf-8"
+    return Program(tuple(lines), newlines, encoding, final_newline=rng.random() < 0.8)
+
+
+def random_config(rng: random.Random) -> BcssConfig:
+    mode = "vc_absolute" if rng.random() < 0.3 else "relative"
+    s_min = rng.choice([0, 1000, 5000])
+    return BcssConfig(
+        tool_d_mm=rng.choice([6.0, 10.0, 20.0]),
+        theta_ref_deg=rng.choice([12.0, 30.0, 45.0]),
+        s_ref_rpm=rng.choice([6000, 8000]),
+        theta_step_deg=rng.choice([0.5, 1.0, 5.0, 0.0]),
+        theta_min_deg=rng.choice([0.0, 1.0, 3.0]),
+        s_min_rpm=s_min,
+        s_max_rpm=rng.choice([s_min, 12000, 20000, 999999]),
+        s_round_unit_rpm=rng.choice([1, 10, 50]),
+        deadband_rpm=rng.choice([0, 50, 500]),
+        invert_b_to_theta=rng.random() < 0.5,
+        mode=mode,
+        vc_m_per_min=200.0 if mode == "vc_absolute" else 0.0,
+    )
+
+
+def random_tool_table(rng: random.Random, base: BcssConfig) -> Optional[ToolTable]:
+    if rng.random() < 0.5:
+        return None
+    tools = {t: random_config(rng) for t in rng.sample([1, 2, 3, 12], 2)}
+    return ToolTable(tools=tools, unlisted=rng.choice([UNLISTED_OFF, UNLISTED_BASE]))
+
+
+# ---------- comparison ----------
+Outcome = Tuple[str, object]
+
+
+def _run_reference(prog: Program, cfg: BcssConfig, work: Path, tool_table: Optional[ToolTable]) -> Outcome:
+    data = prog.to_bytes()
+    inp = work / "ref.EIA"
+    inp.write_bytes(data)
+    try:
+        return "ok", reference_convert(data, cfg, inp, tool_table)
+    except Exception as e:  # outcome, not a harness error: engines must fail the same way
+        return "error", type(e).__name__
+
+
+def _run_engine(
+    engine: Engine, prog: Program, cfg: BcssConfig, work: Path, tool_table: Optional[ToolTable]
+) -> Outcome:
+    d = Path(tempfile.mkdtemp(dir=work))
+    inp = d / "p.EIA"
+    inp.write_bytes(prog.to_bytes())
+    try:
+        report = engine(inp, d, cfg, tool_table)
+        return "ok", ((d / "p-bcss.EIA").read_bytes(), _stats(report))
+    except Exception as e:
+        return "error", type(e).__name__
+
+
+def find_mismatch(
+    prog: Program, cfg: BcssConfig, work: Path, engines=None, tool_table: Optional[ToolTable] = None
+) -> Optional[str]:
+    """Name of the first engine whose outcome differs from the reference, or None."""
+    ref = _run_reference(prog, cfg, work, tool_table)
+    for name, engine in (engines or ENGINES).items():
+        if _run_engine(engine, prog, cfg, work, tool_table) != ref:
+            return name
+    return None
+
+
+# ---------- shrinking ----------
+def _ddmin(items: List, still_fails: Callable[[List], bool]) -> List:
+    n = 2
+    while len(items) >= 2:
+        chunk = max(1, len(items) // n)
+        reduced = False
+        for start in range(0, len(items), chunk):
+            candidate = items[:start] + items[start + chunk :]
+            if still_fails(candidate):
+                items = candidate
+                n = max(n - 1, 2)
+                reduced = True
+                break
+        if not reduced:
+            if chunk == 1:
+                break
+            n = min(len(items), n * 2)
+    if len(items) == 1 and still_fails([]):
+        return []
+    return items
+
+
+def shrink(
+    prog: Program, cfg: BcssConfig, engine_name: str, work: Path, tool_table: Optional[ToolTable] = None
+) -> Program:
+    engines = {engine_name: ENGINES[engine_name]}
+
+    def fails(p: Program) -> bool:
+        return find_mismatch(p, cfg, work, engines, tool_table) is not None
+
+    def with_lines(idx: List[int], p: Program) -> Program:
+        return replace(p, lines=tuple(p.lines[i] for i in idx), newlines=tuple(p.newlines[i] for i in idx))
+
+    keep = _ddmin(list(range(len(prog.lines))), lambda idx: fails(with_lines(idx, prog)))
+    prog = with_lines(keep, prog)
+
+    for i in range(len(prog.lines)):
+        chars = _ddmin(
+            list(prog.lines[i]),
+            lambda cs, i=i: fails(replace(prog, lines=prog.lines[:i] + ("".join(cs),) + prog.lines[i + 1 :])),
+        )
+        prog = replace(prog, lines=prog.lines[:i] + ("".join(chars),) + prog.lines[i + 1 :])
+    return prog
+
+
+def run(seeds: range, max_lines: int = 40) -> List[str]:
+    """Returns human-readable failure descriptions (empty = all engines agree)."""
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory() as d:
+        work = Path(d)
+        for seed in seeds:
+            rng = random.Random(seed)
+            prog = random_program(rng, max_lines)
+            cfg = random_config(rng)
+            tool_table = random_tool_table(rng, cfg)
+            name = find_mismatch(prog, cfg, work, tool_table=tool_table)
+            if name is None:
+                continue
+            small = shrink(prog, cfg, name, work, tool_table)
+            failures.append(
+                f"seed={seed} engine={name} cfg={cfg}\n"
+                f"  tool_table={tool_table}\n"
+                f"  encoding={small.encoding} final_newline={small.final_newline}\n"
+                f"  program={small.to_bytes()!r}"
+            )
+    return failures
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Differential fuzzing of BCSS engines against the reference path.")
+    p.add_argument("--seeds", type=int, default=2000)
+    p.add_argument("--start", type=int, default=0)
+    p.add_argument("--max-lines", type=int, default=60)
+    args = p.parse_args()
+
+    failures = run(range(args.start, args.start + args.seeds), args.max_lines)
+    for f in failures:
+        print(f)
+    print(f"{len(failures)} failure(s) in {args.seeds} program(s), engines: {', '.join(ENGINES)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+from pathlib import Path
+import tempfile
+
+import pytest
+
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.cycletime import CycleTimeEstimator, CycleTimeModel
+from nc_baxis_constant_surface_speed.core.parser import parse_line
+from nc_baxis_constant_surface_speed.core.processor import analyze_file, process_file
+
+
+MODEL = CycleTimeModel(rapid_mm_per_min=6000.0, rapid_deg_per_min=3600.0, spindle_accel_rpm_per_s=1000.0)
+
+
+def _estimate(text: str, inserts=()):
+    """Feed the lines (and (line no, S) inserted before them) the way Injector does."""
+    est = CycleTimeEstimator(MODEL)
+    inserted = dict(inserts)
+    for line_no, line in enumerate(text.split(), start=1):
+        if line_no in inserted:
+            est.on_s(line_no, inserted[line_no], True)
+        est.on_line(line_no, line, parse_line(line))
+    return est.result()
+
+
+def test_motion_time():
+    ct = _estimate(
+        "G0X100."  # rapid 100 mm @ 6000 -> 1 s
+        " G1X100.Y30.Z40.F3000"  # 50 mm @ 3000 -> 1 s
+        " G91B90.F1800"  # rotary only: 90 deg @ 1800 -> 3 s
+        " G0B-90.X60.(RAPID:X10000.)"  # incremental: max(0.6 s, 1.5 s)
+    )
+    assert ct.motion_s == pytest.approx(6.5)
+    assert ct.spindle_ramp_s == ct.added_s == 0.0
+
+
+def test_spindle_ramps_and_added_time():
+    prog = "S8000M03 G1X1.F60000 X2. M05 M03 S6000 X3."
+    # written: 0->8000 (8 s), M03 again (8 s), 8000->6000 (2 s)
+    ct = _estimate(prog)
+    assert ct.spindle_ramp_s == pytest.approx(18.0)
+
+    # inserted S7000 before line 3: +1 s; restart now spins up to 7000 (-1 s), 7000->6000 (-1 s)
+    ct2 = _estimate(prog, [(3, 7000)])
+    assert ct2.spindle_ramp_s == pytest.approx(17.0)
+    assert ct2.added_s == pytest.approx(-1.0)
+    assert ct2.motion_s == ct.motion_s
+
+
+def test_spindle_words_as_the_parser_reads_them():
+    # Same M03 / M05 as the injector (core.parser): M003, M30, M033 do not start the spindle
+    assert _estimate("S8000M003 M30 M033 M3").spindle_ramp_s == pytest.approx(8.0)
+    assert _estimate("S8000M03 M005 S6000 M05 S7000 M3").spindle_ramp_s == pytest.approx(17.0)
+
+
+def test_process_file_reports_cycle_time():
+    src = "G97S8000M03\nG1X0Y0B12.F1000\nX10.B13.1\nX20.\nX30.B40.\nX40.\nM05\n"
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_text(src, encoding="ascii", newline="")
+        rep = process_file(inp, d, BcssConfig(invert_b_to_theta=False), cycle_time=MODEL)
+        plain = process_file(inp, d, BcssConfig(invert_b_to_theta=False))
+        analyzed = analyze_file(inp, BcssConfig(invert_b_to_theta=False), cycle_time=MODEL)
+
+    assert rep.changes.inserted_s_lines == 2
+    ct = rep.to_dict()["cycle_time"]
+    assert ct["added_s"] > 0
+    assert ct["total_s"] == pytest.approx(ct["motion_s"] + ct["spindle_ramp_s"])
+    assert plain.to_dict()["cycle_time"] is None
+    assert analyzed.cycle_time == rep.cycle_time
+
+
+def test_inserted_s_above_32_bit():
+    src = "G97S8000M03\nG1X0Y0B12.F1000\nX10.B40.\nX20.\nM05\n"
+    cfg = BcssConfig(invert_b_to_theta=False, s_ref_rpm=3_000_000_000, s_max_rpm=10_000_000_000)
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_text(src, encoding="ascii", newline="")
+        rep = process_file(inp, d, cfg, cycle_time=MODEL)
+
+    assert rep.changes.inserted_s_lines >= 1 and rep.s_range.s_max > 2**31
+    assert rep.cycle_time.added_s > 0
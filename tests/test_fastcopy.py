@@ -0,0 +1,70 @@
+from pathlib import Path
+import tempfile
+
+import pytest
+
+from nc_baxis_constant_surface_speed.core import processor
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.fastcopy import copy_file
+from nc_baxis_constant_surface_speed.core.processor import process_file
+
+
+NO_CHANGE = (
+    "(工具 3軸 荒取り)\r\n"
+    "G0X0Y0Z50.\r\n"
+    "B30.0\r\n"  # spindle still off
+    "G97S8000M03\r\n"
+    "X1Y1B30.0\r\n"  # schedules an insert, but the next line already has S
+    "S8000\r\n"
+    "G1X2Y2B30.0\r\n"
+    "M05\r\n"
+    "B45.0\r\n"
+).encode("cp932")
+
+
+def _both(d: Path, data: bytes, cfg: BcssConfig) -> tuple:
+    inp = d / "a.EIA"
+    inp.write_bytes(data)
+    results = []
+    for fast in (False, True):
+        rep = process_file(inp, d, cfg, fast_copy=fast).to_dict()
+        out = (d / "a-bcss.EIA").read_bytes()
+        results.append((out, {k: rep[k] for k in ("detect", "changes", "s_range", "hashes")}))
+    return results
+
+
+def test_fast_copy_used_when_nothing_changes(monkeypatch):
+    calls = []
+    monkeypatch.setattr(processor, "copy_file", lambda s, d, *a: calls.append(s) or copy_file(s, d, *a))
+    with tempfile.TemporaryDirectory() as d:
+        slow, fast = _both(Path(d), NO_CHANGE, BcssConfig())
+        assert fast == slow
+        assert fast[0] == NO_CHANGE
+        assert fast[1]["changes"]["skipped_nextline_has_s"] == 1
+        assert calls
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        NO_CHANGE + b"G97S8000M03\r\nB10.0\r\nX1\r\n",  # real insertion
+        NO_CHANGE + b"G1X3",  # unterminated last line gets a newline
+    ],
+)
+def test_fast_copy_falls_back(monkeypatch, data):
+    calls = []
+    monkeypatch.setattr(processor, "copy_file", lambda s, d, *a: calls.append(s) or copy_file(s, d, *a))
+    with tempfile.TemporaryDirectory() as d:
+        slow, fast = _both(Path(d), data, BcssConfig())
+        assert fast == slow
+        assert fast[0] != data
+        assert not calls
+
+
+def test_copy_file_roundtrip():
+    with tempfile.TemporaryDirectory() as d:
+        src, dst = Path(d) / "a", Path(d) / "b"
+        src.write_bytes(bytes(range(256)) * 5000)
+        dst.write_bytes(b"old content that is longer" * 100000)
+        copy_file(src, dst)
+        assert dst.read_bytes() == src.read_bytes()
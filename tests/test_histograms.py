@@ -0,0 +1,76 @@
+from pathlib import Path
+import json
+import tempfile
+
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.processor import process_file
+from nc_baxis_constant_surface_speed.core.report import Histogram, Histograms
+
+
+SRC = "\n".join(
+    [
+        "G97S8000M03",
+        "X0Y0B13.1",  # 2
+        "G1X1",  # 3: inserted
+        "G1X2",
+        "G1X3",
+        "X0Y0B20.0",  # 6
+        "G1X4",  # 7: inserted
+        "X0Y0B20.5",  # 8: same theta bucket, nothing scheduled
+        "M30",
+    ]
+) + "\n"
+
+
+def test_histograms_in_report():
+    with tempfile.TemporaryDirectory() as d:
+        inp = Path(d) / "a.EIA"
+        inp.write_text(SRC, encoding="utf-8", newline="")
+        rep = process_file(inp, Path(d), BcssConfig(invert_b_to_theta=False))
+        saved = json.loads(Path(rep.report_file).read_text(encoding="utf-8"))["histograms"]
+
+    h = rep.histograms
+    assert rep.changes.inserted_s_lines == 2
+    assert h.inserted_s.count == 2 and h.inserted_s.sum == 7390 + 4860
+    assert h.delta_s.count == 1 and h.delta_s.sum == 4860 - 7390
+    assert h.insert_spacing.count == 1 and h.insert_spacing.quantile(0.5) == 4  # 4 lines -> [4, 8)
+    assert h.theta_quant.count == 3 and h.theta_quant.counts[180 + 20] == 2
+
+    # Compact: only the non-empty span of buckets is written
+    assert saved["theta_quant"]["offset"] == 193 and saved["theta_quant"]["counts"][0] == 1
+    assert len(saved["theta_quant"]["counts"]) == 8
+    assert Histograms.from_dict(saved) == h
+
+
+def test_histogram_buckets_and_merge():
+    a = Histogram(0, 10, 5)
+    for v in (-1, 0, 9.9, 10, 49.9, 50, float("inf"), float("nan")):
+        a.add(v)
+    assert (a.under, a.counts, a.over) == (2, [2, 1, 0, 0, 1], 2)
+
+    b = Histogram.from_dict(a.to_dict())
+    b.merge(a)
+    assert b.counts == [4, 2, 0, 0, 2] and b.count == 16
+    assert a.quantile(0.5) == 10
+
+    try:
+        a.merge(Histogram(0, 5, 5))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("layout mismatch must raise")
+
+
+def test_sum_does_not_depend_on_merge_order():
+    values = [269.5163 / 7] * 7 + [0.1, 0.2, 0.3, float("nan")]
+    whole = Histogram(-180, 1, 361)
+    for v in values:
+        whole.add(v)
+    parts = [Histogram(-180, 1, 361) for _ in range(3)]
+    for i, v in enumerate(values):
+        parts[i % 3].add(v)
+    merged = Histogram(-180, 1, 361)
+    for p in reversed(parts):
+        merged.merge(p)
+    assert merged.to_dict() == whole.to_dict()
+    assert Histogram.from_dict(whole.to_dict()) == whole
@@ -0,0 +1,80 @@
+from pathlib import Path
+import json
+import tempfile
+
+import pytest
+
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.history import HistoryStore, iter_report_files
+from nc_baxis_constant_surface_speed.core.processor import process_file
+
+
+SRC = "G97S8000M03\nX0B10.0\nG1X1\nX0B80.0\nG1X2\nM05\n"
+
+
+def test_process_file_records_history_and_query():
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        db = d / "h.sqlite3"
+        (d / "a.EIA").write_text(SRC, encoding="utf-8")
+        (d / "b.EIA").write_text(SRC.replace("B80.0", "B11.0"), encoding="utf-8")
+
+        # B80 (theta 10) needs ~9600 rpm -> clamped at 9000
+        rep_a = process_file(d / "a.EIA", d, BcssConfig(s_max_rpm=9000), history_db=db)
+        process_file(d / "b.EIA", d, BcssConfig(s_max_rpm=9000), history_db=db)
+        assert rep_a.hashes.input_sha256 and rep_a.hashes.output_sha256
+
+        with HistoryStore(db) as store:
+            assert len(store.query()) == 2
+            hits = store.query(clamped=True, at_s_max=True, since="2000-01-01")
+            assert [Path(r["input_file"]).name for r in hits] == ["a.EIA"]
+            assert hits[0]["cfg_s_max_rpm"] == 9000
+            assert hits[0]["input_sha256"] == rep_a.hashes.input_sha256
+            assert store.query(until="2000-01-01") == []
+
+
+def test_bulk_import_is_batched_and_idempotent():
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        jobs = d / "jobs"
+        for i in range(7):
+            sub = jobs / f"job{i}"
+            sub.mkdir(parents=True)
+            (sub / f"p{i}.EIA").write_text(SRC, encoding="utf-8")
+            process_file(sub / f"p{i}.EIA", sub, BcssConfig())
+        (jobs / "broken-bcss.report.json").write_text("{", encoding="utf-8")
+
+        with HistoryStore(d / "h.sqlite3") as store:
+            inserted, dup, errors = store.import_report_files(iter_report_files([jobs]), batch_size=3)
+            assert (inserted, dup, len(errors)) == (7, 0, 1)
+
+            inserted, dup, _ = store.import_report_files(iter_report_files([jobs]), batch_size=3)
+            assert (inserted, dup) == (0, 7)
+
+            row = store.query(limit=1)[0]
+            assert json.loads(row["report_json"])["changes"]["inserted_s_lines"] == row["inserted_s_lines"]
+
+
+def test_runs_within_one_second_are_all_stored():
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        db = d / "h.sqlite3"
+        (d / "a.EIA").write_text(SRC, encoding="utf-8")
+        rep = process_file(d / "a.EIA", d, BcssConfig(s_max_rpm=9000), history_db=db)
+        again = rep.to_dict()
+        again["config"]["s_max_rpm"] = 20000  # same file, same processed_at, other settings
+        with HistoryStore(db) as store:
+            store.add_report(again)
+            store.add_report(again)  # even an identical run is a run
+            assert sorted(r["cfg_s_max_rpm"] for r in store.query()) == [9000, 20000, 20000]
+
+            # Importing the report file of a run recorded live does not add it again.
+            assert store.import_report_files([d / "a-bcss.report.json"])[:2] == (0, 1)
+
+
+
+def test_bad_dates_raise_a_clear_error():
+    with tempfile.TemporaryDirectory() as d:
+        with HistoryStore(Path(d) / "h.sqlite3") as store:
+            with pytest.raises(ValueError, match="2026-9-1"):
+                store.query(since="2026-9-1")
@@ -0,0 +1,100 @@
+from pathlib import Path
+import random
+import tempfile
+
+import pytest
+
+from nc_baxis_constant_surface_speed.core import incremental
+from nc_baxis_constant_surface_speed.core.cycletime import CycleTimeModel
+from nc_baxis_constant_surface_speed.core.injector import InjectorObserver
+from nc_baxis_constant_surface_speed.core.processor import process_file
+from nc_baxis_constant_surface_speed.core.tooltable import ToolTable
+from tests.differential import Program, _stats, random_config, random_program, reference_convert
+
+
+def _edit(rng: random.Random, prog: Program) -> Program:
+    lines, newlines = list(prog.lines), list(prog.newlines)
+    for _ in range(rng.randint(0, 3)):
+        i = rng.randint(0, len(lines))
+        op = rng.random()
+        if op < 0.4 or not lines:
+            lines.insert(i, rng.choice(["X1B33.3", "M05", "S5000", "G97S8000M03", "B70.", ""]))
+            newlines.insert(i, newlines[0] if newlines else "\n")
+        elif i < len(lines):
+            del lines[i], newlines[i]
+    return Program(tuple(lines), tuple(newlines), prog.encoding, prog.final_newline)
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(incremental, "MIN_BLOCK_LINES", 1)
+    monkeypatch.setattr(incremental, "MAX_BLOCK_LINES", 6)
+    monkeypatch.setattr(incremental, "BOUNDARY_MASK", 3)
+
+
+def test_incremental_matches_full_run_after_edits(small_blocks):
+    reused = 0
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "p.EIA"
+        for seed in range(120):
+            rng = random.Random(seed)
+            prog = random_program(rng, 60)
+            cfg = random_config(rng)
+            (d / "p-bcss.bcssinc").unlink(missing_ok=True)
+
+            inp.write_bytes(_edit(rng, prog).to_bytes())  # previous post
+            process_file(inp, d, cfg, incremental=True)
+            inp.write_bytes(prog.to_bytes())
+            rep = process_file(inp, d, cfg, incremental=True)
+
+            ref_out, ref_stats = reference_convert(prog.to_bytes(), cfg, inp)
+            assert (d / "p-bcss.EIA").read_bytes() == ref_out, f"seed {seed}"
+            assert _stats(rep) == ref_stats, f"seed {seed}"
+            assert rep.incremental.manifest_used
+            reused += rep.incremental.reused_blocks
+    assert reused  # the edits left blocks to reuse
+
+
+def test_manifest_ignored_when_output_or_config_changed(small_blocks):
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "p.EIA"
+        inp.write_bytes(b"G97S8000M03\nX0B10.\nG1X1\nX0B20.\nG1X2\n")
+        cfg = random_config(random.Random(1))
+        process_file(inp, d, cfg, incremental=True)
+        assert process_file(inp, d, cfg, incremental=True).incremental.processed_blocks == 0
+
+        out = d / "p-bcss.EIA"
+        out.write_bytes(out.read_bytes() + b"(EDITED)\n")
+        rep = process_file(inp, d, cfg, incremental=True)
+        assert not rep.incremental.manifest_used and rep.incremental.reused_blocks == 0
+
+        rep = process_file(inp, d, random_config(random.Random(2)), incremental=True)
+        assert not rep.incremental.manifest_used
+
+        manifest = d / "p-bcss.bcssinc"
+        manifest.write_bytes(manifest.read_bytes()[:-20])  # truncated: EOF record missing
+        rep = process_file(inp, d, random_config(random.Random(2)), incremental=True)
+        assert not rep.incremental.manifest_used
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"observers": [InjectorObserver()]},
+        {"cycle_time": CycleTimeModel()},
+        {"tool_table": ToolTable()},
+        {"index": True},
+        {"pipelined": True},
+        {"output_format": "patch"},
+    ],
+)
+def test_unsupported_combinations_raise(kwargs):
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "p.EIA"
+        inp.write_bytes(b"G97S8000M03\nX0B10.\n")
+        with pytest.raises(ValueError):
+            process_file(inp, d, random_config(random.Random(1)), incremental=True, **kwargs)
+        assert not (d / "p-bcss.EIA").exists()
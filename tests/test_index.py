@@ -0,0 +1,87 @@
+from pathlib import Path
+import os
+import tempfile
+
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.index import ProgramIndex, index_path_for
+from nc_baxis_constant_surface_speed.core.processor import analyze_file, process_file
+
+
+SRC = (
+    b"G97S8000M03\r\n"
+    b"X0Y0B12.3(COMMENT B99)\r\n"
+    b"G1X1\n"
+    b"X0Y0B13.1\r\n"
+    b"G1X2\r\n"
+    b"X0Y0B40.0\r\n"
+    b"S9000\r\n"
+    b"B41.0\r\n"
+    b"M05\r\n"
+    b"X0Y0B14.0\r\n"
+    b"G1X4"  # no final newline
+)
+
+
+def _run(d: Path, cfg: BcssConfig, index: bool) -> tuple:
+    rep = process_file(d / "a.EIA", d, cfg, index=index)
+    return (d / "a-bcss.EIA").read_bytes(), rep.to_dict()
+
+
+def test_index_written_then_used_with_identical_output():
+    cfgs = [BcssConfig(), BcssConfig(invert_b_to_theta=False, deadband_rpm=0, s_max_rpm=9000)]
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_bytes(SRC)
+
+        expected = []
+        for cfg in cfgs:
+            out, rep = _run(d, cfg, index=False)
+            expected.append((out, rep["detect"], rep["changes"], rep["s_range"]))
+        assert not index_path_for(inp).exists()
+
+        for round_ in range(2):  # first run writes the sidecar, second reads it
+            for cfg, exp in zip(cfgs, expected):
+                out, rep = _run(d, cfg, index=True)
+                assert (out, rep["detect"], rep["changes"], rep["s_range"]) == exp
+                assert index_path_for(inp).exists()
+
+        idx = ProgramIndex.open(inp)
+        assert idx is not None and idx.line_count == 11
+        idx.close()
+
+        rep = analyze_file(inp, cfgs[0])
+        assert rep.to_dict()["changes"] == expected[0][2]
+
+
+def test_stale_index_is_ignored():
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_bytes(SRC)
+        process_file(inp, d, BcssConfig(), index=True)
+        st = inp.stat()
+
+        # Same size and mtime, different content: only the hash can tell.
+        inp.write_bytes(SRC.replace(b"B40.0", b"B50.0"))
+        os.utime(inp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert ProgramIndex.open(inp) is None
+
+        out, _ = _run(d, BcssConfig(), index=True)
+        ref, _ = _run(d, BcssConfig(), index=False)
+        assert out == ref
+
+
+def test_same_stem_gets_its_own_sidecar():
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        eia, nc = d / "a.EIA", d / "a.NC"
+        eia.write_bytes(SRC)
+        nc.write_bytes(SRC.replace(b"B40.0", b"B50.0"))
+        for p in (eia, nc):
+            process_file(p, d, BcssConfig(), index=True)
+        assert index_path_for(eia).name == "a.EIA.bcssidx" and index_path_for(nc) != index_path_for(eia)
+        for p in (eia, nc):
+            idx = ProgramIndex.open(p)
+            assert idx is not None  # not overwritten by the other file's run
+            idx.close()
@@ -0,0 +1,98 @@
+from pathlib import Path
+import os
+import tempfile
+import tracemalloc
+
+import pytest
+
+from nc_baxis_constant_surface_speed.core import processor
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.cycletime import CycleTimeModel
+from nc_baxis_constant_surface_speed.core.processor import _detect_encoding_and_newline, process_file
+
+# Small I/O blocks so that modest files already span many of them.
+CHUNK = 4 * 1024
+# Fixed ceiling, well below the size of the larger input.
+CEILING = 256 * 1024
+# Allowed growth from LINES to SCALE * LINES (interpreter noise). The defaults
+# add more lines than SLACK has bytes, so keeping even one byte per line fails.
+SLACK = 32 * 1024
+SCALE = 20
+
+# Set BCSS_MEM_LINES higher for a longer local check (at least 2000: the
+# smaller input must already fill the fixed-size read buffers).
+LINES = int(os.environ.get("BCSS_MEM_LINES", "2000"))
+
+
+def _generate(path: Path, n: int, with_b: bool, with_calls: bool = False) -> None:
+    with path.open("w", encoding="ascii", newline="") as f:
+        f.write("G97S8000M03\r\n")
+        for i in range(n):
+            b = f"B{(i // 50) % 60}.{i % 10}" if with_b else ""
+            f.write(f"G1X{i % 1000}.123Y-{i % 777}.5Z3.{b}F1200\r\n")
+            if with_calls and i % 100 == 99:
+                f.write("M98P1000L2\r\n")
+        if with_calls:
+            # Fixed-size subprogram: only the main program grows with n.
+            f.write("M30\r\nO1000\r\n")
+            for i in range(20):
+                f.write(f"G1X{i}.5Z-1.B{i % 7}.5F800\r\n")
+            f.write("M99\r\n")
+
+
+MODES = {
+    "text": (True, dict(fast_copy=False)),
+    "fastcopy": (False, {}),
+    "index": (True, dict(index=True)),
+    "patch": (True, dict(output_format="patch")),
+    "pipelined": (True, dict(pipelined=True)),
+    "cycle_time": (True, dict(cycle_time=CycleTimeModel())),
+    "incremental": (True, dict(incremental=True)),
+    "subprograms": (True, dict(subprograms=True)),
+}
+
+
+def _peak(d: Path, n: int, with_b: bool, kw: dict) -> int:
+    inp = d / f"p{n}.EIA"
+    _generate(inp, n, with_b, with_calls=kw.get("subprograms", False))
+    # index / incremental: the first run writes the sidecar / manifest, the second reads it
+    runs = 2 if kw.get("index") or kw.get("incremental") else 1
+    peak = 0
+    for _ in range(runs):
+        tracemalloc.start()
+        try:
+            process_file(inp, d, BcssConfig(), **kw)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return peak
+
+
+@pytest.mark.parametrize("mode", list(MODES))
+def test_peak_memory_does_not_grow_with_input(monkeypatch, mode):
+    """
+    Every mode streams: nothing is kept per line, per B line or per insert, so
+    the peak stays flat from LINES to SCALE * LINES. A mode that has to keep
+    per-event data (e.g. the GUI preview profile, core.profile) does not
+    belong in MODES.
+    """
+    monkeypatch.setattr(processor, "IO_CHUNK_BYTES", CHUNK)
+    with_b, kw = MODES[mode]
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        small = _peak(d, LINES, with_b, kw)
+        large = _peak(d, SCALE * LINES, with_b, kw)
+        assert (d / f"p{SCALE * LINES}.EIA").stat().st_size > CEILING
+    assert large < CEILING, f"{mode}: peak {large} B"
+    assert large - small < SLACK, f"{mode}: peak grew {small} -> {large} B"
+
+
+def test_sniff_reads_only_the_head(monkeypatch):
+    def no_read_bytes(self):
+        raise AssertionError("whole file read")
+
+    monkeypatch.setattr(Path, "read_bytes", no_read_bytes)
+    with tempfile.TemporaryDirectory() as d:
+        p = Path(d) / "a.EIA"
+        p.write_text("(工具)\nG1X1\n" * 20000, encoding="cp932", newline="")
+        assert _detect_encoding_and_newline(p) == ("cp932", b"\n")
@@ -0,0 +1,56 @@
+from pathlib import Path
+import tempfile
+
+import pytest
+
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.patch import PatchError, apply_patch, iter_patched
+from nc_baxis_constant_surface_speed.core.processor import process_file
+
+
+SRC = (
+    "G97S8000M03\r\n"
+    "(工具 B-AXIS)\r\n"
+    "X0Y0B10.0\r\n"
+    "G1X1\n"
+    "X0Y0B30.0\r\n"
+    "G1X2\r\n"
+    "X0Y0B60.0\r\n"
+    "G1X3"  # no final newline
+).encode("cp932")
+
+
+@pytest.mark.parametrize("index", [False, True])
+def test_patch_apply_matches_full_output(index):
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_bytes(SRC)
+
+        full = process_file(inp, d, BcssConfig(), index=index)
+        expected = (d / "a-bcss.EIA").read_bytes()
+        (d / "a-bcss.EIA").unlink()
+
+        rep = process_file(inp, d, BcssConfig(), index=index, output_format="patch")
+        patch = d / "a-bcss.EIA.bcsspatch"
+        assert rep.output_file == str(patch)
+        assert rep.changes == full.changes
+        assert rep.hashes.output_sha256 == full.hashes.output_sha256
+        assert len(patch.read_bytes()) < 600
+
+        apply_patch(inp, patch, d / "out.EIA")
+        assert (d / "out.EIA").read_bytes() == expected
+        assert b"".join(iter_patched(inp, patch, chunk_size=3)) == expected
+
+
+def test_patch_rejects_wrong_source():
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_bytes(SRC)
+        process_file(inp, d, BcssConfig(), output_format="patch")
+
+        inp.write_bytes(SRC.replace(b"B30.0", b"B31.0"))  # same size
+        with pytest.raises(PatchError):
+            apply_patch(inp, d / "a-bcss.EIA.bcsspatch", d / "out.EIA")
+        assert not (d / "out.EIA").exists()
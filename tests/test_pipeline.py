@@ -0,0 +1,93 @@
+from pathlib import Path
+import tempfile
+import threading
+
+import pytest
+
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.pipeline import BackgroundWriter, PipelineCancelled, PrefetchReader
+from nc_baxis_constant_surface_speed.core.processor import process_file
+
+
+SRC = (
+    "G97S8000M03\r\n"
+    "X0Y0B10.0\r\n"
+    "G1X1\n"
+    "\r\n"
+    "X0Y0B30.0\r\n"
+    "G1X2\r"  # lone CR stays inside the line, like readline()
+    "X0Y0B60.0\r\n"
+    "G1X3"
+).encode("ascii")
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 3, 7, 64, 1 << 20])
+def test_prefetch_reader_splits_like_readline(block_size):
+    with tempfile.TemporaryDirectory() as d:
+        p = Path(d) / "a.EIA"
+        p.write_bytes(SRC)
+        with p.open("rb") as f:
+            expected = list(iter(f.readline, b""))
+        assert list(PrefetchReader(p, block_size=block_size, depth=1)) == expected
+
+
+def test_pipelined_output_identical():
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_bytes(SRC * 200)
+        plain = process_file(inp, d, BcssConfig())
+        expected = (d / "a-bcss.EIA").read_bytes()
+        piped = process_file(inp, d, BcssConfig(), pipelined=True)
+        assert (d / "a-bcss.EIA").read_bytes() == expected
+        assert piped.changes == plain.changes
+        assert piped.hashes == plain.hashes
+
+
+def test_cancel_removes_partial_output():
+    cancel = threading.Event()
+    cancel.set()
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_bytes(SRC)
+        with pytest.raises(PipelineCancelled):
+            process_file(inp, d, BcssConfig(), pipelined=True, cancel=cancel)
+        assert not (d / "a-bcss.EIA").exists()
+        assert not (d / "a-bcss.report.json").exists()
+
+        with pytest.raises(ValueError, match="pipelined"):
+            process_file(inp, d, BcssConfig(), cancel=cancel)
+        assert not (d / "a-bcss.EIA").exists()
+
+
+def test_writer_error_is_reraised():
+    class Broken:
+        def write(self, data):
+            raise OSError("disk full")
+
+    w = BackgroundWriter(Broken(), chunk_size=4)
+    with pytest.raises(OSError, match="disk full"):
+        for _ in range(100):
+            w.write(b"X0Y0\n")
+        w.close()
+
+
+def test_reader_thread_stopped_when_conversion_fails(monkeypatch):
+    from nc_baxis_constant_surface_speed.core import processor
+
+    def failing(lines, *args, **kw):
+        it = iter(lines)  # kept alive by the traceback, like a real loop's iterator
+        next(it)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(processor, "_process_text", failing)
+    monkeypatch.setattr(processor, "IO_CHUNK_BYTES", 16)  # more blocks than the queue holds
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_bytes(SRC * 200)
+        with pytest.raises(RuntimeError, match="boom") as exc:
+            process_file(inp, d, BcssConfig(), pipelined=True)
+        # exc still references the frames (and the suspended iterator)
+        assert exc.traceback and not [t for t in threading.enumerate() if t.name == "bcss-reader"]
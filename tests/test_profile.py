@@ -0,0 +1,93 @@
+from pathlib import Path
+import tempfile
+
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.downsample import lttb_downsample, minmax_downsample, visible_range
+from nc_baxis_constant_surface_speed.core.processor import analyze_file, process_file
+from nc_baxis_constant_surface_speed.core.profile import EVENT_DEADBAND, ProfileRecorder
+
+
+def test_profile_recorded_during_conversion():
+    src = "\n".join(
+        [
+            "G97S8000M03",
+            "X0Y0B12.3",
+            "G1X1",
+            "X0Y0B13.1",  # 8000 -> 7400: inserted before G1X2
+            "G1X2",
+            "X0Y0B13.2",  # same quantized theta -> nothing
+            "G1X3",
+            "X0Y0B40.0",
+            "G1X4",
+        ]
+    ) + "\n"
+
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_text(src, encoding="utf-8", newline="")
+
+        rec = ProfileRecorder()
+        rep = process_file(inp, d, BcssConfig(invert_b_to_theta=False), observers=[rec])
+
+    assert list(rec.theta_line) == [2, 4, 6, 8]
+    assert list(rec.theta_deg) == [12.0, 13.0, 13.0, 40.0]
+    # existing S8000, then the inserted ones
+    assert list(rec.s_line)[0] == 1 and rec.s_inserted[0] == 0
+    assert sum(rec.s_inserted) == rep.changes.inserted_s_lines
+    # B12.3 right after S8000 gives 8000 again -> deadband skip
+    assert list(rec.event_kind).count(EVENT_DEADBAND) == rep.changes.skipped_deadband == 1
+
+
+def test_minmax_keeps_spikes_and_bounds_points():
+    n = 100_000
+    xs = list(range(n))
+    ys = [0.0] * n
+    ys[54_321] = 99.0
+    ys[77_777] = -5.0
+
+    idx = minmax_downsample(xs, ys, 0, n, 500)
+    assert len(idx) <= 4 * 500
+    assert 54_321 in idx and 77_777 in idx
+    assert idx == sorted(idx)
+
+
+def test_visible_range_and_lttb():
+    xs = list(range(0, 10_000, 10))
+    ys = [float(x % 70) for x in xs]
+
+    i0, i1 = visible_range(xs, 2000, 3000)
+    assert xs[i0] <= 2000 and xs[i1 - 1] >= 3000
+
+    idx = lttb_downsample(xs, ys, i0, i1, 20)
+    assert len(idx) == 20
+    assert idx[0] == i0 and idx[-1] == i1 - 1
+
+
+def test_huge_s_words_do_not_break_the_recorder():
+    src = "G97S99999999999999999999M03\nX0Y0B12.3\nG1X1\nS2147483648\nX0Y0B40.0\nG1X2\n"
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_text(src, encoding="utf-8", newline="")
+        rec = ProfileRecorder()
+        process_file(inp, d, BcssConfig(), observers=[rec])
+        (d / "plain").mkdir()
+        plain = process_file(inp, d / "plain", BcssConfig())
+        assert (d / "a-bcss.EIA").read_bytes() == (d / "plain" / "a-bcss.EIA").read_bytes()
+
+    assert rec.s_rpm[0] == 2**63 - 1 and 2147483648 in rec.s_rpm
+    assert plain.changes.inserted_s_lines == sum(rec.s_inserted)
+
+
+def test_preview_profile_from_analyze_matches_the_run():
+    src = "G97S8000M03\nX0Y0B12.3\nG1X1\nX0Y0B13.1\nG1X2\nX0Y0B40.0\nG1X4\n"
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_text(src, encoding="utf-8", newline="")
+        during, after = ProfileRecorder(), ProfileRecorder()
+        process_file(inp, d, BcssConfig(), observers=[during])
+        analyze_file(inp, BcssConfig(), observers=[after])  # what the GUI preview runs
+    for name in ("theta_line", "theta_deg", "s_line", "s_rpm", "s_inserted", "event_line", "event_kind"):
+        assert getattr(after, name) == getattr(during, name), name
@@ -0,0 +1,196 @@
+from pathlib import Path
+import random
+import tempfile
+
+import pytest
+
+from nc_baxis_constant_surface_speed.core import subprogram
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.processor import process_file
+from nc_baxis_constant_surface_speed.core.subprogram import parse_call
+from tests.differential import _line, _stats, random_config, random_program, reference_convert
+
+
+SRC = "\n".join(
+    [
+        "O0001",
+        "G97S8000M03",
+        "X0B20.",
+        "G1X1",
+        "M98P1000L2",  # 1st pass from theta 20, 2nd from theta 10
+        "N50M98P1000(CALL)",  # theta 10 again: reuses the 2nd body
+        "M30",
+        "O1000(SUB)",
+        "G1X5B20.",
+        "G1X6",
+        "G1X7B10.",
+        "G1X8",
+        "M99",
+    ]
+) + "\n"
+
+
+def _convert(d: Path, text: str, cfg: BcssConfig, **kw):
+    inp = d / "p.EIA"
+    inp.write_text(text, encoding="utf-8", newline="")
+    rep = process_file(inp, d, cfg, subprograms=True, **kw)
+    return rep, (d / "p-bcss.EIA").read_text(encoding="utf-8")
+
+
+def test_calls_get_a_body_per_entry_state():
+    with tempfile.TemporaryDirectory() as d:
+        rep, out = _convert(Path(d), SRC, BcssConfig(invert_b_to_theta=False))
+
+    lines = out.splitlines()
+    assert lines[4:8] == ["G1X1", "M98P1000L1", "M98P1001", "N50M98P1001(CALL)"]
+    assert lines[9:16] == ["O1000(SUB)", "G1X5B20.", "G1X6", "G1X7B10.", "S9580", "G1X8", "M99"]
+    assert lines[16:19] == ["O1001(SUB)", "G1X5B20.", "S4860"]
+
+    sub = rep.subprograms
+    assert (sub.calls, sub.memo_hits, sub.unresolved_calls) == (3, 1, 0)
+    assert [(v.o_number, v.calls, v.changes.inserted_s_lines) for v in sub.variants] == [(1000, 1, 1), (1001, 2, 2)]
+    # Totals count the output text (main + both bodies; O lines are not run)
+    assert rep.changes.inserted_s_lines == 4 and rep.detect.total_lines == 17
+
+
+def test_entry_s_is_part_of_the_state():
+    src = "G97S8000M03\nX0B20.\nG1X1\nM98P1000\nX0B20.\nS9580\nM98P1000\nM30\nO1000\nG1X7B10.\nG1X8\nM99\n"
+    with tempfile.TemporaryDirectory() as d:
+        rep, out = _convert(Path(d), src, BcssConfig(invert_b_to_theta=False))
+    # Same theta on entry, but the 2nd call already runs at 9580: no S needed there
+    assert "M98P1001" in out.splitlines()
+    assert [v.changes.inserted_s_lines for v in rep.subprograms.variants] == [1, 0]
+
+
+def test_parse_call_forms():
+    assert parse_call("M98P1000") == (1000, 1, False, 4, False)
+    assert parse_call("M98P31002") == (1002, 3, True, 4, False)
+    assert parse_call("M98P12L4") == (12, 4, False, 2, True)
+    assert parse_call("M198P1000") is None and parse_call("M98") is None
+
+
+def test_without_calls_same_as_flat():
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        for seed in range(60):
+            rng = random.Random(seed)
+            prog = random_program(rng)
+            cfg = random_config(rng)
+            inp = d / "p.EIA"
+            inp.write_bytes(prog.to_bytes())
+            rep = process_file(inp, d, cfg, subprograms=True)
+            ref_out, ref_stats = reference_convert(prog.to_bytes(), cfg, inp)
+            assert (d / "p-bcss.EIA").read_bytes() == ref_out, f"seed {seed}"
+            assert _stats(rep) == ref_stats, f"seed {seed}"
+
+
+# ---------- expansion oracle ----------
+def _blocks(lines):
+    """Main lines and {number: body lines without the O line} of a generated program (called subs only)."""
+    called = {c.number for c in map(parse_call, lines) if c is not None}
+    main, subs, cur = [], {}, None
+    for line in lines:
+        if cur is None and line.startswith("O") and line[1:5].isdigit() and int(line[1:5]) in called:
+            cur = int(line[1:5])
+            subs[cur] = []
+        elif cur is not None:
+            subs[cur].append(line)
+            if line == "M99":
+                cur = None
+        else:
+            main.append(line)
+    return main, subs
+
+
+def _expand(lines, subs, depth=0):
+    for line in lines:
+        yield line
+        call = parse_call(line)
+        if call is not None and call.number in subs:
+            assert depth < 8
+            for _ in range(call.repeats):
+                yield from _expand(subs[call.number], subs, depth + 1)
+
+
+def _program_line(rng):
+    while True:
+        line = _line(rng)
+        if line not in ("O1234", "M30"):
+            return line
+
+
+def _random_sub_program(rng):
+    subs = {n: [_program_line(rng) for _ in range(rng.randint(1, 8))] for n in (1000, 2000)}
+    for body in subs.values():
+        body.append("M99")
+    if rng.random() < 0.5:
+        subs[1000].insert(rng.randint(0, len(subs[1000]) - 1), "M98P2000")
+    main = ["O0001", "G97S8000M03"]
+    for _ in range(rng.randint(2, 20)):
+        if rng.random() < 0.3:
+            n = rng.choice([1000, 2000, 3000])
+            call = rng.choice([f"M98P{n}", f"M98P{n}L{rng.randint(0, 4)}", f"M98P{rng.randint(2, 5)}{n}"])
+            if rng.random() < 0.3:
+                call = f"X1B{rng.randint(0, 90)}." + call  # entered with an S pending
+            main.append(call)
+        else:
+            main.append(_program_line(rng))
+    main.append("M30")
+    lines = list(main)
+    for n, body in subs.items():
+        lines += [f"O{n}"] + body
+    return lines
+
+
+def test_expanded_output_matches_flat_conversion_of_expanded_input():
+    hits = 0
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        for seed in range(150):
+            rng = random.Random(seed)
+            lines = _random_sub_program(rng)
+            cfg = random_config(rng)
+            rep, out = _convert(d, "\n".join(lines) + "\n", cfg)
+
+            main, subs = _blocks(lines)
+            flat = "\n".join(_expand(main, subs)) + "\n"
+            (d / "flat.EIA").write_text(flat, encoding="utf-8", newline="")
+            want, _ = reference_convert(flat.encode(), cfg, d / "flat.EIA")
+
+            out_main, out_subs = _blocks(out.splitlines())
+            got = list(_expand(out_main, out_subs))
+            # Extra M98 lines of split repeats are inert: compare without calls.
+            strip = lambda ls: [l for l in ls if parse_call(l) is None]  # noqa: E731
+            assert strip(got) == strip(want.decode().splitlines()), f"seed {seed}"
+            hits += rep.subprograms.memo_hits
+    assert hits
+
+
+def test_body_parsed_once_and_recursion_rejected(monkeypatch):
+    parsed = []
+    real = subprogram.parse_line
+    monkeypatch.setattr(subprogram, "parse_line", lambda t: parsed.append(t) or real(t))
+    src = "G97S8000M03\nX0B20.\n" + "M98P1000\n" * 50 + "M30\nO1000\nG1X5B20.\nG1X7B10.\nM99\n"
+    with tempfile.TemporaryDirectory() as d:
+        rep, _ = _convert(Path(d), src, BcssConfig(invert_b_to_theta=False))
+        assert parsed.count("G1X7B10.") == 1
+        assert rep.subprograms.calls == 50 and rep.subprograms.memo_hits >= 48
+
+        with pytest.raises(ValueError):
+            _convert(Path(d), "M98P1000\nM30\nO1000\nM98P1000\nM99\n", BcssConfig())
+
+
+def test_repeat_count_and_held_text_are_limited(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        body = "M30\nO1000\nG1X5B20.\nM99\n"
+        rep, _ = _convert(d, "G97S8000M03\nM98P1000L9999\n" + body, BcssConfig())
+        assert rep.subprograms.calls == 9999
+        for call in ("M98P1000L10000", "M98P100001000"):
+            with pytest.raises(ValueError, match="repeats"):
+                _convert(d, f"G97S8000M03\n{call}\n" + body, BcssConfig())
+            assert not (d / "p-bcss.EIA").exists()
+
+        monkeypatch.setattr(subprogram, "MAX_HELD_BYTES", 64)
+        with pytest.raises(ValueError, match="MiB"):
+            _convert(d, "G97S8000M03\nM98P1000\nM30\nO1000\n" + "G1X5B20.\n" * 20 + "M99\n", BcssConfig())
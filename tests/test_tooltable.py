@@ -0,0 +1,101 @@
+from pathlib import Path
+import json
+import tempfile
+
+import pytest
+
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.processor import process_file
+from nc_baxis_constant_surface_speed.core.tooltable import load_tool_table, tool_table_from_dict
+
+
+SRC = "\n".join(
+    [
+        "T1M06",
+        "G97S8000M03",
+        "X0Y0B12.0",
+        "G1X1",  # 1: B12 after S8000 -> deadband
+        "X0Y0B30.0",
+        "G1X2",  # 1: inserted
+        "M05",
+        "T7",
+        "M06",  # tool 7 is not in the table -> off
+        "S3000M03",
+        "X0Y0B45.0",
+        "G1X3",
+        "M05",
+        "T2M06",
+        "S9000M03",
+        "X0Y0B30.0",
+        "G1X4",  # 2: inserted with its own s_ref
+        "X0Y0B12.0",
+    ]
+) + "\n"
+
+
+def _table(base: BcssConfig, **kw):
+    return tool_table_from_dict(
+        {"tools": {"1": {}, "2": {"s_ref_rpm": 9000, "theta_ref_deg": 30.0, "deadband_rpm": 0}}, **kw}, base
+    )
+
+
+def test_tool_change_switches_config_and_reports_per_tool():
+    base = BcssConfig(invert_b_to_theta=False)
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_text(SRC, encoding="ascii", newline="")
+        rep = process_file(inp, d, base, tool_table=_table(base))
+        out = (d / "a-bcss.EIA").read_text(encoding="ascii").splitlines()
+
+    assert [l for l in out if l.startswith("S") and "M03" not in l] == ["S3330", "S9000"]
+    assert out.index("S9000") == out.index("G1X4") - 1  # tool 2 uses s_ref 9000 @ 30deg, no deadband
+
+    tools = rep.to_dict()["tools"]
+    assert [(t["tool"], t["source"]) for t in tools] == [(None, "base"), (1, "table"), (7, "off"), (2, "table")]
+    assert sum(t["detect"]["total_lines"] for t in tools) == rep.detect.total_lines == 18
+    t1, t7, t2 = tools[1], tools[2], tools[3]
+    assert (t1["changes"]["inserted_s_lines"], t1["changes"]["skipped_deadband"]) == (1, 1)
+    assert t7["config"] is None and t7["detect"]["b_lines"] == 0 and t7["s_range"]["s_max"] == 3000
+    assert t2["config"]["s_ref_rpm"] == 9000
+    assert t2["changes"]["inserted_s_lines"] == 1 and t2["changes"]["pending_at_eof"] == 1
+    assert rep.changes.inserted_s_lines == 2
+
+
+def test_unlisted_base_and_no_table():
+    base = BcssConfig(invert_b_to_theta=False)
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        inp = d / "a.EIA"
+        inp.write_text(SRC, encoding="ascii", newline="")
+        rep = process_file(inp, d, base, tool_table=_table(base, unlisted="base"))
+        assert [(t["tool"], t["source"]) for t in rep.to_dict()["tools"]][2] == (7, "base")
+        assert rep.changes.inserted_s_lines == 3
+
+        plain = process_file(inp, d, base)
+        assert plain.to_dict()["tools"] is None
+
+
+def test_load_tool_table_validates(tmp_path):
+    p = tmp_path / "tools.json"
+    p.write_text(json.dumps({"tools": {"5": {"tool_d_mm": 6, "mode": "vc_absolute", "vc_m_per_min": 150}}}))
+    table = load_tool_table(p, BcssConfig(s_max_rpm=15000))
+    assert table.tools[5].tool_d_mm == 6.0 and table.tools[5].s_max_rpm == 15000
+    assert isinstance(table.tools[5].tool_d_mm, float)
+
+    for bad in ({"tools": {"5": {"tool_dia": 6}}}, {"tools": {"x": {}}}, {"unlisted": "skip"}, {"tools": {"1": {"mode": "abs"}}}):
+        with pytest.raises(ValueError):
+            tool_table_from_dict(bad, BcssConfig())
+
+    # Wrong JSON types are rejected, not coerced
+    for setting in (
+        {"invert_b_to_theta": "false"},
+        {"invert_b_to_theta": 0},
+        {"s_max_rpm": 12000.7},
+        {"s_max_rpm": "12000"},
+        {"deadband_rpm": True},
+        {"tool_d_mm": None},
+        {"mode": 1},
+    ):
+        with pytest.raises(ValueError, match=f"T1: {next(iter(setting))}"):
+            tool_table_from_dict({"tools": {"1": setting}}, BcssConfig())
@@ -0,0 +1,62 @@
+from pathlib import Path
+import json
+import tempfile
+
+from nc_baxis_constant_surface_speed.core.config import BcssConfig
+from nc_baxis_constant_surface_speed.core.processor import process_file
+from nc_baxis_constant_surface_speed.core.trace import TRACE_ALL, TRACE_INSERTED, TraceWriter
+
+
+SRC = "\n".join(
+    [
+        "B45.0",  # 1: spindle off
+        "G97S8000M03",
+        "X0Y0B12.3",  # 3
+        "G1X1",  # 4: 8000 again -> deadband
+        "X0Y0B13.1",  # 5
+        "G1X2",  # 6: inserted
+        "X0Y0B20.0",  # 7
+        "S5000",  # 8: next line has S
+        "X0Y0B40.0",  # 9: pending at EOF
+    ]
+) + "\n"
+
+
+def _trace(d: Path, **kw) -> list:
+    inp = d / "a.EIA"
+    inp.write_text(SRC, encoding="utf-8", newline="")
+    with TraceWriter(d / "t.ndjson", **kw) as tw:
+        rep = process_file(inp, d, BcssConfig(invert_b_to_theta=False), observers=[tw])
+    recs = [json.loads(l) for l in (d / "t.ndjson").read_text(encoding="utf-8").splitlines()]
+    return rep, recs
+
+
+def test_trace_records_every_decision():
+    with tempfile.TemporaryDirectory() as d:
+        rep, recs = _trace(Path(d), level=TRACE_ALL)
+
+    summary = recs.pop()["summary"]
+    assert [(r["line"], r["reason"]) for r in recs] == [
+        (1, "spindle-off"),
+        (4, "deadband"),
+        (6, "inserted"),
+        (8, "next-line-has-s"),
+        (10, "pending-at-eof"),
+    ]
+    ins = recs[2]
+    assert (ins["b"], ins["theta_quant"], ins["rpm_clamped"]) == (13.1, 13.0, 7390)
+    assert recs[3]["rpm_raw"] is None
+    assert summary["seen"] == summary["written"]
+    assert summary["seen"]["inserted"] == rep.changes.inserted_s_lines
+
+
+def test_trace_level_and_sampling():
+    with tempfile.TemporaryDirectory() as d:
+        _, recs = _trace(Path(d), level=TRACE_INSERTED)
+        assert [r["reason"] for r in recs[:-1]] == ["inserted"]
+
+        _, recs = _trace(Path(d), sample_every=2)
+        summary = recs.pop()["summary"]
+        # first record of each reason is kept, spindle-off is below the default level
+        assert {r["reason"] for r in recs} == {"deadband", "inserted", "next-line-has-s", "pending-at-eof"}
+        assert summary["seen"]["spindle-off"] == 1 and "spindle-off" not in summary["written"]